@@ -1,53 +1,251 @@
 import sqlite3
+import re
+import os
+import collections
+import threading
+import bisect
+import unicodedata
 import CodiStatus
+import ContactStore
 import getpass
 import logging
 
 log = logging.getLogger('codi')
 
+CONTACTS_DB = '/home/'+getpass.getuser()+'/.local/share/evolution/addressbook/system/contacts.db'
+
+# Contacts are loaded once and kept in memory. They are reloaded on a
+# background thread when the address book signals a change or the database
+# files change on disk; readers keep using the old list until the new one is
+# swapped in.
+generation = 0
+sourceStamp = None
+refreshLock = threading.Lock()
+refreshThread = None
+refreshAgain = False
+refreshCallbacks = []
+
+# A reload that changed what the CoDi shows returns its generation and
+# whether any number now resolves to a different name, which is what the
+# call history shows.
+ContactChange = collections.namedtuple('ContactChange', 'generation numbersRenamed')
+
+# Numbers are compared on their digits only. When the full digit string
+# doesn't match, the last SUFFIX_DIGITS digits are tried so that national
+# and international forms of the same number find each other.
+SUFFIX_DIGITS = 9
+nonDigits = re.compile('[^0-9]')
+numberIndex = ({}, {})
+
+# Contacts are kept sorted by name, ignoring case and accents, with the
+# offset of the first contact for each initial. Names not starting with a
+# letter are grouped under '#', ahead of the letters.
+PAGE_SIZE = 10
+letterIndex = ([], [])
+
+def foldName(name):
+    # Lower case without accents, so 'Zoë' sorts and matches like 'zoe'
+    if name.isascii():
+        return name.casefold()
+    decomposed = unicodedata.normalize('NFKD', name)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+def sortContacts(contacts):
+    keys = [(foldName(c[1]), c[1], c[0], c[2]) for c in contacts]
+    order = sorted(range(len(contacts)), key=keys.__getitem__)
+    return ContactStore.ContactStore(contacts[i] for i in order), [keys[i][0] for i in order]
+
+def initial(folded):
+    if folded[:1].isalpha():
+        return folded[0]
+    return '#'
+
+def buildLetterIndex(folded):
+    letters = []
+    offsets = []
+    for offset, name in enumerate(folded):
+        letter = initial(name)
+        if not letters or letters[-1] != letter:
+            letters.append(letter)
+            offsets.append(offset)
+    return letters, offsets
+
+def indexForLetter(letter):
+    # First contact of the section for letter, or of the next section there is
+    letters, offsets = letterIndex
+    if not letters:
+        return 0
+    letter = initial(foldName(letter))
+    i = bisect.bisect_left(letters, letter)
+    return offsets[min(i, len(offsets) - 1)]
+
+def pageForLetter(letter):
+    return indexForLetter(letter) // PAGE_SIZE
+
+def normaliseNumber(number):
+    return nonDigits.sub('', number)
+
+def buildNumberIndex(contacts):
+    byNumber = {}
+    bySuffix = {}
+    for c in contacts:
+        digits = normaliseNumber(c[2])
+        if digits:
+            byNumber.setdefault(digits, c[1])
+            if len(digits) >= SUFFIX_DIGITS:
+                bySuffix.setdefault(digits[-SUFFIX_DIGITS:], c[1])
+    return byNumber, bySuffix
+
+def setContacts(contacts):
+    global numberIndex
+    global letterIndex
+    global generation
+
+    # Numbers are indexed in the order the address book has them, so the
+    # first of several contacts sharing a number keeps winning
+    unsorted = contacts
+    contacts, folded = sortContacts(contacts)
+    old = getattr(CodiStatus, 'Contacts', [])
+    if contacts == old:
+        # Nothing the CoDi shows changed, keep the generation and the caches
+        return None
+
+    index = buildNumberIndex(unsorted)
+    numbersRenamed = index != numberIndex
+    letters = buildLetterIndex(folded)
+    CodiStatus.Contacts = contacts
+    numberIndex = index
+    letterIndex = letters
+    generation += 1
+    return ContactChange(generation, numbersRenamed)
+
 def contactNameForNumber(number):
-    for c in CodiStatus.Contacts:
-        if c[2] == number:
-            return c[1]
-    return 'Unknown'
+    byNumber, bySuffix = numberIndex
+    digits = normaliseNumber(number)
+    name = byNumber.get(digits)
+    if name is None and len(digits) >= SUFFIX_DIGITS:
+        name = bySuffix.get(digits[-SUFFIX_DIGITS:])
+    if name is None:
+        return 'Unknown'
+    return name
+
+def contactNamesForNumbers(numbers):
+    names = {}
+    for number in numbers:
+        if number not in names:
+            names[number] = contactNameForNumber(number)
+    return names
 
 
+def readSourceStamp():
+    stamp = []
+    for path in (CONTACTS_DB, CONTACTS_DB + '-wal'):
+        try:
+            st = os.stat(path)
+            stamp.append((st.st_ino, st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+def checkForChanges():
+    # Cheap enough to call on every page request
+    if readSourceStamp() != sourceStamp:
+        refreshAsync()
+
+def ensureLoaded():
+    # Callers that run without initCodi, such as codiServer's one-shot dbus
+    # command, would otherwise only start a background reload
+    if generation == 0:
+        refreshContacts()
+
+def refreshAsync(callback=None):
+    global refreshThread
+    global refreshAgain
+
+    with refreshLock:
+        if callback is not None:
+            refreshCallbacks.append(callback)
+        if refreshThread is not None:
+            # Changes may have landed after the running refresh read the db
+            refreshAgain = True
+            return
+        refreshThread = threading.Thread(target=refreshLoop, daemon=True)
+        refreshThread.start()
+
+def refreshLoop():
+    global refreshThread
+    global refreshAgain
+
+    while True:
+        with refreshLock:
+            refreshAgain = False
+            callbacks = refreshCallbacks[:]
+            del refreshCallbacks[:]
+
+        change = refreshContacts()
+        for callback in callbacks:
+            try:
+                callback(change)
+            except Exception as e:
+                log.error(e)
+
+        with refreshLock:
+            if not refreshAgain and not refreshCallbacks:
+                refreshThread = None
+                return
+
+
+# Deleted contacts stay in the table with an X-DELETED-AT line, skip them in
+# SQL so their vCards are never handed to Python
+CONTACTS_QUERY = ("select vcard from folder_id "
+                  "where vcard not like '%' || char(10) || 'X-DELETED-AT:%'")
+# One pass over the vCard picks out the fields we need. FN and UID are never
+# the first line, which lets the regex engine skip ahead to line breaks.
+vcardField = re.compile(r'\n(?:FN:([^\r\n]*)|UID:([^\r\n]*)|'
+                        r'TEL;(?:[^:\r\n]*;)?TYPE=[^:;\r\n]*:([^\r\n]*))')
+
+def parseVcard(vcard):
+    uid = ''
+    name = ''
+    numbers = []
+    for fn, id, number in vcardField.findall(vcard):
+        if number:
+            numbers.append(number.strip())
+        elif fn:
+            name = fn.rstrip()
+        elif id:
+            uid = id.strip()
+    return uid, name, numbers
+
+def readContacts(conn):
+    try:
+        rows = conn.execute(CONTACTS_QUERY)
+    except sqlite3.OperationalError:
+        # Older schemas without a vcard column name, filter in Python
+        rows = ((r[15],) for r in conn.execute('select * from folder_id')
+                if '\nX-DELETED-AT:' not in r[15])
+    for row in rows:
+        uid, name, numbers = parseVcard(row[0])
+        if name != '':
+            for number in numbers:
+                yield (uid, name, number)
+
 def refreshContacts():
-    CodiStatus.Contacts = []
+    global sourceStamp
+
+    sourceStamp = readSourceStamp()
 
     try:
-        conn = sqlite3.connect('/home/'+getpass.getuser()+'/.local/share/evolution/addressbook/system/contacts.db')
-        c = conn.cursor()
-        statement = 'select * from folder_id'
-        contacts = c.execute(statement)
-        for contact in contacts:
-            id = ''
-            name = ''
-            numbers = []
-            addContact = True
-            for l in contact[15].split('\n'):
-                if l.startswith('X-DELETED-AT:'):
-                    addContact = False
-                if l.startswith('FN:'):
-                    name = l[3:]
-                if l.startswith('UID:'):
-                    id = l[4:].strip()
-                if l.startswith('TEL;'):
-                    tokens = l.split(';')
-                    for t in tokens:
-                        if t.startswith('TYPE='):
-                            t = t[5:]
-                            sep = t.index(':')
-                            phType = t[0:sep].strip()
-                            phNumber = t[sep+1:].strip()
-                            numbers += [(phType, phNumber)]
-
-            if name != '' and addContact:
-                for n in numbers:
-                    CodiStatus.Contacts += [(id, name, n[1])]
-
-        conn.commit()
-        c.close()
-        conn.close()
+        # Read-only, so a reload never writes anything FileWatcher would
+        # take for a change
+        conn = sqlite3.connect('file:' + CONTACTS_DB + '?mode=ro', uri=True)
+        try:
+            contacts = list(readContacts(conn))
+        finally:
+            conn.close()
     except Exception as e:
+        # Keep the contacts we have rather than wiping them on the CoDi
         log.error("Exception: %r", e)
+        return None
+
+    return setContacts(contacts)
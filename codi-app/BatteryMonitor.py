@@ -0,0 +1,91 @@
+import time
+import logging
+from gi.repository import GLib
+import DeviceState
+import DBusServer
+import LEDManager
+
+log = logging.getLogger('codi')
+
+# UPower sends battery properties in bursts while charging. The changed
+# properties are collected and the level worked out once the burst has been
+# quiet for DEBOUNCE_MS, but not later than MAX_WAIT after its first signal.
+# BatteryLevelInfo and the charging LED only go out when the whole
+# percentage or the charging state differ from what was sent.
+DEBOUNCE_MS = 1000
+MAX_WAIT = 5
+UPOWER_CHARGING = 1
+
+pending = {}
+timer = None
+firstSignal = None
+energy = None
+energyFull = None
+state = None
+sentLevel = None
+sentCharging = None
+stats = {'signals': 0, 'updates': 0, 'levelSent': 0, 'levelSuppressed': 0,
+         'chargingSent': 0, 'chargingSuppressed': 0}
+
+
+def propertiesChanged(properties):
+    global timer
+    global firstSignal
+
+    changed = {k: properties[k] for k in ('Energy', 'EnergyFull', 'State') if k in properties}
+    if not changed:
+        return
+    stats['signals'] += 1
+    pending.update(changed)
+    now = time.monotonic()
+    if timer is not None:
+        if now - firstSignal > MAX_WAIT:
+            return
+        GLib.source_remove(timer)
+    else:
+        firstSignal = now
+    timer = GLib.timeout_add(DEBOUNCE_MS, update)
+
+
+def update():
+    global timer
+    global firstSignal
+    global energy
+    global energyFull
+    global state
+    global sentLevel
+    global sentCharging
+
+    timer = None
+    firstSignal = None
+    stats['updates'] += 1
+    energy = pending.pop('Energy', energy)
+    energyFull = pending.pop('EnergyFull', energyFull)
+    state = pending.pop('State', state)
+    pending.clear()
+
+    if state is None:
+        try:
+            state = DBusServer.power.State
+        except Exception as e:
+            log.error(e)
+
+    if energy is not None and energyFull:
+        level = int(energy * 100 / energyFull)
+        if level != sentLevel:
+            sentLevel = level
+            # DeviceSync sends BatteryLevelInfo
+            DeviceState.set(batteryLevel=level)
+            stats['levelSent'] += 1
+        else:
+            stats['levelSuppressed'] += 1
+
+    if state is not None:
+        charging = state == UPOWER_CHARGING
+        if charging != sentCharging:
+            sentCharging = charging
+            LEDManager.ledsCharging(charging)
+            stats['chargingSent'] += 1
+        else:
+            stats['chargingSuppressed'] += 1
+    return False
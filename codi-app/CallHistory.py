@@ -0,0 +1,221 @@
+import os
+import sqlite3
+import threading
+import bisect
+import calendar
+import time
+import getpass
+import logging
+import Addressbook
+import codi_mtk_generated_functions as mtkCmd
+
+log = logging.getLogger('codi')
+
+HISTORY_DB = '/home/'+getpass.getuser()+'/.local/share/history-service/history.sqlite'
+PAGE_SIZE = 10
+
+# Call history pages are read through one long-lived read-only connection.
+# The CoDi asks for pages in order, so the (timestamp, rowid) of the last row
+# of each page served is remembered and the next page continues from there
+# instead of skipping over all earlier rows with an offset. The total count,
+# the page cursors and the prefetched page are thrown away whenever the
+# database files change. Pages are rendered into CallHistoryInfo frames in
+# one go: numbers are resolved in a single batch and timestamps converted
+# through a cache of UTC offset ranges.
+PAGE_QUERY = 'select *, rowid from voice_events '
+ORDER = 'order by timestamp desc, rowid desc limit ?'
+
+lock = threading.RLock()
+conn = None
+sourceStamp = None
+totalCount = 0
+cursors = {}
+prefetched = {}
+stats = {'pages': 0, 'keyset': 0, 'offset': 0, 'prefetchHits': 0, 'recounts': 0}
+
+# Ranges of UTC seconds over which the local offset stays the same. They are
+# found by probing localtime() a week apart and bisecting the transition.
+OFFSET_PROBE = 7 * 24 * 3600
+OFFSET_SPAN = 400 * 24 * 3600
+offsetStarts = []
+offsetRanges = []
+
+
+def connect():
+    global conn
+
+    if conn is None:
+        conn = sqlite3.connect('file:' + HISTORY_DB + '?mode=ro', uri=True,
+                               check_same_thread=False)
+    return conn
+
+
+def close():
+    global conn
+    global sourceStamp
+
+    with lock:
+        if conn is not None:
+            conn.close()
+        conn = None
+        sourceStamp = None
+
+
+def invalidate():
+    # Recount and drop cursors on the next request
+    global sourceStamp
+
+    with lock:
+        sourceStamp = None
+        cursors.clear()
+        prefetched.clear()
+
+
+def readSourceStamp():
+    stamp = []
+    for path in (HISTORY_DB, HISTORY_DB + '-wal'):
+        try:
+            st = os.stat(path)
+            stamp.append((st.st_ino, st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def checkForChanges():
+    # Must be called with lock held
+    global sourceStamp
+    global totalCount
+
+    stamp = readSourceStamp()
+    if stamp == sourceStamp:
+        return
+    if sourceStamp is not None and stamp[0] != sourceStamp[0]:
+        # The database was replaced, reopen it
+        close()
+    sourceStamp = stamp
+    cursors.clear()
+    prefetched.clear()
+    stats['recounts'] += 1
+    totalCount = connect().execute('select count(*) from voice_events').fetchone()[0]
+
+
+def fetchPage(index):
+    # Must be called with lock held
+    key = cursors.get(index)
+    if index == 0:
+        rows = connect().execute(PAGE_QUERY + ORDER, (PAGE_SIZE,)).fetchall()
+    elif key is not None:
+        stats['keyset'] += 1
+        rows = connect().execute(PAGE_QUERY + 'where timestamp < ? or (timestamp = ? and rowid < ?) ' + ORDER,
+                                 (key[0], key[0], key[1], PAGE_SIZE)).fetchall()
+    else:
+        # Jumped to a page we haven't walked to
+        stats['offset'] += 1
+        rows = connect().execute(PAGE_QUERY + ORDER + ' offset ?', (PAGE_SIZE, index)).fetchall()
+    if rows:
+        last = rows[-1]
+        cursors[index + len(rows)] = (last[4], last[-1])
+    return rows
+
+
+def localOffset(t):
+    return time.localtime(t).tm_gmtoff
+
+
+def offsetBoundary(t, offset, step):
+    # Furthest second from t, in the direction of step, still at offset
+    good = t
+    for i in range(OFFSET_SPAN // abs(step)):
+        bad = good + step
+        if localOffset(bad) != offset:
+            break
+        good = bad
+    else:
+        return good
+    while abs(bad - good) > 1:
+        mid = (good + bad) // 2
+        if localOffset(mid) == offset:
+            good = mid
+        else:
+            bad = mid
+    return good
+
+
+def utcOffset(t):
+    i = bisect.bisect_right(offsetStarts, t) - 1
+    if i >= 0:
+        start, end, offset = offsetRanges[i]
+        if t <= end:
+            return offset
+    offset = localOffset(t)
+    start = offsetBoundary(t, offset, -OFFSET_PROBE)
+    end = offsetBoundary(t, offset, OFFSET_PROBE)
+    i = bisect.bisect_left(offsetStarts, start)
+    offsetStarts.insert(i, start)
+    offsetRanges.insert(i, (start, end, offset))
+    return offset
+
+
+def resetOffsets():
+    # After the time zone was changed and time.tzset() called
+    with lock:
+        del offsetStarts[:]
+        del offsetRanges[:]
+
+
+def parseTimestamp(timestamp):
+    # 'YYYY-mm-ddTHH:MM:SS.000Z' in UTC
+    return calendar.timegm((int(timestamp[0:4]), int(timestamp[5:7]), int(timestamp[8:10]),
+                            int(timestamp[11:13]), int(timestamp[14:16]), int(timestamp[17:19])))
+
+
+def render(rows):
+    # Must be called with lock held
+    names = Addressbook.contactNamesForNumbers([r[1] for r in rows])
+    frames = []
+    for i, r in enumerate(rows):
+        state = 1
+        if r[7] == 1:
+            state = 0
+        if r[3] == 'self':
+            state = 2
+        try:
+            t = parseTimestamp(r[4])
+            local = time.gmtime(t + utcOffset(t))
+            frames.append(mtkCmd.encodeCallHistoryInfo(i, totalCount, PAGE_SIZE, names[r[1]], r[1],
+                                                       local.tm_mday, local.tm_mon, local.tm_year,
+                                                       local.tm_hour, local.tm_min, local.tm_sec,
+                                                       0, state))
+        except Exception as e:
+            log.error("Exception: %r", e)
+    return frames
+
+
+def getPage(index):
+    with lock:
+        try:
+            checkForChanges()
+            stats['pages'] += 1
+            page = prefetched.pop(index, None)
+            if page is not None and page[0] == Addressbook.generation:
+                stats['prefetchHits'] += 1
+                return totalCount, page[1]
+            return totalCount, render(fetchPage(index))
+        except Exception as e:
+            log.error("Exception: %r", e)
+            close()
+            return 0, []
+
+
+def prefetch(index):
+    with lock:
+        try:
+            checkForChanges()
+            if index < totalCount and index not in prefetched:
+                prefetched.clear()
+                generation = Addressbook.generation
+                prefetched[index] = (generation, render(fetchPage(index)))
+        except Exception as e:
+            log.error("Exception: %r", e)
+            close()
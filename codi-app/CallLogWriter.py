@@ -0,0 +1,123 @@
+import collections
+import sqlite3
+import threading
+import time
+from datetime import datetime
+import logging
+import CallHistory
+
+log = logging.getLogger('codi')
+
+# Calls placed from the CoDi are logged to history.sqlite from a background
+# thread. Events queue up and are written in batches, each batch in its own
+# short transaction so the history service is never locked out for long.
+MAX_BATCH = 32
+# A batch that failed (e.g. database locked) is retried this often
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 1
+
+INSERT = ('insert into voice_events (accountId, threadId, eventId, senderId, timestamp, '
+          'newEvent, duration, missed, remoteParticipant) values (?, ?, ?, ?, ?, ?, ?, ?, ?)')
+
+writer = None
+writerRunning = False
+writing = False
+queueCondition = threading.Condition()
+queue = collections.deque()
+stats = {'queued': 0, 'written': 0, 'batches': 0, 'retries': 0, 'dropped': 0}
+
+
+def logOutgoingCall(modem, msisdn):
+    now = datetime.now()
+    event = ('ofono/ofono/' + modem, msisdn, msisdn + now.strftime(':%a %b %d %H:%M:%S %Y'),
+             'self', datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.000Z'), 0, 4, 0, msisdn)
+    init()
+    with queueCondition:
+        queue.append(event)
+        stats['queued'] += 1
+        queueCondition.notify()
+
+
+def writeBatch(conn, events):
+    # The connection context manager commits, or rolls back on error
+    with conn:
+        conn.executemany(INSERT, events)
+
+
+def writeLoop():
+    global writing
+
+    conn = None
+    attempts = 0
+    while True:
+        with queueCondition:
+            while writerRunning and not queue:
+                queueCondition.wait()
+            if not queue:
+                break
+            events = [queue.popleft() for i in range(min(len(queue), MAX_BATCH))]
+            writing = True
+
+        try:
+            if conn is None:
+                conn = sqlite3.connect(CallHistory.HISTORY_DB, timeout=5)
+            writeBatch(conn, events)
+            stats['written'] += len(events)
+            stats['batches'] += 1
+            events = None
+            attempts = 0
+        except Exception as e:
+            log.error("Exception: %r", e)
+            attempts += 1
+
+        with queueCondition:
+            if events is not None:
+                if attempts < MAX_ATTEMPTS and writerRunning:
+                    stats['retries'] += 1
+                    queue.extendleft(reversed(events))
+                else:
+                    stats['dropped'] += len(events)
+                    attempts = 0
+            writing = False
+            queueCondition.notify_all()
+        if events is not None:
+            time.sleep(RETRY_DELAY)
+
+    if conn is not None:
+        conn.close()
+
+
+def init():
+    global writer
+    global writerRunning
+
+    with queueCondition:
+        if writer is not None and writer.is_alive():
+            return
+        writerRunning = True
+        writer = threading.Thread(target=writeLoop, daemon=True)
+        writer.start()
+
+
+def stop():
+    global writer
+    global writerRunning
+
+    with queueCondition:
+        writerRunning = False
+        queueCondition.notify_all()
+    if writer is not None:
+        writer.join(4)
+    writer = None
+
+
+def flush(timeout=None):
+    # Wait until everything queued so far has been written
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with queueCondition:
+        while writer is not None and (queue or writing):
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            queueCondition.wait(remaining)
+    return True
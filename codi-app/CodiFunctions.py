@@ -5,11 +5,16 @@ import logging
 import DBusServer
 from gi.repository import GLib
 import CodiStatus
+import DeviceSync
 import Addressbook
+import ContactSearch
+import CallHistory
+import CallLogWriter
+import HandlerExecutor
+import PageCache
 import codi_mtk_generated_functions as mtkCmd
 import LEDManager
-import sqlite3
-import getpass
+import PointerDevice
 
 tapHistory = False
 codi_version = None
@@ -43,43 +48,43 @@ def datetime_from_utc_to_local(utc_datetime):
 # ST32 calls these functions
 
 def GetBatteryLevel():
-    mtkCmd.BatteryLevelInfo(CodiStatus.DeviceInfo.batteryLevel)
+    DeviceSync.answer('batteryLevel')
 
 def GetDoNotDisturbStatus():
-    mtkCmd.DoNotDisturbStatusInfo(0)
+    DeviceSync.answer('doNotDisturb')
 
 def GetBTStatus():
-    mtkCmd.BTStatusInfo(0)
+    DeviceSync.answer('bluetooth')
 
 def GetWiFiStatus():
-    mtkCmd.WiFiStatusInfo(1, 100)
+    DeviceSync.answer('wifi')
 
 def GetLockStatus():
     # UNLOCKED        0
     # LOCK_PASSWORD   4
-    mtkCmd.LockStatusInfo(0, 4, '')
+    DeviceSync.answer('lock')
 
 def GetLocationStatus():
-    mtkCmd.LocationStatusInfo(0)
+    DeviceSync.answer('location')
 
 def GetFlightModeStatus():
-    mtkCmd.FlightModeStatusInfo(0)
+    DeviceSync.answer('flightMode')
 
 def GetHotspotStatus():
-    mtkCmd.HotspotStatusInfo(0)
+    DeviceSync.answer('hotspot')
 
-def GetVolumeLevel():
-    mtkCmd.VolumeLevelInfo(50)
+def GetVolumeLevel(stream):
+    DeviceSync.answerVolume(stream)
 
 def GetBatterySaverStatus():
-    mtkCmd.BatterySaverStatusInfo(0)
+    DeviceSync.answer('batterySaver')
 
 def GetMobileDataStatus():
-    mtkCmd.MobileDataStatusInfo(1)
+    DeviceSync.answer('mobileData')
 
 def GetModemSignalInfo():
     # sim1, sim2, sim2type
-    mtkCmd.ModemSignalInfo(100, 0, 0)
+    DeviceSync.answer('modemSignal')
 
 # def SetLock(status):
 #     LEDManager.ledsBlue()
@@ -98,25 +103,13 @@ def ActionCall(action, sim, line, numtype, msisdn, contact, contact_id):
     try:
         msisdn = str(msisdn, 'utf-8')
         if action == 0:
+            modem = 'ril_0'
             ril = DBusServer.ril0
             if sim == 2:
+                modem = 'ril_1'
                 ril = DBusServer.ril1
             ril.Dial(msisdn, '')
-            conn = sqlite3.connect('/home/'+getpass.getuser()+'/.local/share/history-service/history.sqlite')
-            try:
-                c = conn.cursor()
-                statement = 'insert into voice_events values ("ofono/ofono/ril_0", "' + msisdn + \
-                        '", "' + msisdn + datetime.now().strftime(':%a %b %d %H:%M:%S %Y') + \
-                        '", "self", "' + \
-                        datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.000Z') + \
-                        '", 0, 4, 0, "' + msisdn + '")'
-                # log.info(statement)
-                c.execute(statement)
-                conn.commit()
-                c.close()
-                conn.close()
-            except Exception as e:
-                log.error("Exception: %r", e)
+            CallLogWriter.logOutgoingCall(modem, msisdn)
         if action == 14:
             # log.info(dir(DBusServer.ril0['org.ofono.VoiceCallManager']))
             DBusServer.ril0['org.ofono.VoiceCallManager'].SwapCalls()
@@ -201,52 +194,58 @@ def CoDiOFF(par1, par2):
                 LEDManager.ledsOff()
 
 def GetCallHistory(index):
-    batchSize = 10
-    conn = sqlite3.connect('/home/'+getpass.getuser()+'/.local/share/history-service/history.sqlite')
-    try:
-        c = conn.cursor()
-        totalCdr = c.execute('select count(*) from voice_events').fetchall()[0][0]
-    except Exception as e:
-        log.error("Exception: %r", e)
-        totalCdr = 0
+    batchSize = CallHistory.PAGE_SIZE
+    totalCdr, frames = CallHistory.getPage(index)
 
-    try:
-        c = conn.cursor()
-        history = c.execute('select * from voice_events order by timestamp desc limit ' + str(batchSize) + ' offset ' + str(index)).fetchall()
-        for i in range(len(history)):
-            tod = history[i][4]
-            state = 1
-            if history[i][7] == 1:
-                state = 0
-            if history[i][3] == 'self':
-                state = 2
-            try:
-                dt = datetime.strptime(history[i][4][0:19], '%Y-%m-%dT%H:%M:%S')
-                dt = datetime_from_utc_to_local(dt)
-                # log.info(history[i])
-                # log.info(i, totalCdr, batchSize, history[i][1], history[i][1], dt.day, dt.month, dt.year, dt.hour, dt.minute, dt.second, 0, state)
-                mtkCmd.CallHistoryInfo(i, totalCdr, batchSize, Addressbook.contactNameForNumber(history[i][1]), history[i][1], dt.day, dt.month, dt.year, dt.hour, dt.minute, dt.second, 0, state)
-            except Exception as e:
-                log.error("Exception: %r", e)
-    except Exception as e:
-        log.error("Exception: %r", e)
+    log.info("-> CallHistoryInfo x%d", len(frames))
+    for frame in frames:
+        mtkCmd.sendFrame(frame, mtkCmd.CMD_MTK_CALL_HISTORY_INFO)
 
-    c.close()
-    conn.close()
+    # Read the next page while the CoDi shows this one
+    HandlerExecutor.submit('history', CallHistory.prefetch, (index + batchSize,))
+
+# Encoded ContactInfo pages, keyed by page index and contacts generation
+contactPages = PageCache.PageCache(256 * 1024)
 
 def GetContacts(index):
-    Addressbook.refreshContacts()
+    # Served from memory, a changed address book is reloaded in the background
+    Addressbook.checkForChanges()
+    # Read the generation first, a page built from newer contacts under an
+    # older generation is never asked for again
+    key = (index, Addressbook.generation)
+    contacts = CodiStatus.Contacts
     batch = 10
     if index == 100000:
         mtkCmd.ContactInfo('0', 0, 100000, '', '')
         return
 
-    if len(CodiStatus.Contacts) < index:
+    if len(contacts) < index:
         mtkCmd.ContactInfo('0', 0, batch, '', '')
         return
 
-    for c in CodiStatus.Contacts[index:index+batch]:
-        mtkCmd.ContactInfo(c[0], len(CodiStatus.Contacts), batch, c[1], c[2])
+    page = contactPages.get(key)
+    if page is None:
+        page = b''.join(mtkCmd.encodeContactInfo(c[0], len(contacts), batch, c[1], c[2])
+                        for c in contacts[index:index+batch])
+        contactPages.put(key, page)
+    if page:
+        log.info("-> ContactInfo page %d", index)
+        mtkCmd.sendFrame(page, mtkCmd.CMD_MTK_CONTACT_INFO)
+
+# The CoDi has no commands for these, they are called through the dbus
+# command of codiServer
+
+def SearchContacts(query, limit=10):
+    Addressbook.ensureLoaded()
+    Addressbook.checkForChanges()
+    frames = ContactSearch.render(ContactSearch.search(query, limit), limit)
+    log.info("-> ContactInfo search %r", query)
+    mtkCmd.sendFrame(b''.join(frames), mtkCmd.CMD_MTK_CONTACT_INFO)
+
+def GetContactsFromLetter(letter):
+    # The page starting with the first contact for letter
+    Addressbook.ensureLoaded()
+    GetContacts(Addressbook.indexForLetter(letter))
 
 tapHistory = False
 
@@ -254,7 +253,7 @@ def MouseInfo(mode, x_coord, y_coord):
     global tapHistory
 
     if tapHistory and mode == 2:
-            os.system('xdotool click 1')
+            PointerDevice.click()
             tapHistory = False
             return
 
@@ -288,11 +287,10 @@ def MouseInfo(mode, x_coord, y_coord):
     else:
         y_coord *= 2
 
-    x = str(-y_coord).replace('-', '\\-')
-    y = str(-x_coord).replace('-', '\\-')
-
-
     if mode == 0:
+        # Absolute positioning isn't something a relative pointer can do
+        x = str(-y_coord).replace('-', '\\-')
+        y = str(-x_coord).replace('-', '\\-')
         os.system('xdotool mousemove -- ' + x + ' ' + y)
     else:
-        os.system('xdotool mousemove_relative -- ' + x + ' ' + y)
+        PointerDevice.move(-y_coord, -x_coord)
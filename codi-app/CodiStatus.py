@@ -1,3 +1,4 @@
+import DeviceState
 
 class CallInfoClass:
     modemId = 0
@@ -6,9 +7,14 @@ class CallInfoClass:
     currentCall = None
     state = 'disconnected'
 
+def stateField(name):
+    return property(lambda self: DeviceState.get(name),
+                    lambda self, value: DeviceState.set(**{name: value}))
+
 class DeviceInfoClass:
-    batteryLevel = 0
-    lidClosed = True
+    # The values live in DeviceState
+    batteryLevel = stateField('batteryLevel')
+    lidClosed = stateField('lidClosed')
 
 def init():
     global DeviceInfo
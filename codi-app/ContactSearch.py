@@ -0,0 +1,130 @@
+import bisect
+import threading
+import re
+import CodiStatus
+import Addressbook
+import codi_mtk_generated_functions as mtkCmd
+
+# Search over the contacts for the dialer. Three sorted key arrays are kept,
+# each with a parallel array of positions in CodiStatus.Contacts:
+#  - names: the name from the start of every word, folded to plain lower case
+#  - t9: the same keys spelled as keypad digits
+#  - numbers: the digits of all numbers in one string for substring search
+# Prefix queries bisect to the first key and walk forward while it matches.
+# The index is rebuilt on the first search after the contacts changed.
+T9_KEYS = {}
+for digit, letters in (('2', 'abc'), ('3', 'def'), ('4', 'ghi'), ('5', 'jkl'),
+                       ('6', 'mno'), ('7', 'pqrs'), ('8', 'tuv'), ('9', 'wxyz')):
+    for letter in letters:
+        T9_KEYS[letter] = digit
+t9Table = str.maketrans(T9_KEYS)
+nonT9 = re.compile('[^2-9]')
+nonDigits = re.compile('[^0-9]')
+
+# Separates numbers in the digit string, never part of a digit query
+NUMBER_SEPARATOR = '/'
+
+lock = threading.Lock()
+indexGeneration = None
+contacts = []
+nameKeys = []
+namePositions = []
+t9Keys = []
+t9Positions = []
+numberDigits = ''
+numberStarts = []
+
+
+def wordKeys(name):
+    words = Addressbook.foldName(name).split()
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+
+def buildIndex(snapshot):
+    global contacts
+    global nameKeys
+    global namePositions
+    global t9Keys
+    global t9Positions
+    global numberDigits
+    global numberStarts
+
+    names = []
+    nameOwners = []
+    t9 = []
+    t9Owners = []
+    numbers = []
+    starts = []
+    offset = 0
+    # Contacts with several numbers share their name
+    keysByName = {}
+    for position, c in enumerate(snapshot):
+        keys = keysByName.get(c[1])
+        if keys is None:
+            words = wordKeys(c[1])
+            spelled = [nonT9.sub('', key.translate(t9Table)) for key in words]
+            keys = keysByName[c[1]] = (words, [d for d in spelled if d])
+        names += keys[0]
+        nameOwners += [position] * len(keys[0])
+        t9 += keys[1]
+        t9Owners += [position] * len(keys[1])
+        digits = nonDigits.sub('', c[2])
+        starts.append(offset)
+        numbers.append(digits)
+        offset += len(digits) + len(NUMBER_SEPARATOR)
+    nameOrder = sorted(range(len(names)), key=names.__getitem__)
+    t9Order = sorted(range(len(t9)), key=t9.__getitem__)
+
+    contacts = snapshot
+    nameKeys = [names[i] for i in nameOrder]
+    namePositions = [nameOwners[i] for i in nameOrder]
+    t9Keys = [t9[i] for i in t9Order]
+    t9Positions = [t9Owners[i] for i in t9Order]
+    numberDigits = NUMBER_SEPARATOR.join(numbers) + NUMBER_SEPARATOR
+    numberStarts = starts
+
+
+def prefixMatches(keys, positions, prefix, found, limit):
+    i = bisect.bisect_left(keys, prefix)
+    while i < len(keys) and len(found) < limit and keys[i].startswith(prefix):
+        found.setdefault(positions[i], None)
+        i += 1
+
+
+def numberMatches(digits, found, limit):
+    i = numberDigits.find(digits)
+    while i >= 0 and len(found) < limit:
+        found.setdefault(bisect.bisect_right(numberStarts, i) - 1, None)
+        i = numberDigits.find(digits, i + 1)
+
+
+def search(query, limit=10):
+    global indexGeneration
+
+    with lock:
+        if indexGeneration != Addressbook.generation:
+            # Read the generation first, see CodiFunctions.GetContacts
+            generation = Addressbook.generation
+            buildIndex(CodiStatus.Contacts)
+            indexGeneration = generation
+
+        # Dicts keep insertion order, used as an ordered set of positions
+        found = {}
+        digits = nonDigits.sub('', query)
+        if digits and digits == query.strip().lstrip('+').replace(' ', ''):
+            # Typed on the keypad: names spelled in T9, then numbers
+            prefixMatches(t9Keys, t9Positions, digits, found, limit)
+            numberMatches(digits, found, limit)
+        else:
+            prefix = ' '.join(Addressbook.foldName(query).split())
+            if prefix:
+                prefixMatches(nameKeys, namePositions, prefix, found, limit)
+        return [contacts[p] for p in found]
+
+
+def render(results, limit):
+    # Results as ContactInfo frames, a batch of limit like a contacts page.
+    # No results are answered like a page past the end.
+    if not results:
+        return [mtkCmd.encodeContactInfo('0', 0, limit, '', '')]
+    return [mtkCmd.encodeContactInfo(c[0], len(results), limit, c[1], c[2]) for c in results]
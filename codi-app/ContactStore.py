@@ -0,0 +1,106 @@
+import array
+
+
+class ContactView:
+    # One (uid, name, number) entry of a ContactStore, made on access
+
+    __slots__ = ('store', 'entry')
+
+    def __init__(self, store, entry):
+        self.store = store
+        self.entry = entry
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return tuple(self)[i]
+        if i < 0:
+            i += 3
+        if i == 0:
+            return self.store.uids[self.store.owners[self.entry]]
+        if i == 1:
+            return self.store.names[self.store.owners[self.entry]]
+        if i == 2:
+            return self.store.number(self.entry)
+        raise IndexError('contact index out of range')
+
+    def __len__(self):
+        return 3
+
+    def __iter__(self):
+        return iter(self.store.tuple(self.entry))
+
+    def __eq__(self, other):
+        try:
+            return self.store.tuple(self.entry) == tuple(other)
+        except TypeError:
+            return NotImplemented
+
+    def __hash__(self):
+        return hash(self.store.tuple(self.entry))
+
+    def __repr__(self):
+        return repr(self.store.tuple(self.entry))
+
+
+class ContactStore:
+    # Read-only sequence of (uid, name, number) entries stored by column.
+    # Each contact keeps its uid and name once. The numbers of all entries
+    # are concatenated into one UTF-8 string, cut by an array of end offsets,
+    # and an array maps every entry to its contact. Entries of one contact
+    # must be next to each other, as they are once sorted.
+
+    __slots__ = ('uids', 'names', 'owners', 'numbers', 'numberEnds')
+
+    def __init__(self, entries=()):
+        self.uids = []
+        self.names = []
+        self.owners = array.array('I')
+        self.numberEnds = array.array('I')
+        numbers = bytearray()
+        for uid, name, number in entries:
+            if not self.uids or self.uids[-1] != uid or self.names[-1] != name:
+                self.uids.append(uid)
+                self.names.append(name)
+            self.owners.append(len(self.uids) - 1)
+            numbers += number.encode()
+            self.numberEnds.append(len(numbers))
+        self.numbers = bytes(numbers)
+
+    def number(self, entry):
+        start = self.numberEnds[entry - 1] if entry else 0
+        return self.numbers[start:self.numberEnds[entry]].decode()
+
+    def tuple(self, entry):
+        owner = self.owners[entry]
+        return (self.uids[owner], self.names[owner], self.number(entry))
+
+    def __len__(self):
+        return len(self.owners)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [ContactView(self, entry) for entry in range(*i.indices(len(self.owners)))]
+        if i < 0:
+            i += len(self.owners)
+        if not 0 <= i < len(self.owners):
+            raise IndexError('contact index out of range')
+        return ContactView(self, i)
+
+    def __iter__(self):
+        for entry in range(len(self.owners)):
+            yield ContactView(self, entry)
+
+    def __eq__(self, other):
+        if isinstance(other, ContactStore):
+            return (self.numbers == other.numbers and self.numberEnds == other.numberEnds and
+                    self.owners == other.owners and self.uids == other.uids and
+                    self.names == other.names)
+        try:
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        except TypeError:
+            return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'ContactStore(%d contacts, %d numbers)' % (len(self.uids), len(self.owners))
@@ -1,15 +1,54 @@
 
+import time
 from pydbus import SystemBus, SessionBus
 from gi.repository import GLib
 import PropertyManager
 import LEDManager
+import Addressbook
+import DeviceState
 import codi_mtk_generated_functions as mtkCmd
 
 
+# Address book signals come in bursts when a sync job touches many contacts.
+# The reload waits until the signals have been quiet for a moment, but not
+# longer than ADDRESSBOOK_MAX_WAIT after the first one.
+ADDRESSBOOK_DEBOUNCE_MS = 500
+ADDRESSBOOK_MAX_WAIT = 3
+addressbookTimer = None
+addressbookFirstChange = None
+
+def contactsReloaded(change):
+    # The protocol only knows "reload everything" per list, so only tell
+    # the CoDi about the lists that actually look different now
+    if change is None:
+        return
+    if change.numbersRenamed:
+        mtkCmd.MTKDataChangeAlert(1, 0)
+    mtkCmd.MTKDataChangeAlert(0, 0)
+
+def addressbookSettled():
+    global addressbookTimer
+    global addressbookFirstChange
+
+    addressbookTimer = None
+    addressbookFirstChange = None
+    # Tell the CoDi once the new contacts are in place
+    Addressbook.refreshAsync(contactsReloaded)
+    return False
+
 def addressbookChanged(par1, par2, par3, par4, par5):
+    global addressbookTimer
+    global addressbookFirstChange
+
     print('AddressBook Changed')
-    mtkCmd.MTKDataChangeAlert(1, 0)
-    mtkCmd.MTKDataChangeAlert(0, 0)
+    now = time.monotonic()
+    if addressbookTimer is not None:
+        if now - addressbookFirstChange > ADDRESSBOOK_MAX_WAIT:
+            return
+        GLib.source_remove(addressbookTimer)
+    else:
+        addressbookFirstChange = now
+    addressbookTimer = GLib.timeout_add(ADDRESSBOOK_DEBOUNCE_MS, addressbookSettled)
 
 def init(startMainLoop=True):
     global bus
@@ -36,7 +75,7 @@ def init(startMainLoop=True):
 
     network = bus.get('org.freedesktop.NetworkManager')
     network.onPropertiesChanged = PropertyManager.networkPropertiesChanged
-    mtkCmd.WiFiStatusInfo(int(network.WirelessEnabled), 100)
+    DeviceState.set(wifi=(int(network.WirelessEnabled), 100))
 
     PropertyManager.init()
 
@@ -0,0 +1,82 @@
+import collections
+import threading
+import logging
+
+log = logging.getLogger('codi')
+
+# Device state shown on the CoDi, in one place. Every field has a type its
+# values are converted to. Each change that actually changes something
+# bumps the version, and the version of every field records when it last
+# changed. Subscribers are called with the changed fields and the new
+# version, outside the lock, on the thread that made the change.
+Field = collections.namedtuple('Field', 'type default')
+
+FIELDS = collections.OrderedDict([
+    ('batteryLevel', Field(int, 0)),
+    ('lidClosed', Field(bool, True)),
+    # status, signal
+    ('wifi', Field(tuple, (1, 100))),
+    ('bluetooth', Field(int, 0)),
+    ('doNotDisturb', Field(int, 0)),
+    # locked, method, data
+    ('lock', Field(tuple, (0, 4, ''))),
+    ('location', Field(int, 0)),
+    ('flightMode', Field(int, 0)),
+    ('hotspot', Field(int, 0)),
+    # level, stream
+    ('volume', Field(tuple, (50, 0))),
+    ('batterySaver', Field(int, 0)),
+    ('mobileData', Field(int, 1)),
+    # sim1, sim2, sim2type
+    ('modemSignal', Field(tuple, (100, 0, 0))),
+])
+
+lock = threading.Lock()
+version = 0
+values = {name: field.default for name, field in FIELDS.items()}
+versions = {name: 0 for name in FIELDS}
+subscribers = []
+
+
+def get(name):
+    return values[name]
+
+
+def snapshot():
+    with lock:
+        return version, dict(values)
+
+
+def changedSince(sinceVersion):
+    with lock:
+        return {name: values[name] for name, v in versions.items() if v > sinceVersion}
+
+
+def set(**changes):
+    global version
+
+    converted = {name: FIELDS[name].type(value) for name, value in changes.items()}
+    with lock:
+        changed = {name: value for name, value in converted.items() if values[name] != value}
+        if changed:
+            version += 1
+            values.update(changed)
+            for name in changed:
+                versions[name] = version
+        current = version
+
+    if changed:
+        for callback in subscribers:
+            try:
+                callback(changed, current)
+            except Exception as e:
+                log.error(e)
+    return current
+
+
+def subscribe(callback):
+    subscribers.append(callback)
+
+
+def unsubscribe(callback):
+    subscribers.remove(callback)
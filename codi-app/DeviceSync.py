@@ -0,0 +1,86 @@
+import threading
+import logging
+import DeviceState
+import codi_mtk_generated_functions as mtkCmd
+
+log = logging.getLogger('codi')
+
+# Keeps the CoDi in step with DeviceState. Each field the CoDi shows maps to
+# the Info frame that carries it. The protocol has no acknowledgements for
+# Info frames, so a value counts as acknowledged once it was queued for the
+# UART; after that only fields whose value differs are sent again. resync()
+# forgets everything, for when the CoDi (re)starts. The encoders are looked
+# up by name when sending, this module is imported while the MTK functions
+# are still being imported.
+FRAMES = {
+    'batteryLevel': 'encodeBatteryLevelInfo',
+    'wifi': 'encodeWiFiStatusInfo',
+    'bluetooth': 'encodeBTStatusInfo',
+    'doNotDisturb': 'encodeDoNotDisturbStatusInfo',
+    'lock': 'encodeLockStatusInfo',
+    'location': 'encodeLocationStatusInfo',
+    'flightMode': 'encodeFlightModeStatusInfo',
+    'hotspot': 'encodeHotspotStatusInfo',
+    'volume': 'encodeVolumeLevelInfo',
+    'batterySaver': 'encodeBatterySaverStatusInfo',
+    'mobileData': 'encodeMobileDataStatusInfo',
+    'modemSignal': 'encodeModemSignalInfo',
+}
+
+UNSENT = object()
+
+lock = threading.Lock()
+acknowledged = {}
+stats = {'sent': 0, 'suppressed': 0, 'answered': 0}
+
+
+def sendField(name, value):
+    # Must be called with lock held
+    encoder = getattr(mtkCmd, FRAMES[name])
+    args = value if isinstance(value, tuple) else (value,)
+    log.info("-> %s %r", name, value)
+    mtkCmd.sendFrame(encoder(*args), encoder.commandId)
+    acknowledged[name] = value
+
+
+def push():
+    # Sends every field the CoDi hasn't seen with its current value
+    with lock:
+        # Under the lock, so a push that saw older values can't send after
+        # one that saw newer ones
+        version, values = DeviceState.snapshot()
+        for name in FRAMES:
+            if acknowledged.get(name, UNSENT) != values[name]:
+                sendField(name, values[name])
+                stats['sent'] += 1
+            else:
+                stats['suppressed'] += 1
+
+
+def answer(name):
+    # The CoDi asked, so it gets the value even if it has seen it before
+    with lock:
+        sendField(name, DeviceState.get(name))
+        stats['answered'] += 1
+
+
+def answerVolume(stream):
+    # Asked for per stream, there is one level for all of them
+    with lock:
+        sendField('volume', (DeviceState.get('volume')[0], stream))
+        stats['answered'] += 1
+
+
+def resync():
+    with lock:
+        acknowledged.clear()
+    push()
+
+
+def stateChanged(changed, version):
+    if any(name in FRAMES for name in changed):
+        push()
+
+
+def init():
+    DeviceState.subscribe(stateChanged)
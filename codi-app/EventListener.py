@@ -1,32 +1,168 @@
+import os
+import socket
+import time
+import logging
 import evdev
 from evdev import InputDevice, categorize, ecodes
-import threading
+from gi.repository import GLib
 import DBusServer
 import PropertyManager
 
+log = logging.getLogger('codi')
+
+# The keypad is read on the GLib main loop, so key handlers run on the same
+# thread as the D-Bus callbacks. Autorepeat events of a held key are passed
+# on at most every REPEAT_INTERVAL seconds. When the keypad goes away it is
+# looked for again whenever the kernel announces a new input device.
+DEVICE_NAME = 'mtk-kpd'
+REPEAT_INTERVAL = 0.1
+# Wait for udev to set up the device node before opening it
+REDISCOVER_DELAY_MS = 500
+NETLINK_KOBJECT_UEVENT = 15
+
 dev = None
+source = None
+uevents = None
+ueventSource = None
+rediscoverTimer = None
+lastRepeat = {}
+stats = {'events': 0, 'forwarded': 0, 'repeatsDropped': 0, 'attached': 0}
+
+keys = {115: 'increase_volume', 114: 'decrease_volume'}
+
+
+def handleKey(code, value):
+    PropertyManager.volumeButtonPressed('EventListener', keys[code], value)
+
+
+def readEvents(fd, condition):
+    if condition & (GLib.IO_ERR | GLib.IO_HUP):
+        detach()
+        return False
+
+    now = time.monotonic()
+    try:
+        events = list(dev.read())
+    except BlockingIOError:
+        return True
+    except OSError as e:
+        log.error('%s gone: %r', DEVICE_NAME, e)
+        detach()
+        return False
 
-def readEvent():
+    # Only the last repeat of each key in a batch matters
+    repeats = {}
+    for event in events:
+        if event.type != ecodes.EV_KEY or event.code not in keys:
+            continue
+        stats['events'] += 1
+        if event.value == 2:
+            if event.code in repeats:
+                stats['repeatsDropped'] += 1
+            repeats[event.code] = event
+            continue
+        if event.code in repeats:
+            # Repeats before a release or a new press are stale
+            stats['repeatsDropped'] += 1
+            del repeats[event.code]
+        lastRepeat[event.code] = now
+        stats['forwarded'] += 1
+        handleKey(event.code, event.value)
+
+    for code, event in repeats.items():
+        if now - lastRepeat.get(code, 0) < REPEAT_INTERVAL:
+            stats['repeatsDropped'] += 1
+            continue
+        lastRepeat[code] = now
+        stats['forwarded'] += 1
+        handleKey(code, event.value)
+    return True
+
+
+def attach(device):
     global dev
-    for event in dev.read_loop():
-        # print(event)
-        if event.code == 115:
-            PropertyManager.volumeButtonPressed('EventListener', 'increase_volume', event.value)
-        if event.code == 114:
-            PropertyManager.volumeButtonPressed('EventListener', 'decrease_volume', event.value)
+    global source
 
+    dev = device
+    os.set_blocking(dev.fd, False)
+    source = GLib.io_add_watch(dev.fd, GLib.PRIORITY_DEFAULT,
+                               GLib.IO_IN | GLib.IO_ERR | GLib.IO_HUP, readEvents)
+    stats['attached'] += 1
+    print('Device', dev.name, 'found.')
 
-def init():
+
+def detach():
     global dev
+    global source
+
+    if source is not None:
+        GLib.source_remove(source)
+    if dev is not None:
+        try:
+            dev.close()
+        except Exception:
+            pass
+    dev = None
+    source = None
+    lastRepeat.clear()
+
 
+def discover():
     for path in evdev.list_devices():
         try:
             device = evdev.InputDevice(path)
-            if device.name == 'mtk-kpd':
-                print('Device', device.name, 'found.')
-                dev = InputDevice(device.path)
-                thread = threading.Thread(target=readEvent)
-                thread.start()
-                return
+            if device.name == DEVICE_NAME:
+                attach(InputDevice(device.path))
+                return True
+            device.close()
         except:
             pass
+    return False
+
+
+def rediscover():
+    global rediscoverTimer
+
+    rediscoverTimer = None
+    if dev is None:
+        discover()
+    return False
+
+
+def readUevents(fd, condition):
+    global rediscoverTimer
+
+    try:
+        data = uevents.recv(16384)
+    except BlockingIOError:
+        return True
+    except OSError as e:
+        log.error(e)
+        return True
+
+    # "ACTION@devpath\0KEY=value\0..."
+    fields = data.split(b'\0')
+    if dev is None and fields[0].startswith(b'add@') and b'SUBSYSTEM=input' in fields:
+        if rediscoverTimer is None:
+            rediscoverTimer = GLib.timeout_add(REDISCOVER_DELAY_MS, rediscover)
+    return True
+
+
+def watchUevents():
+    global uevents
+    global ueventSource
+
+    try:
+        uevents = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+        uevents.bind((0, 1))
+        uevents.setblocking(False)
+    except OSError as e:
+        log.error('No uevents, %s will not be found again if it goes away: %r', DEVICE_NAME, e)
+        uevents = None
+        return
+    ueventSource = GLib.io_add_watch(uevents.fileno(), GLib.PRIORITY_DEFAULT, GLib.IO_IN, readUevents)
+
+
+def init():
+    watchUevents()
+    discover()
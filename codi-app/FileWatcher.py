@@ -0,0 +1,150 @@
+import ctypes
+import ctypes.util
+import os
+import struct
+import logging
+from gi.repository import GLib
+
+log = logging.getLogger('codi')
+
+# Watches database files with inotify and tells subscribers when they
+# changed. The directories are watched rather than the files, so WAL files
+# coming and going and databases being replaced are seen too. Events within
+# COALESCE_MS are published as one notification per topic. Readers create
+# and close the side files too, so for those only writes count; every
+# commit writes to the database or its WAL.
+COALESCE_MS = 200
+
+IN_MODIFY = 0x00000002
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+SIDE_FILES = ('-wal', '-journal')
+
+event = struct.Struct('iIII')
+
+libc = None
+fd = None
+source = None
+watches = {}
+directories = {}
+subscribers = {}
+pendingTopics = set()
+timer = None
+stats = {'events': 0, 'notifications': 0}
+
+
+def init():
+    global libc
+    global fd
+    global source
+
+    if fd is not None:
+        return True
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+    except Exception as e:
+        log.error('inotify not available: %r', e)
+        fd = None
+        return False
+
+    source = GLib.io_add_watch(fd, GLib.PRIORITY_DEFAULT, GLib.IO_IN, onEvents)
+    for directory in list(directories):
+        addWatch(directory)
+    return True
+
+
+def stop():
+    global fd
+    global source
+    global timer
+
+    if source is not None:
+        GLib.source_remove(source)
+    if timer is not None:
+        GLib.source_remove(timer)
+    if fd is not None:
+        os.close(fd)
+    fd = None
+    source = None
+    timer = None
+    watches.clear()
+
+
+def addWatch(directory):
+    wd = libc.inotify_add_watch(fd, directory.encode(), WATCH_MASK)
+    if wd < 0:
+        log.error('Cannot watch %s: %s', directory, os.strerror(ctypes.get_errno()))
+        return
+    watches[wd] = directory
+
+
+def watch(path, topic):
+    # Changes to path and its SQLite side files are published as topic
+    directory, name = os.path.split(path)
+    names = directories.get(directory)
+    if names is None:
+        names = directories[directory] = {}
+        if fd is not None:
+            addWatch(directory)
+    for suffix in ('',) + SIDE_FILES:
+        names[name + suffix] = topic
+
+
+def subscribe(topic, callback):
+    subscribers.setdefault(topic, []).append(callback)
+
+
+def onEvents(fd, condition):
+    global timer
+
+    try:
+        data = os.read(fd, 64 * 1024)
+    except BlockingIOError:
+        return True
+
+    offset = 0
+    while offset < len(data):
+        wd, mask, cookie, length = event.unpack_from(data, offset)
+        offset += event.size
+        name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+        offset += length
+        stats['events'] += 1
+        if mask & IN_Q_OVERFLOW:
+            # Events were lost, assume everything changed
+            for names in directories.values():
+                pendingTopics.update(names.values())
+            continue
+        topic = directories.get(watches.get(wd), {}).get(name)
+        if topic is None or (name.endswith(SIDE_FILES) and not mask & IN_MODIFY):
+            continue
+        pendingTopics.add(topic)
+
+    if pendingTopics and timer is None:
+        timer = GLib.timeout_add(COALESCE_MS, publish)
+    return True
+
+
+def publish():
+    global timer
+
+    timer = None
+    topics = sorted(pendingTopics)
+    pendingTopics.clear()
+    for topic in topics:
+        stats['notifications'] += 1
+        log.info('%s changed', topic)
+        for callback in subscribers.get(topic, []):
+            try:
+                callback(topic)
+            except Exception as e:
+                log.error(e)
+    return False
@@ -0,0 +1,102 @@
+import struct
+import logging
+
+log = logging.getLogger('codi')
+
+MSG_HEADER = bytes.fromhex('58 21 58 21')
+HEADER_SIZE = 8
+# The body starts with the command and session ids
+MIN_MSG_SIZE = HEADER_SIZE + 8
+MAX_MSG_SIZE = 300
+
+_msgSize = struct.Struct('>I')
+
+
+class FrameReader:
+    # Frames are assembled in a preallocated buffer. Bytes are appended at
+    # 'end' and consumed from 'start'; the unread tail is moved back to the
+    # front only when there is no room left, so the common case never copies.
+
+    def __init__(self, capacity=4096):
+        self.buffer = bytearray(max(capacity, 2 * MAX_MSG_SIZE))
+        self.view = memoryview(self.buffer)
+        self.start = 0
+        self.end = 0
+        self.frames = 0
+        self.resyncs = 0
+        self.droppedBytes = 0
+        self.synced = True
+
+    def pending(self):
+        return self.end - self.start
+
+    def compact(self):
+        n = self.end - self.start
+        if n and self.start:
+            self.buffer[0:n] = self.buffer[self.start:self.end]
+        self.start = 0
+        self.end = n
+
+    def feed(self, data):
+        n = len(data)
+        if self.end + n > len(self.buffer):
+            self.compact()
+            if self.end + n > len(self.buffer):
+                # Caller handed us more than the buffer can ever hold, keep
+                # only what fits after the bytes already buffered.
+                skip = self.end + n - len(self.buffer)
+                self.droppedBytes += skip
+                data = memoryview(data)[skip:]
+                n -= skip
+        self.buffer[self.end:self.end + n] = data
+        self.end += n
+
+    def readFrom(self, socket):
+        n = socket.in_waiting
+        if n <= 0:
+            n = 1
+        n = min(n, len(self.buffer) - self.pending())
+        data = socket.read(n)
+        if data:
+            self.feed(data)
+        return len(data)
+
+    def resync(self, pos):
+        # Drop everything before pos, it can't be part of a valid frame.
+        dropped = pos - self.start
+        if dropped > 0:
+            if self.synced:
+                self.resyncs += 1
+                self.synced = False
+            self.droppedBytes += dropped
+            self.start = pos
+
+    def __iter__(self):
+        buffer = self.buffer
+        while True:
+            pos = buffer.find(MSG_HEADER, self.start, self.end)
+            if pos < 0:
+                # Keep the last bytes, they may be the start of a header.
+                self.resync(max(self.start, self.end - len(MSG_HEADER) + 1))
+                return
+            self.resync(pos)
+            if self.end - pos < HEADER_SIZE:
+                return
+            msgSize = _msgSize.unpack_from(buffer, pos + 4)[0]
+            if msgSize < MIN_MSG_SIZE or msgSize > MAX_MSG_SIZE:
+                log.error('[115200]Message length wrong, ignoring msg')
+                self.resync(pos + 1)
+                continue
+            if self.end - pos < msgSize:
+                return
+            self.start = pos + msgSize
+            self.frames += 1
+            self.synced = True
+            # The view is only valid until the next feed(), consumers must
+            # copy anything they want to keep.
+            yield self.view[pos + HEADER_SIZE:pos + msgSize]
+
+    def stats(self):
+        return {'frames': self.frames,
+                'resyncs': self.resyncs,
+                'droppedBytes': self.droppedBytes}
@@ -0,0 +1,98 @@
+import collections
+import concurrent.futures
+import threading
+import time
+import logging
+
+log = logging.getLogger('codi')
+
+# Handlers run on a small pool. Each category has its own queue which is
+# drained by at most one worker at a time, so handlers of one category run
+# in order while different categories never wait on each other.
+# One worker per category, so a busy category can't hold up a hang-up
+CATEGORIES = ('mouse', 'call', 'contacts', 'history', 'device')
+WORKERS = len(CATEGORIES)
+# Handlers run per turn before a busy category gives its worker back
+BATCH = 16
+
+lock = threading.Lock()
+executor = None
+queues = {}
+scheduled = set()
+metrics = {}
+
+
+def init():
+    global executor
+
+    if executor is None:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=WORKERS)
+
+
+def stop():
+    global executor
+
+    if executor is not None:
+        executor.shutdown(wait=False)
+    executor = None
+
+
+def submit(category, handler, args):
+    init()
+    with lock:
+        queue = queues.get(category)
+        if queue is None:
+            queue = queues[category] = collections.deque()
+            metrics[category] = {'handled': 0, 'maxDepth': 0, 'totalTime': 0.0,
+                                 'maxTime': 0.0, 'totalWait': 0.0}
+        queue.append((handler, args, time.monotonic()))
+        m = metrics[category]
+        m['maxDepth'] = max(m['maxDepth'], len(queue))
+        if category not in scheduled:
+            scheduled.add(category)
+            executor.submit(drain, category)
+
+
+def drain(category):
+    queue = queues[category]
+    m = metrics[category]
+    elapsed = None
+    handled = 0
+    while True:
+        with lock:
+            if elapsed is not None:
+                m['handled'] += 1
+                m['totalTime'] += elapsed
+                m['maxTime'] = max(m['maxTime'], elapsed)
+                m['totalWait'] += start - queuedAt
+            if not queue:
+                scheduled.discard(category)
+                return
+            if handled == BATCH and executor is not None:
+                # Let the other categories have a turn. Once stopped there
+                # is no pool to go back to, the queue is finished here.
+                executor.submit(drain, category)
+                return
+            handler, args, queuedAt = queue.popleft()
+
+        handled += 1
+        start = time.monotonic()
+        try:
+            handler(*args)
+        except Exception as e:
+            log.error(e)
+        elapsed = time.monotonic() - start
+
+
+def stats():
+    with lock:
+        result = {}
+        for category, m in metrics.items():
+            handled = max(m['handled'], 1)
+            result[category] = {'depth': len(queues[category]),
+                                'maxDepth': m['maxDepth'],
+                                'handled': m['handled'],
+                                'avgMs': m['totalTime'] * 1000 / handled,
+                                'maxMs': m['maxTime'] * 1000,
+                                'avgWaitMs': m['totalWait'] * 1000 / handled}
+        return result
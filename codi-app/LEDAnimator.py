@@ -0,0 +1,164 @@
+import collections
+import math
+import threading
+import time
+import logging
+from gi.repository import GLib
+import Addressbook
+import LEDManager
+
+log = logging.getLogger('codi')
+
+# Plays keyframed LED patterns from the GLib main loop. A pattern is a list
+# of (milliseconds, leds) frames, leds in the format of LEDManager.setLeds.
+# All running animations share one timer, which fires when the next frame
+# of any of them is due. Their frames are merged, the most recently started
+# animation winning per LED and color, and go through the diffing LED writer.
+# Without animations there is no timer at all.
+Pattern = collections.namedtuple('Pattern', 'frames loop')
+
+# Frames shorter than this are stretched
+MIN_FRAME_MS = 20
+
+lock = threading.Lock()
+animations = collections.OrderedDict()
+timer = None
+due = None
+activeSince = None
+stats = {'ticks': 0, 'written': 0, 'totalJitter': 0.0, 'maxJitter': 0.0, 'activeTime': 0.0}
+
+
+def blink(leds, onMs=500, offMs=500, loop=True):
+    off = {l: [[c[0], 0] for c in colors] for l, colors in leds.items()}
+    return Pattern(((onMs, leds), (offMs, off)), loop)
+
+
+def breathe(ledId, color, periodMs=2000, loop=True):
+    levels = list(range(8)) + list(range(6, 0, -1))
+    step = periodMs // len(levels)
+    return Pattern(tuple((step, {ledId: [[color, level]]}) for level in levels), loop)
+
+
+# Ring patterns for single contacts, by normalised number
+contactPatterns = {}
+RING = Pattern(((500, {2: [[1, 1], [2, 0], [3, 0]], 3: [[1, 0], [2, 1], [3, 0]]}),
+                (500, {2: [[1, 0], [2, 1], [3, 0]], 3: [[1, 1], [2, 0], [3, 0]]})), True)
+
+
+def setContactPattern(number, pattern):
+    with lock:
+        contactPatterns[Addressbook.normaliseNumber(number)] = pattern
+
+
+def ringPattern(number):
+    return contactPatterns.get(Addressbook.normaliseNumber(number), RING)
+
+
+def play(name, pattern):
+    # Replaces an animation of the same name
+    with lock:
+        animations.pop(name, None)
+        animations[name] = (pattern, time.monotonic())
+        schedule(0)
+
+
+def stop(name):
+    with lock:
+        if animations.pop(name, None) is not None and not animations:
+            cancel()
+
+
+def isPlaying(name):
+    return name in animations
+
+
+def schedule(delay):
+    # Must be called with lock held
+    global timer
+    global due
+    global activeSince
+
+    now = time.monotonic()
+    if timer is not None:
+        GLib.source_remove(timer)
+    elif activeSince is None:
+        activeSince = now
+    due = now + delay
+    # Rounded up, so the next frame is due when the timer fires
+    timer = GLib.timeout_add(math.ceil(delay * 1000), tick)
+
+
+def cancel():
+    # Must be called with lock held
+    global timer
+    global activeSince
+
+    if timer is not None:
+        GLib.source_remove(timer)
+    timer = None
+    if activeSince is not None:
+        stats['activeTime'] += time.monotonic() - activeSince
+    activeSince = None
+
+
+def frameAt(pattern, elapsed):
+    # The frame shown elapsed seconds into the pattern and the seconds until
+    # the next one, None when a pattern that doesn't loop is over
+    durations = [max(ms, MIN_FRAME_MS) / 1000 for ms, leds in pattern.frames]
+    total = sum(durations)
+    if elapsed >= total:
+        if not pattern.loop:
+            return None, None
+        elapsed %= total
+    for duration, (ms, leds) in zip(durations, pattern.frames):
+        if elapsed < duration:
+            return leds, duration - elapsed
+        elapsed -= duration
+    return pattern.frames[-1][1], durations[-1]
+
+
+def tick():
+    global timer
+
+    with lock:
+        timer = None
+        now = time.monotonic()
+        jitter = max(now - due, 0.0)
+        stats['ticks'] += 1
+        stats['totalJitter'] += jitter
+        stats['maxJitter'] = max(stats['maxJitter'], jitter)
+
+        merged = {}
+        wait = None
+        for name, (pattern, start) in list(animations.items()):
+            leds, remaining = frameAt(pattern, now - start)
+            if leds is None:
+                del animations[name]
+                continue
+            for ledId, colors in leds.items():
+                for color, enable in colors:
+                    merged.setdefault(ledId, {})[color] = enable
+            wait = remaining if wait is None else min(wait, remaining)
+
+        if merged:
+            written = LEDManager.stats['written']
+            LEDManager.setLeds({l: [[c, e] for c, e in colors.items()] for l, colors in merged.items()})
+            stats['written'] += LEDManager.stats['written'] - written
+
+        if wait is None:
+            cancel()
+        else:
+            schedule(wait)
+    return False
+
+
+def animationStats():
+    with lock:
+        active = stats['activeTime']
+        if activeSince is not None:
+            active += time.monotonic() - activeSince
+        ticks = max(stats['ticks'], 1)
+        return {'ticks': stats['ticks'],
+                'avgJitterMs': stats['totalJitter'] * 1000 / ticks,
+                'maxJitterMs': stats['maxJitter'] * 1000,
+                'writesPerSecond': stats['written'] / active if active else 0.0}
@@ -5,21 +5,98 @@
 4 - Keyboard backlight
 '''
 
+import os
+import threading
+
+# The last value written for every (ledId, color) is remembered and only
+# changes are written. The proc file stays open between writes. LED 4 has
+# no colors, it is keyed as (4, 0). setWriter() or setPath() redirect the
+# writes, e.g. to a file in tests.
+LED_PROC = '/proc/aw9524_led_proc'
+
+lock = threading.Lock()
+path = LED_PROC
+fd = None
+writer = None
+state = {}
+stats = {'requested': 0, 'written': 0, 'opens': 0}
+
+
+def procWrite(data):
+    global fd
+
+    if fd is None:
+        fd = os.open(path, os.O_WRONLY)
+        stats['opens'] += 1
+    try:
+        os.write(fd, data)
+    except OSError:
+        # Driver reloaded or descriptor gone bad, retry once on a fresh one
+        closeProc()
+        fd = os.open(path, os.O_WRONLY)
+        stats['opens'] += 1
+        os.write(fd, data)
+
+
+def closeProc():
+    global fd
+
+    if fd is not None:
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+    fd = None
+
+
+def setWriter(newWriter):
+    # newWriter(data) gets the bytes for one LED, None writes to the proc file
+    global writer
+
+    with lock:
+        writer = newWriter
+        state.clear()
+
+
+def setPath(newPath):
+    global path
+
+    with lock:
+        closeProc()
+        path = newPath
+        state.clear()
+
+
+def reset():
+    # Forget what was written, e.g. when the LEDs may have been changed
+    # behind our back
+    with lock:
+        state.clear()
+
+
 def setLeds(leds):
-    for l in leds.keys():
-        for c in leds[l]:
-            setLed(l, c[0], c[1])
+    with lock:
+        for l in leds.keys():
+            for c in leds[l]:
+                setLed(l, c[0], c[1])
 
 def setLed(ledId, color, enable):
+    # Must be called with lock held
     try:
         if ledId >=1 and ledId <=7 and \
           color >=1 and color <=3 and enable >=0 and enable <=7:
+            stats['requested'] += 1
+            key = (ledId, color)
             s = str(ledId) + str(color) + str(enable)
             if ledId == 4:
+                key = (ledId, 0)
                 s = str(ledId) + str(enable)
 
-            with open('/proc/aw9524_led_proc', 'w') as f:
-                f.write(s)
+            if state.get(key) == enable:
+                return
+            (writer or procWrite)(s.encode())
+            state[key] = enable
+            stats['written'] += 1
     except Exception as e:
         print(e)
 
@@ -0,0 +1,49 @@
+import collections
+import threading
+
+
+class PageCache:
+    # LRU cache of encoded pages, bounded by the total size of the pages
+
+    def __init__(self, maxBytes):
+        self.maxBytes = maxBytes
+        self.lock = threading.Lock()
+        self.pages = collections.OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            page = self.pages.get(key)
+            if page is None:
+                self.misses += 1
+                return None
+            self.pages.move_to_end(key)
+            self.hits += 1
+            return page
+
+    def put(self, key, page):
+        if len(page) > self.maxBytes:
+            return
+        with self.lock:
+            old = self.pages.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self.pages[key] = page
+            self.size += len(page)
+            while self.size > self.maxBytes:
+                key, old = self.pages.popitem(last=False)
+                self.size -= len(old)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.pages.clear()
+            self.size = 0
+
+    def stats(self):
+        with self.lock:
+            return {'pages': len(self.pages), 'bytes': self.size, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions}
@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+import logging
+import evdev
+from evdev import ecodes
+
+log = logging.getLogger('codi')
+
+# Pointer movement from the CoDi touchpad goes to a uinput relative pointer.
+# Motion arriving within one frame interval is summed up and emitted as a
+# single event. Without uinput access we fall back to xdotool.
+FRAME_INTERVAL = 1 / 60
+
+device = None
+thread = None
+isRunning = False
+condition = threading.Condition()
+pendingX = 0.0
+pendingY = 0.0
+pendingClicks = 0
+firstPending = None
+stats = {'moves': 0, 'clicks': 0, 'emitted': 0, 'totalLatency': 0.0, 'maxLatency': 0.0}
+
+
+def init():
+    global device
+    global thread
+    global isRunning
+
+    try:
+        device = evdev.UInput({ecodes.EV_REL: [ecodes.REL_X, ecodes.REL_Y],
+                               ecodes.EV_KEY: [ecodes.BTN_LEFT, ecodes.BTN_RIGHT]},
+                              name='codi-pointer')
+    except Exception as e:
+        log.error('uinput pointer not available, using xdotool: %r', e)
+        device = None
+        return False
+
+    isRunning = True
+    thread = threading.Thread(target=emitLoop, daemon=True)
+    thread.start()
+    return True
+
+
+def stop():
+    global device
+    global isRunning
+
+    with condition:
+        isRunning = False
+        condition.notify_all()
+    if thread is not None:
+        thread.join(1)
+    if device is not None:
+        device.close()
+    device = None
+
+
+def xdotool(args):
+    os.system('xdotool ' + args)
+
+
+def move(dx, dy):
+    global pendingX
+    global pendingY
+    global firstPending
+
+    if device is None:
+        x = str(dx).replace('-', '\\-')
+        y = str(dy).replace('-', '\\-')
+        xdotool('mousemove_relative -- ' + x + ' ' + y)
+        return
+
+    with condition:
+        stats['moves'] += 1
+        pendingX += dx
+        pendingY += dy
+        if firstPending is None:
+            firstPending = time.monotonic()
+        condition.notify()
+
+
+def click():
+    global pendingClicks
+    global firstPending
+
+    if device is None:
+        xdotool('click 1')
+        return
+
+    with condition:
+        stats['clicks'] += 1
+        pendingClicks += 1
+        if firstPending is None:
+            firstPending = time.monotonic()
+        condition.notify()
+
+
+def emitLoop():
+    global pendingX
+    global pendingY
+    global pendingClicks
+    global firstPending
+
+    while True:
+        with condition:
+            while isRunning and firstPending is None:
+                condition.wait()
+            if not isRunning:
+                return
+            # Keep the fractions for the next frame
+            dx = int(pendingX)
+            dy = int(pendingY)
+            pendingX -= dx
+            pendingY -= dy
+            clicks = pendingClicks
+            pendingClicks = 0
+            since = firstPending
+            firstPending = None
+
+        try:
+            if dx:
+                device.write(ecodes.EV_REL, ecodes.REL_X, dx)
+            if dy:
+                device.write(ecodes.EV_REL, ecodes.REL_Y, dy)
+            for i in range(clicks):
+                device.write(ecodes.EV_KEY, ecodes.BTN_LEFT, 1)
+                device.syn()
+                device.write(ecodes.EV_KEY, ecodes.BTN_LEFT, 0)
+            device.syn()
+        except Exception as e:
+            log.error(e)
+
+        latency = time.monotonic() - since
+        with condition:
+            stats['emitted'] += 1
+            stats['totalLatency'] += latency
+            stats['maxLatency'] = max(stats['maxLatency'], latency)
+
+        # Whatever arrives while we sleep is merged into the next event
+        time.sleep(FRAME_INTERVAL)
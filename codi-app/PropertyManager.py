@@ -4,6 +4,9 @@ import CodiStatus
 import codi_mtk_generated_functions as mtkCmd
 import CodiFunctions as cf
 import LEDManager
+import LEDAnimator
+import BatteryMonitor
+import DeviceState
 import subprocess
 import Addressbook
 
@@ -51,16 +54,11 @@ def propertiesChanged(sender, property, data):
                 mtkCmd.SetCoDiStatus(1, 7, 1)
                 LEDManager.ledsOff()
                 mtkCmd.SetMouse(1, 1)
-    if 'Energy' in property and 'EnergyFull' in property:
-        energy = property['Energy']
-        eFull = property['EnergyFull']
-        DeviceInfo.batteryLevel = int(energy * 100 / eFull)
-        cf.GetBatteryLevel()
-        LEDManager.ledsCharging(DBusServer.power.State == 1)
+    BatteryMonitor.propertiesChanged(property)
 
 def networkPropertiesChanged(properties):
     log.info('<= %r', properties)
-    mtkCmd.WiFiStatusInfo(int(DBusServer.network.WirelessEnabled), 100)
+    DeviceState.set(wifi=(int(DBusServer.network.WirelessEnabled), 100))
 
 def propertyChanged(property, value):
     log.info('<=', property, value)
@@ -69,6 +67,8 @@ def propertyChanged(property, value):
         mtkCmd.CallMuteStatusInfo(1)
     if property == 'State':
         CallInfo.state = value
+        if value in ('active', 'disconnected'):
+            LEDAnimator.stop('call')
         if value == 'active':
             mtkCmd.CallInfo(CallInfo.modemId, 2, '0', CallInfo.contactName, CallInfo.msisdn, 0)
         if value == 'disconnected':
@@ -95,7 +95,7 @@ def callStatusChanged(sender, data=None):
             CallInfo.msisdn = data['LineIdentification']
             if CallInfo.contactName == '':
                 CallInfo.contactName = Addressbook.contactNameForNumber(CallInfo.msisdn)
-            LEDManager.ledsIncomingCall()
+            LEDAnimator.play('call', LEDAnimator.ringPattern(CallInfo.msisdn))
             if data['State'] == 'incoming':
                 mtkCmd.CallInfo(CallInfo.modemId, 1, '0', CallInfo.contactName, CallInfo.msisdn, 0)
             else:
@@ -0,0 +1,93 @@
+import concurrent.futures
+import threading
+import time
+import logging
+
+log = logging.getLogger('codi')
+
+# Session id 1 is what unsolicited frames use, requests get their own ids
+FIRST_SESSION_ID = 2
+MAX_SESSION_ID = 0xffffffff
+# Requests nobody answered are failed after this many seconds. Callers that
+# give up earlier cancel the future, which drops the request right away.
+MAX_AGE = 30
+
+lock = threading.Lock()
+lastSessionId = FIRST_SESSION_ID - 1
+pending = {}
+waiting = {}
+latency = {}
+
+
+def nextSessionId():
+    global lastSessionId
+
+    with lock:
+        lastSessionId += 1
+        if lastSessionId > MAX_SESSION_ID:
+            lastSessionId = FIRST_SESSION_ID
+        return lastSessionId
+
+
+def register(commandId, replyId):
+    sessionId = nextSessionId()
+    future = concurrent.futures.Future()
+    with lock:
+        expire()
+        pending[sessionId] = (future, commandId, replyId, time.monotonic())
+        waiting[replyId] = waiting.get(replyId, 0) + 1
+    return sessionId, future
+
+
+def forget(sessionId):
+    # Must be called with lock held
+    future, commandId, replyId, sent = pending.pop(sessionId)
+    waiting[replyId] -= 1
+    if waiting[replyId] == 0:
+        del waiting[replyId]
+    return future, commandId, sent
+
+
+def expire():
+    # Must be called with lock held
+    now = time.monotonic()
+    for sessionId in [s for s, p in pending.items() if p[0].cancelled() or now - p[3] > MAX_AGE]:
+        future, commandId, sent = forget(sessionId)
+        if not future.cancelled():
+            future.set_exception(concurrent.futures.TimeoutError('No reply to command %r' % commandId))
+
+
+def isExpected(replyId):
+    with lock:
+        expire()
+        return replyId in waiting
+
+
+def resolve(replyId, sessionId, args):
+    with lock:
+        expire()
+        if replyId not in waiting:
+            return False
+        p = pending.get(sessionId)
+        if p is None or p[2] != replyId:
+            # The CoDi doesn't always echo the session id, fall back to the
+            # oldest request waiting for this reply
+            sessionId = min((s for s, p in pending.items() if p[2] == replyId),
+                            key=lambda s: pending[s][3])
+        future, commandId, sent = forget(sessionId)
+        elapsed = time.monotonic() - sent
+        stats = latency.setdefault(commandId, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] = max(stats[2], elapsed)
+
+    log.debug('Reply %r for session %r after %.1f ms', replyId, sessionId, elapsed * 1000)
+    if not future.cancelled():
+        future.set_result(args)
+    return True
+
+
+def latencyStats():
+    with lock:
+        return {c: {'count': s[0], 'avgMs': s[1] * 1000 / s[0], 'maxMs': s[2] * 1000}
+                for c, s in latency.items()}
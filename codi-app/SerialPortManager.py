@@ -1,8 +1,10 @@
 import serial
-import struct
 import threading
+import collections
 import time
 import logging
+import FrameReader
+import HandlerExecutor
 import codi_st32_generated_functions as st32Cmd
 
 log = logging.getLogger('codi')
@@ -10,10 +12,24 @@ isRunning = True
 socket = None
 thread = None
 lock = threading.Lock()
+reader = None
+
+# Outbound frames are written by a single writer thread. Frames with a key
+# replace a queued frame with the same key, urgent frames skip the queue.
+MAX_BATCH = 1024
+writer = None
+writerRunning = False
+writing = False
+queueCondition = threading.Condition()
+urgentQueue = collections.deque()
+outQueue = collections.deque()
+queuedByKey = {}
+writerStats = {'queued': 0, 'coalesced': 0, 'writes': 0, 'bytes': 0}
 
 def init():
     global socket
     global thread
+    startWriter()
     try:
         socket = serial.Serial('/dev/ttyS1', baudrate=115200)
 
@@ -27,6 +43,9 @@ def stop():
     global socket
     global thread
 
+    flush(2)
+    stopWriter()
+    HandlerExecutor.stop()
     isRunning = False
     socket.cancel_read()
     time.sleep(0.1)
@@ -40,6 +59,7 @@ def get_socket():
     global thread
     global inUpload
 
+    flush(2)
     isRunning = False
     inUpload = False
     if socket is not None:
@@ -52,35 +72,122 @@ def get_socket():
 def readFromSerial():
     global socket
     global isRunning
+    global reader
 
-    msgHeader = bytes.fromhex('58 21 58 21')
+    reader = FrameReader.FrameReader()
     log.info('[115200]Listening...')
     while isRunning:
-        header = socket.read_until(msgHeader, size=300)
-        # print('[115200]Found header', header)
-
-        # Read Size
-        if len(header) >= 4 and isRunning and header[0:4] == msgHeader:
-            msgSize = struct.unpack('>I', socket.read(4))[0]
-            # print('[115200]Found message size', msgSize)
-            if msgSize <= 300 and isRunning:
-                msg = socket.read(msgSize-8)
+        try:
+            reader.readFrom(socket)
+        except Exception as e:
+            if isRunning:
+                log.error(e)
+            break
+        if not isRunning:
+            break
+        for msg in reader:
+            try:
                 st32Cmd.readMessage(msg)
-            else:
-                if isRunning:
-                    log.error('[115200]Message length wrong, ignoring msg')
-
-
-def sendCommand(cmd):
+            except Exception as e:
+                # One bad message must not stop the reader
+                log.error(e)
+
+
+def sendCommand(cmd, key=None, urgent=False):
+    if not isinstance(cmd, bytes):
+        cmd = bytes(cmd)
+
+    with queueCondition:
+        writerStats['queued'] += 1
+        if urgent:
+            urgentQueue.append(cmd)
+        elif key is not None and key in queuedByKey:
+            queuedByKey[key][1] = cmd
+            writerStats['coalesced'] += 1
+        else:
+            entry = [key, cmd]
+            outQueue.append(entry)
+            if key is not None:
+                queuedByKey[key] = entry
+        queueCondition.notify_all()
+
+
+def nextBatch():
+    frames = []
+    size = 0
+    while urgentQueue and (size < MAX_BATCH or not frames):
+        frames.append(urgentQueue.popleft())
+        size += len(frames[-1])
+    while outQueue and (size < MAX_BATCH or not frames):
+        key, cmd = outQueue.popleft()
+        if key is not None:
+            del queuedByKey[key]
+        frames.append(cmd)
+        size += len(cmd)
+    return frames
+
+
+def writeToSerial():
     global socket
     global lock
-
-    try:
-        lock.acquire()
-        socket.write(cmd)
-        lock.release()
-    except Exception as e:
-        log.error(e)
+    global writing
+
+    while True:
+        with queueCondition:
+            while writerRunning and not urgentQueue and not outQueue:
+                queueCondition.wait()
+            if not writerRunning and not urgentQueue and not outQueue:
+                return
+            frames = nextBatch()
+            writing = True
+
+        data = b''.join(frames)
+        try:
+            with lock:
+                socket.write(data)
+            writerStats['writes'] += 1
+            writerStats['bytes'] += len(data)
+        except Exception as e:
+            log.error(e)
+
+        with queueCondition:
+            writing = False
+            queueCondition.notify_all()
+
+
+def startWriter():
+    global writer
+    global writerRunning
+
+    if writer is not None and writer.is_alive():
+        return
+    writerRunning = True
+    writer = threading.Thread(target=writeToSerial, daemon=True)
+    writer.start()
+
+
+def stopWriter():
+    global writer
+    global writerRunning
+
+    with queueCondition:
+        writerRunning = False
+        queueCondition.notify_all()
+    if writer is not None:
+        writer.join(4)
+    writer = None
+
+
+def flush(timeout=None):
+    # Wait until everything queued so far has been handed to the port
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with queueCondition:
+        while writer is not None and (urgentQueue or outQueue or writing):
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            queueCondition.wait(remaining)
+    return True
 
 
 def uploadReadFromSerial():
@@ -102,6 +209,7 @@ def switchToUploadMode():
     global isRunning
 
     try:
+        flush(2)
         isRunning = False
         if socket is not None:
             socket.cancel_read()
@@ -125,6 +233,7 @@ def switchToCmdMode():
     global isRunning
 
     try:
+        flush(2)
         isRunning = False
         if socket is not None:
             socket.cancel_read()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# Resolves 10k caller numbers against a synthetic 20k contact address book
+# with the old linear scan and with the number index.
+import random
+import time
+import CodiStatus
+import Addressbook
+
+
+def linearNameForNumber(number):
+    for c in CodiStatus.Contacts:
+        if c[2] == number:
+            return c[1]
+    return 'Unknown'
+
+
+def syntheticContacts(count):
+    rnd = random.Random(1)
+    contacts = []
+    for i in range(count):
+        number = '+44 7%03d %06d' % (rnd.randint(0, 999), rnd.randint(0, 999999))
+        contacts.append(('uid-%d' % i, 'Contact %d' % i, number))
+    return contacts
+
+
+def callerNumbers(contacts, count):
+    rnd = random.Random(2)
+    numbers = []
+    for i in range(count):
+        n = rnd.choice(contacts)[2]
+        r = rnd.random()
+        if r < 0.3:
+            n = '0' + n[4:].replace(' ', '')
+        elif r < 0.6:
+            n = n.replace(' ', '')
+        elif r < 0.8:
+            n = '+44 7999 %06d' % i
+        numbers.append(n)
+    return numbers
+
+
+def run(name, fn, numbers):
+    t = time.perf_counter()
+    found = sum(1 for n in numbers if fn(n) != 'Unknown')
+    t = time.perf_counter() - t
+    print('%-7s %6d lookups %9.1f ms %10.0f lookups/s %6d found' %
+          (name, len(numbers), t * 1000, len(numbers) / t, found))
+
+
+if __name__ == '__main__':
+    contacts = syntheticContacts(20000)
+    numbers = callerNumbers(contacts, 10000)
+    t = time.perf_counter()
+    Addressbook.setContacts(contacts)
+    print('index built in %.1f ms' % ((time.perf_counter() - t) * 1000))
+    run('linear', linearNameForNumber, numbers)
+    run('index', Addressbook.contactNameForNumber, numbers)
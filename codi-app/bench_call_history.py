@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# History pages rendered per second from a synthetic 20k-row history.sqlite
+# and 5k contacts: the old per-row lookup, strptime and offset computation
+# against CallHistory's batched rendering. Pages are walked front to back.
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+import bench_support
+
+bench_support.stubHandlers()
+import Addressbook
+import CallHistory
+import codi_mtk_generated_functions as mtkCmd
+
+
+def datetime_from_utc_to_local(utc_datetime):
+    now_timestamp = time.time()
+    offset = datetime.fromtimestamp(now_timestamp) - datetime.utcfromtimestamp(now_timestamp)
+    return utc_datetime + offset
+
+
+def legacyRender(totalCdr, history):
+    batchSize = CallHistory.PAGE_SIZE
+    frames = []
+    for i in range(len(history)):
+        state = 1
+        if history[i][7] == 1:
+            state = 0
+        if history[i][3] == 'self':
+            state = 2
+        dt = datetime.strptime(history[i][4][0:19], '%Y-%m-%dT%H:%M:%S')
+        dt = datetime_from_utc_to_local(dt)
+        frames.append(mtkCmd.encodeCallHistoryInfo(i, totalCdr, batchSize, Addressbook.contactNameForNumber(history[i][1]),
+                                                   history[i][1], dt.day, dt.month, dt.year, dt.hour, dt.minute,
+                                                   dt.second, 0, state))
+    return frames
+
+
+def createDb(path, count, numbers):
+    rnd = random.Random(1)
+    conn = sqlite3.connect(path)
+    conn.execute('create table voice_events (accountId, threadId, eventId, senderId, timestamp, '
+                 'newEvent, duration, missed, remoteParticipant)')
+    rows = []
+    t = 1577836800
+    for i in range(count):
+        t += rnd.randint(60, 3 * 3600)
+        number = rnd.choice(numbers)
+        rows.append(('ofono/ofono/ril_0', number, '%s:%d' % (number, i), rnd.choice(['self', number]),
+                     time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(t)),
+                     0, rnd.randint(0, 600), int(rnd.random() < 0.2), number))
+    conn.executemany('insert into voice_events values (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+    conn.commit()
+    conn.close()
+
+
+def walk(render, pages):
+    t = time.perf_counter()
+    frames = 0
+    for index in range(0, pages * CallHistory.PAGE_SIZE, CallHistory.PAGE_SIZE):
+        with CallHistory.lock:
+            CallHistory.checkForChanges()
+            frames += len(render(CallHistory.fetchPage(index)))
+    return pages / (time.perf_counter() - t), frames
+
+
+if __name__ == '__main__':
+    rnd = random.Random(2)
+    contacts = [('uid-%d' % i, 'Contact %d' % i, '+44 7%03d %06d' % (rnd.randint(0, 999), rnd.randint(0, 999999)))
+                for i in range(5000)]
+    Addressbook.setContacts(contacts)
+    numbers = [c[2].replace(' ', '') for c in contacts[:3000]] + ['+1555%07d' % i for i in range(1000)]
+    with tempfile.TemporaryDirectory() as d:
+        CallHistory.HISTORY_DB = os.path.join(d, 'history.sqlite')
+        createDb(CallHistory.HISTORY_DB, 20000, numbers)
+        # Rendering only, without the page query
+        with CallHistory.lock:
+            CallHistory.checkForChanges()
+            rows = CallHistory.fetchPage(0)
+        # Frames only match in time zones without DST, the legacy path applies
+        # today's offset to every row
+        assert len(legacyRender(CallHistory.totalCount, rows)) == len(CallHistory.render(rows))
+        for name, render in (('legacy', lambda rows: legacyRender(CallHistory.totalCount, rows)),
+                             ('batched', CallHistory.render)):
+            t = time.perf_counter()
+            for i in range(2000):
+                render(rows)
+            print('%-8s render only  %10.0f pages/s' % (name, 2000 / (time.perf_counter() - t)))
+        for name, render in (('legacy', lambda rows: legacyRender(CallHistory.totalCount, rows)),
+                             ('batched', CallHistory.render)):
+            rate, frames = walk(render, 200)
+            print('%-8s query+render %10.0f pages/s (%d frames)' % (name, rate, frames))
+        CallHistory.close()
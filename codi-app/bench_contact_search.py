@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# Query latency of ContactSearch over a synthetic 20k contact address book,
+# for name prefixes, T9 digit sequences and number substrings.
+import random
+import time
+import bench_support
+
+bench_support.stubHandlers()
+import Addressbook
+import ContactSearch
+
+FIRST = ['James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Michael', 'Linda', 'Zoë',
+         'Élodie', 'Søren', 'Anna-Maria', 'Mohammed', 'Wei', 'Olga', 'Kwame']
+LAST = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'García', 'Miller', 'Davis', 'Müller',
+        'Nguyen', 'Kowalski', 'Rossi', 'Dubois', 'Tanaka', 'Okafor', 'Silva']
+
+
+def syntheticContacts(count):
+    rnd = random.Random(1)
+    contacts = []
+    for i in range(count):
+        name = '%s %s %d' % (rnd.choice(FIRST), rnd.choice(LAST), i)
+        for n in range(rnd.randint(1, 2)):
+            contacts.append(('uid-%d' % i, name, '+44 7%03d %06d' % (rnd.randint(0, 999), rnd.randint(0, 999999))))
+    return contacts
+
+
+if __name__ == '__main__':
+    Addressbook.setContacts(syntheticContacts(20000))
+    t = time.perf_counter()
+    ContactSearch.search('')
+    print('index built in %.1f ms' % ((time.perf_counter() - t) * 1000))
+    queries = ['j', 'jo', 'joh', 'john s', 'mül', 'zoe', 'smith 1', 'okafor 19', 'xq',
+               '5', '56', '5646', '76484', '9999', '7700', '0123', '+44 7123 45']
+    print('%-10s %8s %10s %10s' % ('query', 'matches', 'avg us', 'max us'))
+    worst = 0.0
+    for q in queries:
+        times = []
+        for i in range(200):
+            t = time.perf_counter()
+            matches = ContactSearch.search(q, 10)
+            times.append(time.perf_counter() - t)
+        worst = max(worst, sum(times) / len(times))
+        print('%-10s %8d %10.1f %10.1f' % (q, len(matches), sum(times) / len(times) * 1e6, max(times) * 1e6))
+    print('slowest query on average %.3f ms' % (worst * 1000))
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# Resident memory of the contact list for 10k, 50k and 100k synthetic
+# contacts with one to four numbers each: a list of (uid, name, number)
+# tuples against the ContactStore. Each case runs in its own process.
+import random
+import subprocess
+import sys
+import ContactStore
+
+
+def rss():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+
+
+def syntheticEntries(count):
+    # Strings built per contact like readContacts does, shared by its numbers
+    rnd = random.Random(1)
+    for i in range(count):
+        uid = 'pas-id-%016X' % rnd.getrandbits(64)
+        name = 'Contact %d %s' % (i, rnd.choice(['Smith', 'Jones', 'Brown', 'García']))
+        for n in range(rnd.randint(1, 4)):
+            yield (uid, name, '+44 7%03d %06d' % (rnd.randint(0, 999), rnd.randint(0, 999999)))
+
+
+def measure(kind, count):
+    before = rss()
+    if kind == 'tuples':
+        contacts = list(syntheticEntries(count))
+    else:
+        contacts = ContactStore.ContactStore(syntheticEntries(count))
+    return len(contacts), rss() - before
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3:
+        numbers, used = measure(sys.argv[1], int(sys.argv[2]))
+        print(numbers, used)
+        sys.exit(0)
+    print('%8s %8s %12s %12s %6s' % ('contacts', 'numbers', 'tuples MiB', 'store MiB', 'x'))
+    for count in (10000, 50000, 100000):
+        results = {}
+        for kind in ('tuples', 'store'):
+            out = subprocess.check_output([sys.executable, __file__, kind, str(count)]).split()
+            results[kind] = (int(out[0]), int(out[1]))
+        numbers = results['tuples'][0]
+        tuples = results['tuples'][1] / 2**20
+        store = results['store'][1] / 2**20
+        print('%8d %8d %12.1f %12.1f %6.1f' % (count, numbers, tuples, store, tuples / store))
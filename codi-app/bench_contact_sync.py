@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# Serial bytes sent to the CoDi per address-book edit, before and after the
+# delta sync. The CoDi is modelled as reloading every contacts page after a
+# contacts alert and HISTORY_PAGES call history pages after a history alert.
+# Before, every address-book signal sent both alerts; now signals within the
+# debounce window lead to one reload, and alerts only go out for the lists
+# that look different.
+import random
+
+import bench_support
+
+bench_support.stubHandlers()
+import Addressbook
+import codi_mtk_generated_functions as mtkCmd
+
+HISTORY_PAGES = 5
+PAGE = 10
+
+
+def contactPagesBytes(contacts):
+    return sum(len(mtkCmd.encodeContactInfo(c[0], len(contacts), PAGE, c[1], c[2])) for c in contacts)
+
+
+def historyBytes(contacts):
+    rnd = random.Random(3)
+    total = 0
+    for i in range(HISTORY_PAGES * PAGE):
+        number = rnd.choice(contacts)[2]
+        total += len(mtkCmd.encodeCallHistoryInfo(i % PAGE, 1000, PAGE, Addressbook.contactNameForNumber(number),
+                                                  number, 1, 1, 2021, 12, 0, 0, 0, 1))
+    return total
+
+
+def alertBytes():
+    return len(mtkCmd.encodeMTKDataChangeAlert(0, 0))
+
+
+def legacyBytes(contacts, signals):
+    # Both alerts for every signal, each followed by a full reload
+    Addressbook.setContacts(contacts)
+    return signals * (2 * alertBytes() + contactPagesBytes(contacts) + historyBytes(contacts))
+
+
+def deltaBytes(contacts):
+    # One reload per burst, mirrors DBusServer.contactsReloaded
+    change = Addressbook.setContacts(contacts)
+    if change is None:
+        return 0
+    sent = alertBytes() + contactPagesBytes(contacts)
+    if change.numbersRenamed:
+        sent += alertBytes() + historyBytes(contacts)
+    return sent
+
+
+def syntheticContacts(count):
+    rnd = random.Random(1)
+    return [('uid-%d' % i, 'Contact %d' % i, '+44 7%03d %06d' % (rnd.randint(0, 999), rnd.randint(0, 999999)))
+            for i in range(count)]
+
+
+def renamed(contacts, uids):
+    return [(c[0], c[1] + ' (work)', c[2]) if c[0] in uids else c for c in contacts]
+
+
+if __name__ == '__main__':
+    base = syntheticContacts(2000)
+    scenarios = [
+        ('rename one contact', lambda: renamed(base, {'uid-7'}), 1),
+        ('edit e-mail only', lambda: list(base), 1),
+        ('add a contact', lambda: base + [('uid-new', 'New', '+44 7999 000000')], 1),
+        ('sync job, 500 signals', lambda: renamed(base, {'uid-%d' % i for i in range(5)}), 500),
+    ]
+    print('%-24s %14s %14s' % ('edit', 'before bytes', 'after bytes'))
+    for name, edit, signals in scenarios:
+        Addressbook.setContacts(base)
+        before = legacyBytes(edit(), signals)
+        Addressbook.setContacts(base)
+        after = deltaBytes(edit())
+        print('%-24s %14d %14d' % (name, before, after))
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# Replays a recorded serial byte stream through the old read_until based
+# reader and the FrameReader ring buffer.
+#
+#   bench_frame_reader.py [capture.bin]
+#
+# Without a capture file a clean stream of MouseInfo frames and the same
+# stream with some line noise are generated. Note that the old reader never
+# regains sync once noise lands in front of a header.
+import random
+import struct
+import sys
+import time
+import FrameReader
+
+
+class ReplaySocket:
+    def __init__(self, data, chunk):
+        self.data = data
+        self.pos = 0
+        self.chunk = chunk
+        self.available = 0
+        self.reads = 0
+
+    def arrive(self):
+        # Bytes trickle in from the UART in chunks
+        self.available = min(len(self.data) - self.pos, self.available + self.chunk)
+
+    @property
+    def in_waiting(self):
+        self.arrive()
+        return self.available
+
+    def read(self, size=1):
+        self.reads += 1
+        self.arrive()
+        size = min(size, len(self.data) - self.pos)
+        out = self.data[self.pos:self.pos + size]
+        self.pos += size
+        self.available = max(0, self.available - size)
+        return out
+
+    def read_until(self, expected, size=None):
+        self.reads += 1
+        end = self.data.find(expected, self.pos)
+        end = len(self.data) if end < 0 else end + len(expected)
+        if size is not None:
+            end = min(end, self.pos + size)
+        out = self.data[self.pos:end]
+        self.pos = end
+        return out
+
+    def done(self):
+        return self.pos >= len(self.data)
+
+
+def oldReader(socket, handle):
+    msgHeader = bytes.fromhex('58 21 58 21')
+    while not socket.done():
+        header = socket.read_until(msgHeader, size=300)
+        if len(header) >= 4 and header[0:4] == msgHeader:
+            msgSize = struct.unpack('>I', socket.read(4))[0]
+            if msgSize <= 300:
+                handle(socket.read(msgSize-8))
+
+
+def newReader(socket, handle):
+    reader = FrameReader.FrameReader()
+    while not socket.done():
+        reader.readFrom(socket)
+        for msg in reader:
+            handle(msg)
+    return reader
+
+
+def generateStream(frames, noise):
+    rnd = random.Random(1)
+    out = []
+    for i in range(frames):
+        payload = struct.pack('>Bhh', rnd.randint(0, 3), rnd.randint(-50, 50), rnd.randint(-50, 50))
+        out.append(FrameReader.MSG_HEADER + struct.pack('>III', 16 + len(payload), 147, 1) + payload)
+        if noise and i % 500 == 0:
+            out.append(b'\x00\xff noise')
+    return b''.join(out)
+
+
+def run(name, fn, data, chunk):
+    socket = ReplaySocket(data, chunk)
+    count = [0]
+
+    def handle(msg):
+        count[0] += 1
+
+    t = time.perf_counter()
+    result = fn(socket, handle)
+    t = time.perf_counter() - t
+    print('%-4s chunk=%-5d %7d frames %8.1f ms %9.0f frames/s %7d reads' %
+          (name, chunk, count[0], t * 1000, count[0] / t, socket.reads))
+    if result is not None:
+        print('     ', result.stats())
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'rb') as f:
+            streams = [(sys.argv[1], f.read())]
+    else:
+        streams = [('clean', generateStream(100000, False)),
+                   ('noisy', generateStream(100000, True))]
+
+    for name, data in streams:
+        print(name, len(data), 'bytes')
+        for chunk in (64, 1024):
+            run('old', oldReader, data, chunk)
+            run('new', newReader, data, chunk)
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# Runs a ring pattern, a breathing LED and a few blinks on the GLib main
+# loop for a while, writing to a temp file instead of the aw9524 driver, and
+# reports frame jitter, writes per second and whether the timer is gone
+# once everything stopped. Needs PyGObject.
+import os
+import tempfile
+from gi.repository import GLib
+import LEDManager
+import LEDAnimator
+
+SECONDS = 10
+
+
+def scenario(loop):
+    LEDAnimator.play('call', LEDAnimator.RING)
+    LEDAnimator.play('breathe', LEDAnimator.breathe(1, 3, 2000))
+
+    def blinkOnce():
+        LEDAnimator.play('blink', LEDAnimator.blink({4: [[1, 3]]}, 100, 100, loop=False))
+        return False
+    for i in range(1, SECONDS, 2):
+        GLib.timeout_add_seconds(i, blinkOnce)
+
+    def finish():
+        LEDAnimator.stop('call')
+        LEDAnimator.stop('breathe')
+        GLib.timeout_add(500, loop.quit)
+        return False
+    GLib.timeout_add_seconds(SECONDS, finish)
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'led')
+        open(path, 'w').close()
+        LEDManager.setPath(path)
+        loop = GLib.MainLoop()
+        scenario(loop)
+        loop.run()
+        s = LEDAnimator.animationStats()
+        print('%d ticks in %d s, jitter avg %.2f ms max %.2f ms, %.1f LED writes/s' %
+              (s['ticks'], SECONDS, s['avgJitterMs'], s['maxJitterMs'], s['writesPerSecond']))
+        print('timer after stop: %r, animations left: %r' % (LEDAnimator.timer, list(LEDAnimator.animations)))
+        LEDManager.setPath(LEDManager.LED_PROC)
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# Syscalls spent on the LEDs over a day-like sequence of lid toggles, calls
+# and charger events, writing to a temp file instead of the aw9524 driver.
+# The old setLed did an open, a write and a close for every LED and color.
+import os
+import tempfile
+import time
+import LEDManager
+
+
+def day():
+    for i in range(200):
+        LEDManager.ledsBlue()           # lid closed
+        LEDManager.ledsOff()            # lid opened
+    for i in range(20):
+        LEDManager.ledsIncomingCall()
+        LEDManager.ledsOff()
+    for i in range(5):
+        LEDManager.ledsCharging(True)
+        LEDManager.ledsCharging(False)
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'led')
+        open(path, 'w').close()
+        LEDManager.setPath(path)
+        t = time.perf_counter()
+        day()
+        t = time.perf_counter() - t
+        s = LEDManager.stats
+        before = s['requested'] * 3
+        after = s['written'] + s['opens']
+        print('%d LED values requested' % s['requested'])
+        print('before: %d syscalls (open/write/close each)' % before)
+        print('after:  %d syscalls (%d writes, %d opens) in %.1f ms' % (after, s['written'], s['opens'], t * 1000))
+        LEDManager.setPath(LEDManager.LED_PROC)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# Latency from a decoded MouseInfo frame to the pointer event being emitted,
+# for the uinput pointer and for the xdotool fallback. Needs write access to
+# /dev/uinput and, for xdotool, a running X session.
+import struct
+import subprocess
+import time
+import PointerDevice
+
+mouseInfo = struct.Struct('>Bhh')
+frame = mouseInfo.pack(1, -12, 30)
+
+
+def uinputLatency(rate, seconds):
+    if not PointerDevice.init():
+        print('uinput: not available')
+        return
+    interval = 1 / rate
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        mode, x, y = mouseInfo.unpack_from(frame, 0)
+        PointerDevice.move(-y, -x)
+        time.sleep(interval)
+    time.sleep(0.1)
+    PointerDevice.stop()
+    s = PointerDevice.stats
+    print('uinput: %d frames at %d/s -> %d events, avg %.2f ms, max %.2f ms' %
+          (s['moves'], rate, s['emitted'], s['totalLatency'] * 1000 / max(s['emitted'], 1),
+           s['maxLatency'] * 1000))
+
+
+def xdotoolLatency(count):
+    total = 0.0
+    worst = 0.0
+    for i in range(count):
+        t = time.monotonic()
+        mode, x, y = mouseInfo.unpack_from(frame, 0)
+        r = subprocess.call(['sh', '-c', 'xdotool mousemove_relative -- %d %d' % (-y, -x)],
+                            stderr=subprocess.DEVNULL)
+        t = time.monotonic() - t
+        if r != 0:
+            print('xdotool: not available')
+            return
+        total += t
+        worst = max(worst, t)
+    print('xdotool: %d frames, avg %.2f ms, max %.2f ms' % (count, total * 1000 / count, worst * 1000))
+
+
+if __name__ == '__main__':
+    uinputLatency(100, 2)
+    xdotoolLatency(50)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# Frames decoded per second by st32Cmd.readMessage for a realistic mix of
+# inbound commands. Handlers are replaced with no-ops so only decoding and
+# dispatch (including the hand-off to HandlerExecutor) is measured.
+import random
+import struct
+import time
+
+import bench_support
+
+bench_support.stubHandlers()
+import codi_st32_generated_functions as st32Cmd
+
+
+def string(s):
+    return struct.pack('>I', len(s)) + s
+
+
+def body(cmdId, payload=b''):
+    return struct.pack('>II', cmdId, 1) + payload
+
+
+MIX = [
+    (70, body(147, struct.pack('>Bhh', 1, -12, 30))),
+    (5, body(st32Cmd.CMD_ST32_GET_CONTACTS, struct.pack('>I', 20))),
+    (5, body(st32Cmd.CMD_ST32_GET_CALL_HISTORY, struct.pack('>I', 10))),
+    (3, body(st32Cmd.CMD_ST32_GET_BATTERY_LEVEL)),
+    (3, body(st32Cmd.CMD_ST32_GET_DATETIME)),
+    (3, body(st32Cmd.CMD_SYNC_SYS_SLEEP_STATUS, struct.pack('>BB', 0, 1))),
+    (2, body(st32Cmd.CMD_ST32_GET_WIFI_STATUS)),
+    (2, body(st32Cmd.CMD_ST32_SEND_DTMF, struct.pack('>IIBB', 1, 0, 53, 1))),
+    (2, body(st32Cmd.CMD_ST32_ACTION_CALL, struct.pack('>IIII', 0, 1, 0, 0) +
+             string(b'+447700900123') + string(b'Zoe Example') + string(b'pas-id-1234'))),
+    (2, body(st32Cmd.CMD_ST32_DISMISS_CALL_SMS, struct.pack('>II', 1, 0) +
+             string(b'+447700900123') + string(b'Sorry, I can\'t talk right now'))),
+    (1, body(st32Cmd.CMD_ST32_GET_LEDISON_PATTERN, string(b'pas-id-1234') +
+             string(b'Zoe Example') + string(b'+447700900123'))),
+    (1, body(st32Cmd.CMD_ST32_INFO_CODI_FLASH_VERSION, string(b'CODI:V1.0:R1.0:x'))),
+    (1, body(999)),
+]
+
+
+def frames(n):
+    rnd = random.Random(1)
+    weights = [w for w, f in MIX]
+    population = [f for w, f in MIX]
+    return [memoryview(f) for f in rnd.choices(population, weights, k=n)]
+
+
+if __name__ == '__main__':
+    msgs = frames(200000)
+    readMessage = st32Cmd.readMessage
+    best = None
+    for i in range(3):
+        t = time.perf_counter()
+        for m in msgs:
+            readMessage(m)
+        t = time.perf_counter() - t
+        best = t if best is None else min(best, t)
+    print('%d frames %.1f ms %.0f frames/s' % (len(msgs), best * 1000, len(msgs) / best))
+    stats = getattr(st32Cmd, 'unknownCommands', None)
+    if stats is not None:
+        print('unknown commands', dict(stats))
+    executor = getattr(st32Cmd, 'HandlerExecutor', None)
+    if executor is not None:
+        time.sleep(0.5)
+        print('handlers', executor.stats())
+        executor.stop()
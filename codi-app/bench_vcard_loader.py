@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# Loads a synthetic 50k contact contacts.db with the old select */split
+# parser and with the streaming loader, reporting time and peak memory.
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+import Addressbook
+
+
+def legacyRefreshContacts(path):
+    contacts = []
+    conn = sqlite3.connect(path)
+    c = conn.cursor()
+    for contact in c.execute('select * from folder_id'):
+        id = ''
+        name = ''
+        numbers = []
+        addContact = True
+        for l in contact[15].split('\n'):
+            if l.startswith('X-DELETED-AT:'):
+                addContact = False
+            if l.startswith('FN:'):
+                name = l[3:]
+            if l.startswith('UID:'):
+                id = l[4:].strip()
+            if l.startswith('TEL;'):
+                tokens = l.split(';')
+                for t in tokens:
+                    if t.startswith('TYPE='):
+                        t = t[5:]
+                        sep = t.index(':')
+                        phType = t[0:sep].strip()
+                        phNumber = t[sep+1:].strip()
+                        numbers += [(phType, phNumber)]
+
+        if name != '' and addContact:
+            for n in numbers:
+                contacts += [(id, name, n[1])]
+    c.close()
+    conn.close()
+    return contacts
+
+
+def streamingRefreshContacts(path):
+    conn = sqlite3.connect(path)
+    try:
+        return list(Addressbook.readContacts(conn))
+    finally:
+        conn.close()
+
+
+def createDb(path, count):
+    rnd = random.Random(1)
+    # Evolution keeps the vCard in the 16th column
+    columns = ['uid', 'Rev', 'file_as', 'file_as_localized', 'nickname', 'full_name',
+               'given_name', 'given_name_localized', 'family_name', 'family_name_localized',
+               'is_list', 'list_show_addresses', 'wants_html', 'x509Cert', 'pgpCert', 'vcard']
+    conn = sqlite3.connect(path)
+    conn.execute('create table folder_id (%s)' % ', '.join(columns))
+    rows = []
+    for i in range(count):
+        lines = ['BEGIN:VCARD', 'VERSION:3.0', 'UID:pas-id-%08X' % i,
+                 'FN:Contact %d' % i, 'N:%d;Contact;;;' % i,
+                 'EMAIL;TYPE=HOME:contact%d@example.com' % i,
+                 'NOTE:Met at conference %d' % rnd.randint(0, 100)]
+        for t in ('CELL', 'HOME', 'WORK')[:rnd.randint(1, 3)]:
+            lines.append('TEL;X-EVOLUTION-E164=+447%09d;TYPE=%s:+44 7%03d %06d' %
+                         (i, t, rnd.randint(0, 999), rnd.randint(0, 999999)))
+        lines.append('REV:2021-01-01T00:00:00Z')
+        if rnd.random() < 0.05:
+            lines.append('X-DELETED-AT:2021-02-01T00:00:00Z')
+        lines.append('END:VCARD')
+        row = ['pas-id-%08X' % i] + [None] * 14 + ['\r\n'.join(lines)]
+        rows.append(row)
+    conn.executemany('insert into folder_id values (%s)' % ', '.join('?' * len(columns)), rows)
+    conn.commit()
+    conn.close()
+
+
+def run(name, fn, path):
+    t = time.perf_counter()
+    contacts = fn(path)
+    t = time.perf_counter() - t
+    del contacts
+    # Timed without tracemalloc, which slows allocation down a lot
+    tracemalloc.start()
+    contacts = fn(path)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print('%-10s %7d numbers %9.1f ms peak %7.1f MiB, result %7.1f MiB' %
+          (name, len(contacts), t * 1000, peak / 2**20, current / 2**20))
+    return contacts
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'contacts.db')
+        createDb(path, count)
+        old = run('legacy', legacyRefreshContacts, path)
+        new = run('streaming', streamingRefreshContacts, path)
+        # The old parser kept the \r of CRLF vCard lines in the name
+        assert [(c[0], c[1].rstrip('\r'), c[2]) for c in old] == new
@@ -15,13 +15,20 @@ from codi_generated_parser import *
 import signal
 
 import CodiStatus
+import DeviceSync
 import EventListener
+import PointerDevice
 import Addressbook
+import CallHistory
+import CallLogWriter
+import FileWatcher
 import lock_file
 
 def signalHandler(_signo, _stack_frame):
     # mtkCmd.SetMouse(0, 1)
     mtkCmd.SetCoDiStatus(3, 3, 3)
+    SerialPortManager.flush(1)
+    CallLogWriter.flush(1)
     sys.exit(0)
 
 signal.signal(signal.SIGINT, signalHandler)
@@ -37,6 +44,31 @@ lock_file.lock(lock)
 # logging.basicConfig(level=logging.DEBUG)
 
 CodiStatus.init()
+DeviceSync.init()
+
+def contactsFileChanged(topic):
+    Addressbook.refreshAsync(DBusServer.contactsReloaded)
+
+def historyFileChanged(topic):
+    CallHistory.invalidate()
+    mtkCmd.MTKDataChangeAlert(1, 0)
+
+def timezoneChanged(topic):
+    # History pages show local times, their cached offsets are stale now
+    time.tzset()
+    CallHistory.resetOffsets()
+    CallHistory.invalidate()
+    cf.GetDateTime()
+    mtkCmd.MTKDataChangeAlert(1, 0)
+
+def initFileWatcher():
+    FileWatcher.watch(Addressbook.CONTACTS_DB, 'contacts')
+    FileWatcher.watch(CallHistory.HISTORY_DB, 'history')
+    FileWatcher.watch('/etc/localtime', 'timezone')
+    FileWatcher.subscribe('contacts', contactsFileChanged)
+    FileWatcher.subscribe('history', historyFileChanged)
+    FileWatcher.subscribe('timezone', timezoneChanged)
+    FileWatcher.init()
 
 def initCodi():
     Addressbook.refreshContacts()
@@ -44,10 +76,8 @@ def initCodi():
     mtkCmd.SetMouse(1, 1)
     cf.GetDateTime()
     LEDManager.ledsOff()
-    mtkCmd.DoNotDisturbStatusInfo(0)
-    mtkCmd.BTStatusInfo(0)
-    mtkCmd.WiFiStatusInfo(1, 100)
-    mtkCmd.ModemSignalInfo(1, 0, 0)
+    # Every field once, after that DeviceSync only sends changes
+    DeviceSync.resync()
     mtkCmd.MTKDataChangeAlert(1, 0)
     mtkCmd.MTKDataChangeAlert(0, 0)
     cf.SetCallOutput(0)
@@ -80,7 +110,9 @@ if args['command']:
         exit(0)
 
 EventListener.init()
+PointerDevice.init()
 initCodi()
+initFileWatcher()
 
 DBusServer.init()
 
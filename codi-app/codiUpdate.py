@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import logging
 import os
+import concurrent.futures
 import time
 import struct
 import urllib.request
@@ -8,7 +9,9 @@ import optparse
 from distutils.version import LooseVersion
 from xmodem import YMODEM
 import codi_st32_generated_functions as st32Cmd
+import codi_mtk_generated_functions as mtkCmd
 import SerialPortManager
+import RequestTracker
 import lock_file
 import CodiFunctions as cf
 
@@ -16,6 +19,7 @@ log = logging.getLogger('codiUpdate')
 
 ospi_url = None
 resources_url = None
+REPLY_TIMEOUT = 4
 
 def writeUint8(p):
     return struct.pack(">B", p)
@@ -29,13 +33,14 @@ def writeString(s):
     return writeUint32(len(s)) + s.encode()
 
 
-def sendMessage(commandId, args=None, sessionId='00 00 00 01'):
+def sendMessage(commandId, args=None, sessionId=None):
     if args is None:
         args = []
+    if sessionId is None:
+        sessionId = RequestTracker.nextSessionId()
     msgHeader = bytes.fromhex('58 21 58 21')
     cmdId = writeUint32(commandId)
-    cmdSessionId = bytes.fromhex(sessionId)
-    # cmdSessionId = bytes.fromhex('00 00 00 01')
+    cmdSessionId = writeUint32(sessionId)
     msgLength = len(msgHeader) + 4 + len(cmdId) + len(cmdSessionId)
     for i in args:
         msgLength += len(i)
@@ -43,7 +48,7 @@ def sendMessage(commandId, args=None, sessionId='00 00 00 01'):
     cmd = msgHeader + writeUint32(msgLength) + cmdId + cmdSessionId
     for i in args:
         cmd += i
-    SerialPortManager.sendCommand(list(cmd))
+    SerialPortManager.sendCommand(cmd)
 
 
 def check_new_fota_versions_available():
@@ -51,8 +56,7 @@ def check_new_fota_versions_available():
     global resources_url
 
     time.sleep(1)  # Wait for listening thread to get started
-    sendMessage(st32Cmd.CMD_MTK_GET_CODI_FLASH_VERSION)
-    sendMessage(st32Cmd.CMD_MTK_GET_PROTOCOL_VERSION)
+    replies = [mtkCmd.GetFlashVersion(), mtkCmd.GetProtocolVersion()]
     # download available versions - https://fota.planetcom.co.uk/stm32flash/cosmo_stm32_firmware_versions.txt
     resource_version = {}
     newest_version = None
@@ -77,7 +81,15 @@ def check_new_fota_versions_available():
     except Exception as e:
         log.error(e)
 
-    time.sleep(2)  # Wait for CODI to reply
+    try:
+        for reply in concurrent.futures.as_completed(replies, REPLY_TIMEOUT):
+            reply.result()
+    except concurrent.futures.TimeoutError:
+        log.error('No version reply from CoDi')
+        # Stop waiting, a late reply is then handled like any other
+        for reply in replies:
+            reply.cancel()
+    log.info('Reply latency %r', RequestTracker.latencyStats())
     print("Current CODI versions:", cf.get_codi_version(), cf.get_resources_version(), cf.get_protocol_major(),
           cf.get_protocol_minor())
     print("Newest Server Version:", newest_version)
@@ -133,7 +145,7 @@ def send_file(file, slow_mode):
     stm32_into_download_mode(True)
     time.sleep(4)
     log.info("Sending 140 '0d oa' session 5 - requesting reset")
-    sendMessage(140, [writeUint8(0x0d), writeUint8(0x0a)], '00 00 00 05')
+    sendMessage(140, [writeUint8(0x0d), writeUint8(0x0a)], 5)
     time.sleep(2)
     stm32_hardware_reset()
     stm32_into_download_mode(False)
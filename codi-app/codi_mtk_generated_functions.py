@@ -1,5 +1,6 @@
 import struct
 import SerialPortManager
+import RequestTracker
 import logging
 
 def writeUint8(p):
@@ -29,18 +30,75 @@ def writeUTF8String(s):
 def writeBlob(b):
     return writeString(b)
 
+MSG_HEADER = bytes.fromhex('58 21 58 21')
+DEFAULT_SESSION_ID = 1
+
+
+class FrameEncoder:
+    # Encodes one MTK command. The signature lists the arguments using struct
+    # codes, with 's' for a length prefixed string or blob. The frame header
+    # and every run of fixed width arguments (including the length of the
+    # string that follows them) are packed by one precompiled Struct.
+
+    def __init__(self, commandId, signature):
+        self.commandId = commandId
+        self.signature = signature
+        self.strings = [i for i, c in enumerate(signature) if c == 's']
+        self.segments = []
+        fmt = '>4sIII'
+        start = 0
+        for i, c in enumerate(signature):
+            if c == 's':
+                self.segments.append((struct.Struct(fmt + 'I'), start, i, len(self.segments)))
+                fmt = '>'
+                start = i + 1
+            else:
+                fmt += c
+        if fmt != '>' or not self.segments:
+            self.segments.append((struct.Struct(fmt), start, len(signature), None))
+        self.size = sum(st.size for st, a, b, si in self.segments)
+        self.head = self.segments[0][0]
+
+    def pack(self, sessionId, *args):
+        if not self.strings:
+            return self.head.pack(MSG_HEADER, self.size, self.commandId, sessionId, *args)
+
+        data = [args[i].encode() if args[i].__class__ is str else args[i] for i in self.strings]
+        st, a, b, si = self.segments[0]
+        d = data[0]
+        parts = [st.pack(MSG_HEADER, self.size + sum(map(len, data)), self.commandId, sessionId, *args[a:b], len(d)), d]
+        for st, a, b, si in self.segments[1:]:
+            if si is None:
+                parts.append(st.pack(*args[a:b]))
+            else:
+                d = data[si]
+                parts.append(st.pack(*args[a:b], len(d)))
+                parts.append(d)
+        return b''.join(parts)
+
+    def __call__(self, *args):
+        return self.pack(DEFAULT_SESSION_ID, *args)
+
+
+def sendFrame(frame, commandId=None):
+    SerialPortManager.sendCommand(frame, commandId if commandId in STATE_COMMANDS else None,
+                                  commandId in URGENT_COMMANDS)
+
+def sendRequest(encoder, *args):
+    # Sends a request under its own session id and returns a
+    # concurrent.futures.Future that resolves to the decoded reply arguments
+    sessionId, future = RequestTracker.register(encoder.commandId, REPLIES[encoder.commandId])
+    sendFrame(encoder.pack(sessionId, *args), encoder.commandId)
+    return future
+
 def sendMessage(commandId, args=[]):
-    msgHeader = bytes.fromhex('58 21 58 21')
     cmdId = writeUint32(commandId)
-    cmdSessionId = bytes.fromhex('00 00 00 01')
-    msgLength = len(msgHeader) + 4 + len(cmdId) + len(cmdSessionId)
+    cmdSessionId = writeUint32(DEFAULT_SESSION_ID)
+    msgLength = len(MSG_HEADER) + 4 + len(cmdId) + len(cmdSessionId)
     for i in args:
         msgLength += len(i)
 
-    cmd = msgHeader + writeUint32(msgLength) + cmdId + cmdSessionId
-    for i in args:
-        cmd += i
-    SerialPortManager.sendCommand(list(cmd))
+    sendFrame(b''.join([MSG_HEADER, writeUint32(msgLength), cmdId, cmdSessionId] + args), commandId)
 
 CMD_MTK_GET_PROTOCOL_VERSION = 0
 CMD_MTK_GET_CODI_FLASH_VERSION = 1
@@ -176,232 +234,332 @@ CMD_SYNC_SYS_SLEEP_STATUS = 143
 CMD_SYNC_RIGHT_USB_OTG_STATUS = 144
 CMD_ST_ENTRY_DEEP_SLEEP_STATUS = 145
 
+encodeGetProtocolVersion = FrameEncoder(CMD_MTK_GET_PROTOCOL_VERSION, "")
+encodeGetFlashVersion = FrameEncoder(CMD_MTK_GET_CODI_FLASH_VERSION, "")
+encodeDateTimeInfo = FrameEncoder(CMD_MTK_INFO_DATETIME, "IIIIIII")
+encodeLocationStatusInfo = FrameEncoder(CMD_MTK_INFO_LOCATION_STATUS, "H")
+encodeTorchStatusInfo = FrameEncoder(CMD_MTK_INFO_TORCH_STATUS, "H")
+encodeCoverStatusInfo = FrameEncoder(CMD_MTK_INFO_COVER_STATUS, "H")
+encodeWiFiStatusInfo = FrameEncoder(CMD_MTK_INFO_WIFI_STATUS, "HI")
+encodeBTStatusInfo = FrameEncoder(CMD_MTK_INFO_BT_STATUS, "H")
+encodeBatterySaverStatusInfo = FrameEncoder(CMD_MTK_INFO_BATTERY_SAVER_STATUS, "H")
+encodeFlightModeStatusInfo = FrameEncoder(CMD_MTK_INFO_FLIGHT_MODE_STATUS, "H")
+encodeHotspotStatusInfo = FrameEncoder(CMD_MTK_INFO_HOTSPOT_STATUS, "H")
+encodeMobileDataStatusInfo = FrameEncoder(CMD_MTK_INFO_MOBILE_DATA_STATUS, "H")
+encodeDoNotDisturbStatusInfo = FrameEncoder(CMD_MTK_INFO_DND_STATUS, "H")
+encodeVolumeLevelInfo = FrameEncoder(CMD_MTK_INFO_VOLUME_LEVEL, "HH")
+encodeBatteryLevelInfo = FrameEncoder(CMD_MTK_INFO_BATTERY_LEVEL, "H")
+encodeSetCoDiStatus = FrameEncoder(CMD_MTK_SET_CODI_STATUS, "III")
+encodeLockStatusInfo = FrameEncoder(CMD_MTK_INFO_LOCK_STATUS, "HIs")
+encodeCallMuteStatusInfo = FrameEncoder(CMD_MTK_INFO_CALL_MUTE_STATUS, "I")
+encodeCallOutputInfo = FrameEncoder(CMD_MTK_INFO_CALL_OUTPUT, "I")
+encodeCallOutputOptionsInfo = FrameEncoder(CMD_MTK_INFO_CALL_OUTPUT_OPTIONS, "I")
+encodeCameraStatusInfo = FrameEncoder(CMD_MTK_INFO_CAMERA_STATUS, "I")
+encodeCameraSettingsInfo = FrameEncoder(CMD_MTK_INFO_CAMERA_SETTINGS, "II")
+encodeVideoStatusInfo = FrameEncoder(CMD_MTK_INFO_VIDEO_STATUS, "I")
+encodeVideoSettingsInfo = FrameEncoder(CMD_MTK_INFO_VIDEO_SETTINGS, "II")
+encodeCoverLightSensorInfo = FrameEncoder(CMD_MTK_INFO_COVER_LIGHT_SENSOR, "I")
+encodeLoadLanguageResource = FrameEncoder(CMD_MTK_LOAD_LANGUAGE_RESOURCE, "sssI")
+encodeGetCurrentLanguage = FrameEncoder(CMD_MTK_GET_CURRENT_LANGUAGE, "")
+encodeSetCurrentLanguage = FrameEncoder(CMD_MTK_SET_CURRENT_LANGUAGE, "s")
+encodeShowMedia = FrameEncoder(CMD_MTK_SHOW_MEDIA, "ssIII")
+encodeStopMedia = FrameEncoder(CMD_MTK_STOP_MEDIA, "ssI")
+encodeLoadMedia = FrameEncoder(CMD_MTK_LOAD_MEDIA, "sssI")
+encodeUnloadMedia = FrameEncoder(CMD_MTK_UNLOAD_MEDIA, "ss")
+encodeHasMedia = FrameEncoder(CMD_MTK_HAS_MEDIA, "ss")
+encodeShowAlert = FrameEncoder(CMD_MTK_SHOW_ALERT, "IIsssIIIss")
+encodeStopAlert = FrameEncoder(CMD_MTK_STOP_ALERT, "I")
+encodeOrientationInfo = FrameEncoder(CMD_MTK_ORIENTATION_INFO, "I")
+encodeActionCoDiHome = FrameEncoder(CMD_MTK_ACTION_CODI_HOME, "I")
+encodeNextAlarmInfo = FrameEncoder(CMD_MTK_INFO_NEXT_ALARM, "Iss")
+encodeShowBatteryLevel = FrameEncoder(CMD_MTK_SHOW_BATTERY_LEVEL, "II")
+encodeContactInfo = FrameEncoder(CMD_MTK_CONTACT_INFO, "sIIss")
+encodeCallHistoryInfo = FrameEncoder(CMD_MTK_CALL_HISTORY_INFO, "IIIssIIIIIIII")
+encodeNotificationInfo = FrameEncoder(CMD_MTK_NOTIFICATION_INFO, "IIsssIIIIIIIIsss")
+encodePlayerInfo = FrameEncoder(CMD_MTK_PLAYER_INFO, "ssssIIIs")
+encodeCallInfo = FrameEncoder(CMD_MTK_CALL_INFO, "IIsssI")
+encodeLEDisonModeInfo = FrameEncoder(CMD_MTK_LEDISON_MODE_INFO, "I")
+encodeLEDisonPatternInfo = FrameEncoder(CMD_MTK_LEDISON_PATTERN_INFO, "Iss")
+encodeContactIconInfo = FrameEncoder(CMD_MTK_CONTACT_ICON_INFO, "ssss")
+encodeModemSignalInfo = FrameEncoder(CMD_MTK_MODEM_SIGNAL_INFO, "III")
+encodeWeatherInfo = FrameEncoder(CMD_MTK_WEATHER_INFO, "IIss")
+encodeExtraCommand = FrameEncoder(CMD_MTK_EXTRA_COMMAND, "IIss")
+encodeDateTimeFormat = FrameEncoder(CMD_MTK_DATE_TIME_FORMAT_INFO, "sI")
+encodeAlbumArtInfo = FrameEncoder(CMD_MTK_ALBUM_ART_INFO, "s")
+encodeCameraFrameImage = FrameEncoder(CMD_MTK_CAMERA_FRAME_IMG, "HHs")
+encodeKeyPressInfo = FrameEncoder(CMD_MTK_KEY_PRESS_INFO, "HHH")
+encodeVoiceRecorderSettingsInfo = FrameEncoder(CMD_MTK_INFO_VOICE_RECODER_SETTINGS, "II")
+encodeVoiceRecorderStatusInfo = FrameEncoder(CMD_MTK_INFO_VOICE_RECORDER_STATUS, "I")
+encodeMTKDataChangeAlert = FrameEncoder(CMD_MTK_DATA_CHANGE_ALERT, "II")
+encodeSetMouse = FrameEncoder(146, "BB")
+
+# Status updates where only the latest value matters, a queued frame is
+# replaced by a newer one of the same command. VolumeLevelInfo isn't one,
+# it carries a level per stream.
+STATE_COMMANDS = {
+    CMD_MTK_INFO_DATETIME,
+    CMD_MTK_INFO_LOCATION_STATUS,
+    CMD_MTK_INFO_TORCH_STATUS,
+    CMD_MTK_INFO_COVER_STATUS,
+    CMD_MTK_INFO_WIFI_STATUS,
+    CMD_MTK_INFO_BT_STATUS,
+    CMD_MTK_INFO_BATTERY_SAVER_STATUS,
+    CMD_MTK_INFO_FLIGHT_MODE_STATUS,
+    CMD_MTK_INFO_HOTSPOT_STATUS,
+    CMD_MTK_INFO_MOBILE_DATA_STATUS,
+    CMD_MTK_INFO_DND_STATUS,
+    CMD_MTK_INFO_BATTERY_LEVEL,
+    CMD_MTK_INFO_LOCK_STATUS,
+    CMD_MTK_INFO_CALL_MUTE_STATUS,
+    CMD_MTK_INFO_CALL_OUTPUT,
+    CMD_MTK_INFO_COVER_LIGHT_SENSOR,
+    CMD_MTK_ORIENTATION_INFO,
+    CMD_MTK_MODEM_SIGNAL_INFO,
+}
+
+# Requests and the ST32 command that answers them
+REPLIES = {
+    CMD_MTK_GET_PROTOCOL_VERSION: CMD_ST32_INFO_PROTOCOL_VERSION,
+    CMD_MTK_GET_CODI_FLASH_VERSION: CMD_ST32_INFO_CODI_FLASH_VERSION,
+    CMD_MTK_GET_CURRENT_LANGUAGE: CMD_ST32_INFO_CURRENT_LANGUAGE,
+}
+
+# Call handling frames jump ahead of everything else
+URGENT_COMMANDS = {
+    CMD_MTK_CALL_INFO,
+    CMD_MTK_SET_CODI_STATUS,
+}
+
 log = logging.getLogger('codi')
 
+def GetProtocolVersion():
+    log.info("-> GetProtocolVersion")
+    return sendRequest(encodeGetProtocolVersion)
+
 def GetFlashVersion():
     log.info("-> GetFlashVersion")
-    sendMessage(CMD_MTK_GET_CODI_FLASH_VERSION)
+    return sendRequest(encodeGetFlashVersion)
 
 def DateTimeInfo(day, month, year, hour, minute, second, tz):
     log.info("-> DateTimeInfo")
-    sendMessage(CMD_MTK_INFO_DATETIME, [writeUint32(day), writeUint32(month), writeUint32(year), writeUint32(hour), writeUint32(minute), writeUint32(second), writeUint32(tz)])
+    sendFrame(encodeDateTimeInfo(day, month, year, hour, minute, second, tz), CMD_MTK_INFO_DATETIME)
 
 def LocationStatusInfo(status):
     log.info("-> LocationStatusInfo")
-    sendMessage(CMD_MTK_INFO_LOCATION_STATUS, [writeUint16(status)])
+    sendFrame(encodeLocationStatusInfo(status), CMD_MTK_INFO_LOCATION_STATUS)
 
 def TorchStatusInfo(status):
     log.info("-> TorchStatusInfo")
-    sendMessage(CMD_MTK_INFO_TORCH_STATUS, [writeUint16(status)])
+    sendFrame(encodeTorchStatusInfo(status), CMD_MTK_INFO_TORCH_STATUS)
 
 def CoverStatusInfo(status):
     log.info("-> CoverStatusInfo")
-    sendMessage(CMD_MTK_INFO_COVER_STATUS, [writeUint16(status)])
+    sendFrame(encodeCoverStatusInfo(status), CMD_MTK_INFO_COVER_STATUS)
 
 def WiFiStatusInfo(status, signalval):
     log.info("-> WiFiStatusInfo")
-    sendMessage(CMD_MTK_INFO_WIFI_STATUS, [writeUint16(status), writeUint32(signalval)])
+    sendFrame(encodeWiFiStatusInfo(status, signalval), CMD_MTK_INFO_WIFI_STATUS)
 
 def BTStatusInfo(status):
     log.info("-> BTStatusInfo")
-    sendMessage(CMD_MTK_INFO_BT_STATUS, [writeUint16(status)])
+    sendFrame(encodeBTStatusInfo(status), CMD_MTK_INFO_BT_STATUS)
 
 def BatterySaverStatusInfo(status):
     log.info("-> BatterySaverStatusInfo")
-    sendMessage(CMD_MTK_INFO_BATTERY_SAVER_STATUS, [writeUint16(status)])
+    sendFrame(encodeBatterySaverStatusInfo(status), CMD_MTK_INFO_BATTERY_SAVER_STATUS)
 
 def FlightModeStatusInfo(status):
     log.info("-> FlightModeStatusInfo")
-    sendMessage(CMD_MTK_INFO_FLIGHT_MODE_STATUS, [writeUint16(status)])
+    sendFrame(encodeFlightModeStatusInfo(status), CMD_MTK_INFO_FLIGHT_MODE_STATUS)
 
 def HotspotStatusInfo(status):
     log.info("-> HotspotStatusInfo")
-    sendMessage(CMD_MTK_INFO_HOTSPOT_STATUS, [writeUint16(status)])
+    sendFrame(encodeHotspotStatusInfo(status), CMD_MTK_INFO_HOTSPOT_STATUS)
 
 def MobileDataStatusInfo(status):
     log.info("-> MobileDataStatusInfo")
-    sendMessage(CMD_MTK_INFO_MOBILE_DATA_STATUS, [writeUint16(status)])
+    sendFrame(encodeMobileDataStatusInfo(status), CMD_MTK_INFO_MOBILE_DATA_STATUS)
 
 def DoNotDisturbStatusInfo(status):
     log.info("-> DoNotDisturbStatusInfo")
-    sendMessage(CMD_MTK_INFO_DND_STATUS, [writeUint16(status)])
+    sendFrame(encodeDoNotDisturbStatusInfo(status), CMD_MTK_INFO_DND_STATUS)
 
 def VolumeLevelInfo(status, stream):
     log.info("-> VolumeLevelInfo")
-    sendMessage(CMD_MTK_INFO_VOLUME_LEVEL, [writeUint16(status), writeUint16(stream)])
+    sendFrame(encodeVolumeLevelInfo(status, stream), CMD_MTK_INFO_VOLUME_LEVEL)
 
 def BatteryLevelInfo(status):
     log.info("-> BatteryLevelInfo")
-    sendMessage(CMD_MTK_INFO_BATTERY_LEVEL, [writeUint16(status)])
+    sendFrame(encodeBatteryLevelInfo(status), CMD_MTK_INFO_BATTERY_LEVEL)
 
 def SetCoDiStatus(mode, screen, data1):
     log.info("-> SetCoDiStatus")
-    sendMessage(CMD_MTK_SET_CODI_STATUS, [writeUint32(mode), writeUint32(screen), writeUint32(data1)])
+    sendFrame(encodeSetCoDiStatus(mode, screen, data1), CMD_MTK_SET_CODI_STATUS)
 
 def LockStatusInfo(locked, method, strdata):
     log.info("-> LockStatusInfo")
-    sendMessage(CMD_MTK_INFO_LOCK_STATUS, [writeUint16(locked), writeUint32(method), writeString(strdata)])
+    sendFrame(encodeLockStatusInfo(locked, method, strdata), CMD_MTK_INFO_LOCK_STATUS)
 
 def CallMuteStatusInfo(status):
     log.info("-> CallMuteStatusInfo")
-    sendMessage(CMD_MTK_INFO_CALL_MUTE_STATUS, [writeUint32(status)])
+    sendFrame(encodeCallMuteStatusInfo(status), CMD_MTK_INFO_CALL_MUTE_STATUS)
 
 def CallOutputInfo(output):
     log.info("-> CallOutputInfo")
-    sendMessage(CMD_MTK_INFO_CALL_OUTPUT, [writeUint32(output)])
+    sendFrame(encodeCallOutputInfo(output), CMD_MTK_INFO_CALL_OUTPUT)
 
 def CallOutputOptionsInfo(output_options):
     log.info("-> CallOutputOptionsInfo")
-    sendMessage(CMD_MTK_INFO_CALL_OUTPUT_OPTIONS, [writeUint32(output_options)])
+    sendFrame(encodeCallOutputOptionsInfo(output_options), CMD_MTK_INFO_CALL_OUTPUT_OPTIONS)
 
 def CameraStatusInfo(status):
     log.info("-> CameraStatusInfo")
-    sendMessage(CMD_MTK_INFO_CAMERA_STATUS, [writeUint32(status)])
+    sendFrame(encodeCameraStatusInfo(status), CMD_MTK_INFO_CAMERA_STATUS)
 
 def CameraSettingsInfo(parameter, value):
     log.info("-> CameraSettingsInfo")
-    sendMessage(CMD_MTK_INFO_CAMERA_SETTINGS, [writeUint32(parameter), writeUint32(value)])
+    sendFrame(encodeCameraSettingsInfo(parameter, value), CMD_MTK_INFO_CAMERA_SETTINGS)
 
 def VideoStatusInfo(status):
     log.info("-> VideoStatusInfo")
-    sendMessage(CMD_MTK_INFO_VIDEO_STATUS, [writeUint32(status)])
+    sendFrame(encodeVideoStatusInfo(status), CMD_MTK_INFO_VIDEO_STATUS)
 
 def VideoSettingsInfo(parameter, value):
     log.info("-> VideoSettingsInfo")
-    sendMessage(CMD_MTK_INFO_VIDEO_SETTINGS, [writeUint32(parameter), writeUint32(value)])
+    sendFrame(encodeVideoSettingsInfo(parameter, value), CMD_MTK_INFO_VIDEO_SETTINGS)
 
 def CoverLightSensorInfo(value):
     log.info("-> CoverLightSensorInfo")
-    sendMessage(CMD_MTK_INFO_COVER_LIGHT_SENSOR, [writeUint32(value)])
+    sendFrame(encodeCoverLightSensorInfo(value), CMD_MTK_INFO_COVER_LIGHT_SENSOR)
 
 def LoadLanguageResource(langid, resname, resdata, forcereload):
     log.info("-> LoadLanguageResource")
-    sendMessage(CMD_MTK_LOAD_LANGUAGE_RESOURCE, [writeString(langid), writeString(resname), writeBlob(resdata), writeUint32(forcereload)])
+    sendFrame(encodeLoadLanguageResource(langid, resname, resdata, forcereload), CMD_MTK_LOAD_LANGUAGE_RESOURCE)
 
 def GetCurrentLanguage():
     log.info("-> GetCurrentLanguage")
-    sendMessage(CMD_MTK_GET_CURRENT_LANGUAGE)
+    return sendRequest(encodeGetCurrentLanguage)
 
 def SetCurrentLanguage(langid):
     log.info("-> SetCurrentLanguage")
-    sendMessage(CMD_MTK_SET_CURRENT_LANGUAGE, [writeString(langid)])
+    sendFrame(encodeSetCurrentLanguage(langid), CMD_MTK_SET_CURRENT_LANGUAGE)
 
 def ShowMedia(typestr, resname, seconds, speed, aftermode):
     log.info("-> ShowMedia")
-    sendMessage(CMD_MTK_SHOW_MEDIA, [writeString(typestr), writeString(resname), writeUint32(seconds), writeUint32(speed), writeUint32(aftermode)])
+    sendFrame(encodeShowMedia(typestr, resname, seconds, speed, aftermode), CMD_MTK_SHOW_MEDIA)
 
 def StopMedia(typestr, resname, aftermode):
     log.info("-> StopMedia")
-    sendMessage(CMD_MTK_STOP_MEDIA, [writeString(typestr), writeString(resname), writeUint32(aftermode)])
+    sendFrame(encodeStopMedia(typestr, resname, aftermode), CMD_MTK_STOP_MEDIA)
 
 def LoadMedia(typestr, resname, resdata, loadmode):
     log.info("-> LoadMedia")
-    sendMessage(CMD_MTK_LOAD_MEDIA, [writeString(typestr), writeString(resname), writeBlob(resdata), writeUint32(loadmode)])
+    sendFrame(encodeLoadMedia(typestr, resname, resdata, loadmode), CMD_MTK_LOAD_MEDIA)
 
 def UnloadMedia(typestr, resname):
     log.info("-> UnloadMedia")
-    sendMessage(CMD_MTK_UNLOAD_MEDIA, [writeString(typestr), writeString(resname)])
+    sendFrame(encodeUnloadMedia(typestr, resname), CMD_MTK_UNLOAD_MEDIA)
 
 def HasMedia(typestr, resname):
     log.info("-> HasMedia")
-    sendMessage(CMD_MTK_HAS_MEDIA, [writeString(typestr), writeString(resname)])
+    sendFrame(encodeHasMedia(typestr, resname), CMD_MTK_HAS_MEDIA)
 
 def ShowAlert(alertmode, alertype, alerticondata, typestr, resname, seconds, speed, aftermode, option1, option2):
     log.info("-> ShowAlert")
-    sendMessage(CMD_MTK_SHOW_ALERT, [writeUint32(alertmode), writeUint32(alertype), writeBlob(alerticondata), writeString(typestr), writeString(resname), writeUint32(seconds), writeUint32(speed), writeUint32(aftermode), writeUTF8String(option1), writeUTF8String(option2)])
+    sendFrame(encodeShowAlert(alertmode, alertype, alerticondata, typestr, resname, seconds, speed, aftermode, option1, option2), CMD_MTK_SHOW_ALERT)
 
 def StopAlert(aftermode):
     log.info("-> StopAlert")
-    sendMessage(CMD_MTK_STOP_ALERT, [writeUint32(aftermode)])
+    sendFrame(encodeStopAlert(aftermode), CMD_MTK_STOP_ALERT)
 
 def OrientationInfo(value):
     log.info("-> OrientationInfo")
-    sendMessage(CMD_MTK_ORIENTATION_INFO, [writeUint32(value)])
+    sendFrame(encodeOrientationInfo(value), CMD_MTK_ORIENTATION_INFO)
 
 def ActionCoDiHome(screenoff):
     log.info("-> ActionCoDiHome")
-    sendMessage(CMD_MTK_ACTION_CODI_HOME, [writeUint32(screenoff)])
+    sendFrame(encodeActionCoDiHome(screenoff), CMD_MTK_ACTION_CODI_HOME)
 
 def NextAlarmInfo(appid, daystring, timestr):
     log.info("-> NextAlarmInfo")
-    sendMessage(CMD_MTK_INFO_NEXT_ALARM, [writeUint32(appid), writeString(daystring), writeString(timestr)])
+    sendFrame(encodeNextAlarmInfo(appid, daystring, timestr), CMD_MTK_INFO_NEXT_ALARM)
 
 def ShowBatteryLevel(percentage, showforseconds):
     log.info("-> ShowBatteryLevel")
-    sendMessage(CMD_MTK_SHOW_BATTERY_LEVEL, [writeUint32(percentage), writeUint32(showforseconds)])
+    sendFrame(encodeShowBatteryLevel(percentage, showforseconds), CMD_MTK_SHOW_BATTERY_LEVEL)
 
 def ContactInfo(contactid, totalcontacts, batchsize, contactname, msisdn):
     log.info("-> ContactInfo")
-    sendMessage(CMD_MTK_CONTACT_INFO, [writeString(contactid), writeUint32(totalcontacts), writeUint32(batchsize), writeUTF8String(contactname), writeString(msisdn)])
+    sendFrame(encodeContactInfo(contactid, totalcontacts, batchsize, contactname, msisdn), CMD_MTK_CONTACT_INFO)
 
 def CallHistoryInfo(cdrid, totalcdr, batchsize, contactname, msisdn, day, month, year, hour, minute, second, tz, state):
     log.info("-> CallHistoryInfo")
-    sendMessage(CMD_MTK_CALL_HISTORY_INFO, [writeUint32(cdrid), writeUint32(totalcdr), writeUint32(batchsize), writeUTF8String(contactname), writeString(msisdn), writeUint32(day), writeUint32(month), writeUint32(year), writeUint32(hour), writeUint32(minute), writeUint32(second), writeUint32(tz), writeUint32(state)])
+    sendFrame(encodeCallHistoryInfo(cdrid, totalcdr, batchsize, contactname, msisdn, day, month, year, hour, minute, second, tz, state), CMD_MTK_CALL_HISTORY_INFO)
 
 def NotificationInfo(notid, action, appname, shortinfo, longinfo, day, month, year, hour, minute, second, tz, replyactions, replyaction1, replyaction2, replyaction3):
     log.info("-> NotificationInfo")
-    sendMessage(CMD_MTK_NOTIFICATION_INFO, [writeUint32(notid), writeUint32(action), writeUTF8String(appname), writeUTF8String(shortinfo), writeUTF8String(longinfo), writeUint32(day), writeUint32(month), writeUint32(year), writeUint32(hour), writeUint32(minute), writeUint32(second), writeUint32(tz), writeUint32(replyactions), writeUTF8String(replyaction1), writeUTF8String(replyaction2), writeUTF8String(replyaction3)])
+    sendFrame(encodeNotificationInfo(notid, action, appname, shortinfo, longinfo, day, month, year, hour, minute, second, tz, replyactions, replyaction1, replyaction2, replyaction3), CMD_MTK_NOTIFICATION_INFO)
 
 def PlayerInfo(appname, artist, album, track, offset, length, state, imageadr):
     log.info("-> PlayerInfo")
-    sendMessage(CMD_MTK_PLAYER_INFO, [writeUTF8String(appname), writeUTF8String(artist), writeUTF8String(album), writeUTF8String(track), writeUint32(offset), writeUint32(length), writeUint32(state), writeBlob(imageadr)])
+    sendFrame(encodePlayerInfo(appname, artist, album, track, offset, length, state, imageadr), CMD_MTK_PLAYER_INFO)
 
 def CallInfo(modem, action, contactid, contactname, msisdn, hasicon):
     log.info("-> CallInfo")
-    sendMessage(CMD_MTK_CALL_INFO, [writeUint32(modem), writeUint32(action), writeString(contactid), writeUTF8String(contactname), writeString(msisdn), writeUint32(hasicon)])
+    sendFrame(encodeCallInfo(modem, action, contactid, contactname, msisdn, hasicon), CMD_MTK_CALL_INFO)
 
 def LEDisonModeInfo(value):
     log.info("-> LEDisonModeInfo")
-    sendMessage(CMD_MTK_LEDISON_MODE_INFO, [writeUint32(value)])
+    sendFrame(encodeLEDisonModeInfo(value), CMD_MTK_LEDISON_MODE_INFO)
 
 def LEDisonPatternInfo(animid, animname, animationdata):
     log.info("-> LEDisonPatternInfo")
-    sendMessage(CMD_MTK_LEDISON_PATTERN_INFO, [writeUint32(animid), writeUTF8String(animname), writeBlob(animationdata)])
+    sendFrame(encodeLEDisonPatternInfo(animid, animname, animationdata), CMD_MTK_LEDISON_PATTERN_INFO)
 
 def ContactIconInfo(contactid, contactname, msisdn, icondata):
     log.info("-> ContactIconInfo")
-    sendMessage(CMD_MTK_CONTACT_ICON_INFO, [writeString(contactid), writeUTF8String(contactname), writeString(msisdn), writeBlob(icondata)])
+    sendFrame(encodeContactIconInfo(contactid, contactname, msisdn, icondata), CMD_MTK_CONTACT_ICON_INFO)
 
 def ModemSignalInfo(sim1, sim2, sim2type):
     log.info("-> ModemSignalInfo")
-    sendMessage(CMD_MTK_MODEM_SIGNAL_INFO, [writeUint32(sim1), writeUint32(sim2), writeUint32(sim2type)])
+    sendFrame(encodeModemSignalInfo(sim1, sim2, sim2type), CMD_MTK_MODEM_SIGNAL_INFO)
 
 def WeatherInfo(weatherstate, temp, scale, additionaltext):
     log.info("-> WeatherInfo")
-    sendMessage(CMD_MTK_WEATHER_INFO, [writeUint32(weatherstate), writeUint32(temp), writeString(scale), writeString(additionaltext)])
+    sendFrame(encodeWeatherInfo(weatherstate, temp, scale, additionaltext), CMD_MTK_WEATHER_INFO)
 
 def ExtraCommand(data1, data2, str1, str2):
     log.info("-> ExtraCommand")
-    sendMessage(CMD_MTK_EXTRA_COMMAND, [writeUint32(data1), writeUint32(data2), writeString(str1), writeString(str2)])
+    sendFrame(encodeExtraCommand(data1, data2, str1, str2), CMD_MTK_EXTRA_COMMAND)
 
 def DateTimeFormat(dateformat, timeformat):
     log.info("-> DateTimeFormat")
-    sendMessage(CMD_MTK_DATE_TIME_FORMAT_INFO, [writeString(dateformat), writeUint32(timeformat)])
+    sendFrame(encodeDateTimeFormat(dateformat, timeformat), CMD_MTK_DATE_TIME_FORMAT_INFO)
 
 def AlbumArtInfo(albumartpng):
     log.info("-> AlbumArtInfo")
-    sendMessage(CMD_MTK_ALBUM_ART_INFO, [writeBlob(albumartpng)])
+    sendFrame(encodeAlbumArtInfo(albumartpng), CMD_MTK_ALBUM_ART_INFO)
 
 def CameraFrameImage(width, height, png):
     log.info("-> CameraFrameImage")
-    sendMessage(CMD_MTK_CAMERA_FRAME_IMG, [writeUint16(width), writeUint16(height), writeBlob(png)])
+    sendFrame(encodeCameraFrameImage(width, height, png), CMD_MTK_CAMERA_FRAME_IMG)
 
 def KeyPressInfo(keycode, mode, modifiers):
     log.info("-> KeyPressInfo")
-    sendMessage(CMD_MTK_KEY_PRESS_INFO, [writeUint16(keycode), writeUint16(mode), writeUint16(modifiers)])
+    sendFrame(encodeKeyPressInfo(keycode, mode, modifiers), CMD_MTK_KEY_PRESS_INFO)
 
 def VoiceRecorderSettingsInfo(parameter, value):
     log.info("-> VoiceRecorderSettingsInfo")
-    sendMessage(CMD_MTK_INFO_VOICE_RECODER_SETTINGS, [writeUint32(parameter), writeUint32(value)])
+    sendFrame(encodeVoiceRecorderSettingsInfo(parameter, value), CMD_MTK_INFO_VOICE_RECODER_SETTINGS)
 
 def VoiceRecorderStatusInfo(status):
     log.info("-> VoiceRecorderStatusInfo")
-    sendMessage(CMD_MTK_INFO_VOICE_RECORDER_STATUS, [writeUint32(status)])
+    sendFrame(encodeVoiceRecorderStatusInfo(status), CMD_MTK_INFO_VOICE_RECORDER_STATUS)
 
 def MTKDataChangeAlert(type, data1):
     log.info("-> MTKDataChangeAlert")
-    sendMessage(CMD_MTK_DATA_CHANGE_ALERT, [writeUint32(type), writeUint32(data1)])
+    sendFrame(encodeMTKDataChangeAlert(type, data1), CMD_MTK_DATA_CHANGE_ALERT)
 
 def SetMouse(onOff, absoluteOrRelative):
     log.info("-> SetMouse")
-    sendMessage(146, [writeUint8(onOff), writeUint8(absoluteOrRelative)])
+    sendFrame(encodeSetMouse(onOff, absoluteOrRelative), 146)
@@ -1,38 +1,56 @@
 import struct
 import logging
+import collections
+import RequestTracker
+import HandlerExecutor
 import CodiFunctions as cf
 
-def readUint8(p):
-    return struct.unpack(">B", p[:1])[0], p[1:]
+uint8 = struct.Struct(">B")
+uint16 = struct.Struct(">H")
+uint32 = struct.Struct(">I")
+int8 = struct.Struct(">b")
+int16 = struct.Struct(">h")
+int32 = struct.Struct(">i")
+header = struct.Struct(">II")
 
-def readUint16(p):
-    return struct.unpack(">H", p[:2])[0], p[2:]
+# Readers take the message and an offset and return the value together with
+# the offset of the next field, the message itself is never sliced.
 
-def readUint32(p):
-    return struct.unpack(">I", p[:4])[0], p[4:]
+def readUint8(p, o):
+    return uint8.unpack_from(p, o)[0], o + 1
 
-def readInt8(p):
-    return struct.unpack(">b", p[:1])[0], p[1:]
+def readUint16(p, o):
+    return uint16.unpack_from(p, o)[0], o + 2
 
-def readInt16(p):
-    return struct.unpack(">h", p[:2])[0], p[2:]
+def readUint32(p, o):
+    return uint32.unpack_from(p, o)[0], o + 4
 
-def readInt32(p):
-    return struct.unpack(">i", p[:4])[0], p[4:]
+def readInt8(p, o):
+    return int8.unpack_from(p, o)[0], o + 1
 
-def readString(p):
-    s, np = readUint32(p)
-    if len(np) >= s:
-        return np[:s], np[s:]
+def readInt16(p, o):
+    return int16.unpack_from(p, o)[0], o + 2
+
+def readInt32(p, o):
+    return int32.unpack_from(p, o)[0], o + 4
+
+def readString(p, o):
+    # Returns a view into the message, see materialise()
+    s, no = readUint32(p, o)
+    if len(p) - no >= s:
+        return p[no:no + s], no + s
     else:
-        log.error('Error reading string %r%r%r', s, '>', len(np))
-        return '', p
+        log.error('Error reading string %r%r%r', s, '>', len(p) - no)
+        return b'', o
+
+def readUTF8String(p, o):
+    return readString(p, o)
 
-def readUTF8String(p):
-    return readString(p)
+def readBlob(p, o):
+    return readString(p, o)
 
-def readBlob(p):
-    return readString(p)
+def materialise(args):
+    return tuple(bytes(a) if a.__class__ is memoryview else a for a in args)
 
 CMD_MTK_GET_PROTOCOL_VERSION = 0
 CMD_MTK_GET_CODI_FLASH_VERSION = 1
@@ -170,781 +188,318 @@ CMD_ST_ENTRY_DEEP_SLEEP_STATUS = 145
 
 log = logging.getLogger('codi')
 
+def decodeNothing(msg, o):
+    return ()
+
+def decodeCoDiFlashVersionInfo(msg, o):
+    version, o = readString(msg, o)
+    return version,
+
+structProtocolVersionInfo = struct.Struct(">BB")
+
+def decodeSetBinary(msg, o):
+    data, o = readBlob(msg, o)
+    return data,
+
+structSetSigned8 = struct.Struct(">b")
+
+structRestart = struct.Struct(">I")
+
+structSetLocationStatus = struct.Struct(">H")
+
+structSetTorchStatus = struct.Struct(">H")
+
+structSetWiFiStatus = struct.Struct(">H")
+
+structSetBTStatus = struct.Struct(">H")
+
+structSetBatterySaverStatus = struct.Struct(">H")
+
+structSetFlightModeStatus = struct.Struct(">H")
+
+structSetHotspotStatus = struct.Struct(">H")
+
+structSetMobileDataStatus = struct.Struct(">H")
+
+structSetDoNotDisturbStatus = struct.Struct(">H")
+
+structSetVolumeLevel = struct.Struct(">HH")
+
+structGetVolumeLevel = struct.Struct(">H")
+
+structCoDiStatusInfo = struct.Struct(">III")
+
+structSetLock = struct.Struct(">H")
+
+structDismissCallSMS = struct.Struct(">II")
+
+def decodeDismissCallSMS(msg, o):
+    sim, line = structDismissCallSMS.unpack_from(msg, o)
+    o += 8
+    msisdn, o = readString(msg, o)
+    text, o = readUTF8String(msg, o)
+    return sim, line, msisdn, text
+
+structActionUnlock = struct.Struct(">I")
+
+def decodeActionUnlock(msg, o):
+    method, = structActionUnlock.unpack_from(msg, o)
+    o += 4
+    strdata, o = readString(msg, o)
+    return method, strdata
+
+structSTChargingInfo = struct.Struct(">II")
+
+structPlayDTMF = struct.Struct(">B")
+
+structSendDTMF = struct.Struct(">IIBB")
+
+structActionCall = struct.Struct(">IIII")
+
+def decodeActionCall(msg, o):
+    action, sim, line, numtype = structActionCall.unpack_from(msg, o)
+    o += 16
+    msisdn, o = readString(msg, o)
+    contact, o = readUTF8String(msg, o)
+    contact_id, o = readString(msg, o)
+    return action, sim, line, numtype, msisdn, contact, contact_id
+
+structSendTeleCode = struct.Struct(">II")
+
+def decodeSendTeleCode(msg, o):
+    sim, line = structSendTeleCode.unpack_from(msg, o)
+    o += 8
+    telecode, o = readString(msg, o)
+    return sim, line, telecode
+
+structSetCallMuteStatus = struct.Struct(">I")
+
+structSetCallOutput = struct.Struct(">I")
+
+structActionCamera = struct.Struct(">I")
+
+structSetCameraSettings = struct.Struct(">II")
+
+structActionVideo = struct.Struct(">I")
+
+structSetVideoSettings = struct.Struct(">II")
+
+structCurrentLanguageInfo = struct.Struct(">II")
+
+def decodeCurrentLanguageInfo(msg, o):
+    langid, o = readString(msg, o)
+    hasallresources, data1 = structCurrentLanguageInfo.unpack_from(msg, o)
+    o += 8
+    return langid, hasallresources, data1
+
+structMediaResourceInfo = struct.Struct(">II")
+
+def decodeMediaResourceInfo(msg, o):
+    typestr, o = readString(msg, o)
+    resname, o = readString(msg, o)
+    length, status = structMediaResourceInfo.unpack_from(msg, o)
+    o += 8
+    return typestr, resname, length, status
+
+structMediaActivityInfo = struct.Struct(">I")
+
+def decodeMediaActivityInfo(msg, o):
+    typestr, o = readString(msg, o)
+    resname, o = readString(msg, o)
+    status, = structMediaActivityInfo.unpack_from(msg, o)
+    o += 4
+    return typestr, resname, status
+
+structAlertInfo = struct.Struct(">II")
+
+def decodeAlertInfo(msg, o):
+    status, response = structAlertInfo.unpack_from(msg, o)
+    o += 8
+    responsestr, o = readUTF8String(msg, o)
+    return status, response, responsestr
+
+structGetCallHistory = struct.Struct(">I")
+
+structGetContacts = struct.Struct(">I")
+
+structActionPlayer = struct.Struct(">I")
+
+structActionNotification = struct.Struct(">III")
+
+def decodeGetLEDisonPattern(msg, o):
+    contactid, o = readString(msg, o)
+    contactname, o = readUTF8String(msg, o)
+    msisdn, o = readString(msg, o)
+    return contactid, contactname, msisdn
+
+def decodeGetContactIcon(msg, o):
+    contactid, o = readString(msg, o)
+    contactname, o = readUTF8String(msg, o)
+    msisdn, o = readString(msg, o)
+    return contactid, contactname, msisdn
+
+def decodeGetAlbumArt(msg, o):
+    mediasessionformat, o = readBlob(msg, o)
+    return mediasessionformat,
+
+structActionVoiceRecorder = struct.Struct(">I")
+
+structSetVoiceRecorderSettings = struct.Struct(">II")
+
+structSTDataChangeAlert = struct.Struct(">II")
+
+structCoDiOFF = struct.Struct(">BB")
+
+structMouseInfo = struct.Struct(">Bhh")
+
+structMouseInfo2 = struct.Struct(">BBHH")
+
+commands = {
+    CMD_ST32_INFO_CODI_FLASH_VERSION: ("CoDiFlashVersionInfo", decodeCoDiFlashVersionInfo, ("version",), True),
+    CMD_ST32_INFO_PROTOCOL_VERSION: ("ProtocolVersionInfo", structProtocolVersionInfo.unpack_from, ("majorVer", "minVer"), False),
+    CMD_ST32_SET_BINARY: ("SetBinary", decodeSetBinary, ("data",), True),
+    CMD_ST32_SET_S8: ("SetSigned8", structSetSigned8.unpack_from, ("num",), False),
+    CMD_ST32_RESTART: ("Restart", structRestart.unpack_from, ("restartmode",), False),
+    CMD_ST32_GET_DATETIME: ("GetDateTime", decodeNothing, (), False),
+    CMD_ST32_SET_LOCATION_STATUS: ("SetLocationStatus", structSetLocationStatus.unpack_from, ("status",), False),
+    CMD_ST32_GET_LOCATION_STATUS: ("GetLocationStatus", decodeNothing, (), False),
+    CMD_ST32_SET_TORCH_STATUS: ("SetTorchStatus", structSetTorchStatus.unpack_from, ("status",), False),
+    CMD_ST32_GET_TORCH_STATUS: ("GetTorchStatus", decodeNothing, (), False),
+    CMD_ST32_GET_COVER_STATUS: ("GetCoverStatus", decodeNothing, (), False),
+    CMD_ST32_SET_WIFI_STATUS: ("SetWiFiStatus", structSetWiFiStatus.unpack_from, ("status",), False),
+    CMD_ST32_GET_WIFI_STATUS: ("GetWiFiStatus", decodeNothing, (), False),
+    CMD_ST32_SET_BT_STATUS: ("SetBTStatus", structSetBTStatus.unpack_from, ("status",), False),
+    CMD_ST32_GET_BT_STATUS: ("GetBTStatus", decodeNothing, (), False),
+    CMD_ST32_SET_BATTERY_SAVER_STATUS: ("SetBatterySaverStatus", structSetBatterySaverStatus.unpack_from, ("status",), False),
+    CMD_ST32_GET_BATTERY_SAVER_STATUS: ("GetBatterySaverStatus", decodeNothing, (), False),
+    CMD_ST32_SET_FLIGHT_MODE_STATUS: ("SetFlightModeStatus", structSetFlightModeStatus.unpack_from, ("status",), False),
+    CMD_ST32_GET_FLIGHT_MODE_STATUS: ("GetFlightModeStatus", decodeNothing, (), False),
+    CMD_ST32_SET_HOTSPOT_STATUS: ("SetHotspotStatus", structSetHotspotStatus.unpack_from, ("status",), False),
+    CMD_ST32_GET_HOTSPOT_STATUS: ("GetHotspotStatus", decodeNothing, (), False),
+    CMD_ST32_SET_MOBILE_DATA_STATUS: ("SetMobileDataStatus", structSetMobileDataStatus.unpack_from, ("status",), False),
+    CMD_ST32_GET_MOBILE_DATA_STATUS: ("GetMobileDataStatus", decodeNothing, (), False),
+    CMD_ST32_SET_DND_STATUS: ("SetDoNotDisturbStatus", structSetDoNotDisturbStatus.unpack_from, ("status",), False),
+    CMD_ST32_GET_DND_STATUS: ("GetDoNotDisturbStatus", decodeNothing, (), False),
+    CMD_ST32_SET_VOLUME_LEVEL: ("SetVolumeLevel", structSetVolumeLevel.unpack_from, ("status", "stream"), False),
+    CMD_ST32_GET_VOLUME_LEVEL: ("GetVolumeLevel", structGetVolumeLevel.unpack_from, ("stream",), False),
+    CMD_ST32_GET_BATTERY_LEVEL: ("GetBatteryLevel", decodeNothing, (), False),
+    CMD_ST32_INFO_CODI_STATUS: ("CoDiStatusInfo", structCoDiStatusInfo.unpack_from, ("mode", "screen", "data1"), False),
+    CMD_ST32_SET_LOCK: ("SetLock", structSetLock.unpack_from, ("status",), False),
+    CMD_ST32_GET_LOCK_STATUS: ("GetLockStatus", decodeNothing, (), False),
+    CMD_ST32_DISMISS_CALL_SMS: ("DismissCallSMS", decodeDismissCallSMS, ("sim", "line", "msisdn", "text"), True),
+    CMD_ST32_ACTION_UNLOCK: ("ActionUnlock", decodeActionUnlock, ("method", "strdata"), True),
+    CMD_ST32_INFO_ST_CHARGING: ("STChargingInfo", structSTChargingInfo.unpack_from, ("status", "measurement"), False),
+    CMD_ST32_PLAY_DTMF: ("PlayDTMF", structPlayDTMF.unpack_from, ("ascii_num",), False),
+    CMD_ST32_SEND_DTMF: ("SendDTMF", structSendDTMF.unpack_from, ("sim", "line", "asciinum", "playit"), False),
+    CMD_ST32_ACTION_CALL: ("ActionCall", decodeActionCall, ("action", "sim", "line", "numtype", "msisdn", "contact", "contact_id"), True),
+    CMD_ST32_SEND_TELE_CODE: ("SendTeleCode", decodeSendTeleCode, ("sim", "line", "telecode"), True),
+    CMD_ST32_SET_CALL_MUTE_STATUS: ("SetCallMuteStatus", structSetCallMuteStatus.unpack_from, ("status",), False),
+    CMD_ST32_GET_CALL_MUTE_STATUS: ("GetCallMuteStatus", decodeNothing, (), False),
+    CMD_ST32_SET_CALL_OUTPUT: ("SetCallOutput", structSetCallOutput.unpack_from, ("status",), False),
+    CMD_ST32_GET_CALL_OUTPUT: ("GetCallOutput", decodeNothing, (), False),
+    CMD_ST32_GET_CALL_OUTPUT_OPTIONS: ("GetCallOutputOptions", decodeNothing, (), False),
+    CMD_ST32_ACTION_CAMERA: ("ActionCamera", structActionCamera.unpack_from, ("action",), False),
+    CMD_ST32_GET_CAMERA_FRAME: ("GetCameraFrame", decodeNothing, (), False),
+    CMD_ST32_SET_CAMERA_SETTINGS: ("SetCameraSettings", structSetCameraSettings.unpack_from, ("parameter", "value"), False),
+    CMD_ST32_CAMERA_CAPTURE_IMAGE: ("CameraCaptureImage", decodeNothing, (), False),
+    CMD_ST32_ACTION_VIDEO: ("ActionVideo", structActionVideo.unpack_from, ("action",), False),
+    CMD_ST32_GET_VIDEO_FRAME: ("GetVideoFrame", decodeNothing, (), False),
+    CMD_ST32_SET_VIDEO_SETTINGS: ("SetVideoSettings", structSetVideoSettings.unpack_from, ("parameter", "value"), False),
+    CMD_ST32_VIDEO_CAPTURE_IMAGE: ("VideoCaptureImage", decodeNothing, (), False),
+    CMD_ST32_GET_COVER_LIGHT_SENSOR: ("GetCoverLightSensor", decodeNothing, (), False),
+    CMD_ST32_INFO_CURRENT_LANGUAGE: ("CurrentLanguageInfo", decodeCurrentLanguageInfo, ("langid", "hasallresources", "data1"), True),
+    CMD_ST32_INFO_MEDIA_RESOURCE: ("MediaResourceInfo", decodeMediaResourceInfo, ("typestr", "resname", "length", "status"), True),
+    CMD_ST32_INFO_MEDIA_ACTIVITY: ("MediaActivityInfo", decodeMediaActivityInfo, ("typestr", "resname", "status"), True),
+    CMD_ST32_INFO_ALERT: ("AlertInfo", decodeAlertInfo, ("status", "response", "responsestr"), True),
+    CMD_ST32_GET_ORIENTATION: ("GetOrientation", decodeNothing, (), False),
+    CMD_ST32_GET_CALL_HISTORY: ("GetCallHistory", structGetCallHistory.unpack_from, ("index",), False),
+    CMD_ST32_GET_CONTACTS: ("GetContacts", structGetContacts.unpack_from, ("index",), False),
+    CMD_ST32_ACTION_PLAYER: ("ActionPlayer", structActionPlayer.unpack_from, ("action",), False),
+    CMD_ST32_ACTION_NOTIFICATION: ("ActionNotification", structActionNotification.unpack_from, ("notid", "action", "pos"), False),
+    CMD_ST32_GET_LEDISON_PATTERN: ("GetLEDisonPattern", decodeGetLEDisonPattern, ("contactid", "contactname", "msisdn"), True),
+    CMD_ST32_GET_LEDISON_MODE: ("GetLEDisonMode", decodeNothing, (), False),
+    CMD_ST32_GET_CONTACT_ICON: ("GetContactIcon", decodeGetContactIcon, ("contactid", "contactname", "msisdn"), True),
+    CMD_ST32_GET_MODEM_SIGNAL_INFO: ("GetModemSignalInfo", decodeNothing, (), False),
+    CMD_ST32_GET_DATE_TIME_FORMAT: ("GetDateTimeFormat", decodeNothing, (), False),
+    CMD_ST32_GET_ALBUM_ART: ("GetAlbumArt", decodeGetAlbumArt, ("mediasessionformat",), True),
+    CMD_ST32_ACTION_VOICE_RECODER: ("ActionVoiceRecorder", structActionVoiceRecorder.unpack_from, ("action",), False),
+    CMD_ST32_SET_VOICE_RECORDER_SETTINGS: ("SetVoiceRecorderSettings", structSetVoiceRecorderSettings.unpack_from, ("parameter", "value"), False),
+    CMD_ST32_DATA_CHANGE_ALERT: ("STDataChangeAlert", structSTDataChangeAlert.unpack_from, ("type", "data1"), False),
+    CMD_SYNC_SYS_SLEEP_STATUS: ("CoDiOFF", structCoDiOFF.unpack_from, ("par1", "par2"), False),
+    147: ("MouseInfo", structMouseInfo.unpack_from, ("mode", "x_coord", "y_coord"), False),
+    148: ("MouseInfo2", structMouseInfo2.unpack_from, ("pressState", "previousState", "x_coord", "y_coord"), False),
+}
+
+# Handlers of the same category run in order, see HandlerExecutor
+categories = {
+    147: "mouse",
+    148: "mouse",
+    CMD_ST32_DISMISS_CALL_SMS: "call",
+    CMD_ST32_PLAY_DTMF: "call",
+    CMD_ST32_SEND_DTMF: "call",
+    CMD_ST32_ACTION_CALL: "call",
+    CMD_ST32_SEND_TELE_CODE: "call",
+    CMD_ST32_SET_CALL_MUTE_STATUS: "call",
+    CMD_ST32_GET_CALL_MUTE_STATUS: "call",
+    CMD_ST32_SET_CALL_OUTPUT: "call",
+    CMD_ST32_GET_CALL_OUTPUT: "call",
+    CMD_ST32_GET_CALL_OUTPUT_OPTIONS: "call",
+    CMD_ST32_GET_CONTACTS: "contacts",
+    CMD_ST32_GET_CONTACT_ICON: "contacts",
+    CMD_ST32_GET_LEDISON_PATTERN: "contacts",
+    CMD_ST32_GET_CALL_HISTORY: "history",
+}
+DEFAULT_CATEGORY = "device"
+# Mouse handlers only pass the motion on to PointerDevice's emitter thread.
+# They run on the reader thread, a hand-off would cost more than they do.
+INLINE_CATEGORIES = {"mouse"}
+
+unknownCommands = collections.Counter()
+
 def readMessage(msg):
-    cmdId, msg = readUint32(msg)
+    msg = memoryview(msg)
+    try:
+        cmdId, sessionId = header.unpack_from(msg, 0)
+    except struct.error as e:
+        log.error("<- Message too short: %r", e)
+        return
     # log.info("Got cmdId %r", cmdId)
-    sessionId, msg = readUint32(msg)
     # log.info("Got sessionId %r", sessionId)
-    handled = False
-    if cmdId == CMD_ST32_INFO_CODI_FLASH_VERSION:
-        handled = True
-        log.info("<- CoDiFlashVersionInfo")
-        try:
-            version, msg = readString(msg)
-            log.info("version = %r", version)
-            cf.CoDiFlashVersionInfo(version)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_INFO_PROTOCOL_VERSION:
-        handled = True
-        log.info("<- ProtocolVersionInfo")
-        try:
-            majorVer, msg = readUint8(msg)
-            minVer, msg = readUint8(msg)
-            log.info("majorVer = %r", majorVer)
-            log.info("minVer = %r", minVer)
-            cf.ProtocolVersionInfo(majorVer, minVer)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_SET_BINARY:
-        handled = True
-        log.info("<- SetBinary")
-        try:
-            data, msg = readBlob(msg)
-            log.info("data = %r", data)
-            cf.SetBinary(data)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_SET_S8:
-        handled = True
-        log.info("<- SetSigned8")
-        try:
-            num, msg = readInt8(msg)
-            log.info("num = %r", num)
-            cf.SetSigned8(num)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_RESTART:
-        handled = True
-        log.info("<- Restart")
-        try:
-            restartmode, msg = readUint32(msg)
-            log.info("restartmode = %r", restartmode)
-            cf.Restart(restartmode)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_DATETIME:
-        handled = True
-        log.info("<- GetDateTime")
-        try:
-            cf.GetDateTime()
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_SET_LOCATION_STATUS:
-        handled = True
-        log.info("<- SetLocationStatus")
-        try:
-            status, msg = readUint16(msg)
-            log.info("status = %r", status)
-            cf.SetLocationStatus(status)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_LOCATION_STATUS:
-        handled = True
-        log.info("<- GetLocationStatus")
-        try:
-            cf.GetLocationStatus()
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_SET_TORCH_STATUS:
-        handled = True
-        log.info("<- SetTorchStatus")
-        try:
-            status, msg = readUint16(msg)
-            log.info("status = %r", status)
-            cf.SetTorchStatus(status)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_TORCH_STATUS:
-        handled = True
-        log.info("<- GetTorchStatus")
-        try:
-            cf.GetTorchStatus()
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_COVER_STATUS:
-        handled = True
-        log.info("<- GetCoverStatus")
-        try:
-            cf.GetCoverStatus()
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_SET_WIFI_STATUS:
-        handled = True
-        log.info("<- SetWiFiStatus")
-        try:
-            status, msg = readUint16(msg)
-            log.info("status = %r", status)
-            cf.SetWiFiStatus(status)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_WIFI_STATUS:
-        handled = True
-        log.info("<- GetWiFiStatus")
-        try:
-            cf.GetWiFiStatus()
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_SET_BT_STATUS:
-        handled = True
-        log.info("<- SetBTStatus")
-        try:
-            status, msg = readUint16(msg)
-            log.info("status = %r", status)
-            cf.SetBTStatus(status)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_BT_STATUS:
-        handled = True
-        log.info("<- GetBTStatus")
-        try:
-            cf.GetBTStatus()
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_SET_BATTERY_SAVER_STATUS:
-        handled = True
-        log.info("<- SetBatterySaverStatus")
-        try:
-            status, msg = readUint16(msg)
-            log.info("status = %r", status)
-            cf.SetBatterySaverStatus(status)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_BATTERY_SAVER_STATUS:
-        handled = True
-        log.info("<- GetBatterySaverStatus")
-        try:
-            cf.GetBatterySaverStatus()
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_SET_FLIGHT_MODE_STATUS:
-        handled = True
-        log.info("<- SetFlightModeStatus")
-        try:
-            status, msg = readUint16(msg)
-            log.info("status = %r", status)
-            cf.SetFlightModeStatus(status)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_FLIGHT_MODE_STATUS:
-        handled = True
-        log.info("<- GetFlightModeStatus")
-        try:
-            cf.GetFlightModeStatus()
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_SET_HOTSPOT_STATUS:
-        handled = True
-        log.info("<- SetHotspotStatus")
-        try:
-            status, msg = readUint16(msg)
-            log.info("status = %r", status)
-            cf.SetHotspotStatus(status)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_HOTSPOT_STATUS:
-        handled = True
-        log.info("<- GetHotspotStatus")
-        try:
-            cf.GetHotspotStatus()
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_SET_MOBILE_DATA_STATUS:
-        handled = True
-        log.info("<- SetMobileDataStatus")
-        try:
-            status, msg = readUint16(msg)
-            log.info("status = %r", status)
-            cf.SetMobileDataStatus(status)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_MOBILE_DATA_STATUS:
-        handled = True
-        log.info("<- GetMobileDataStatus")
-        try:
-            cf.GetMobileDataStatus()
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_SET_DND_STATUS:
-        handled = True
-        log.info("<- SetDoNotDisturbStatus")
-        try:
-            status, msg = readUint16(msg)
-            log.info("status = %r", status)
-            cf.SetDoNotDisturbStatus(status)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_DND_STATUS:
-        handled = True
-        log.info("<- GetDoNotDisturbStatus")
-        try:
-            cf.GetDoNotDisturbStatus()
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_SET_VOLUME_LEVEL:
-        handled = True
-        log.info("<- SetVolumeLevel")
-        try:
-            status, msg = readUint16(msg)
-            stream, msg = readUint16(msg)
-            log.info("status = %r", status)
-            log.info("stream = %r", stream)
-            cf.SetVolumeLevel(status, stream)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_VOLUME_LEVEL:
-        handled = True
-        log.info("<- GetVolumeLevel")
-        try:
-            stream, msg = readUint16(msg)
-            log.info("stream = %r", stream)
-            cf.GetVolumeLevel(stream)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_BATTERY_LEVEL:
-        handled = True
-        log.info("<- GetBatteryLevel")
-        try:
-            cf.GetBatteryLevel()
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_INFO_CODI_STATUS:
-        handled = True
-        log.info("<- CoDiStatusInfo")
-        try:
-            mode, msg = readUint32(msg)
-            screen, msg = readUint32(msg)
-            data1, msg = readUint32(msg)
-            log.info("mode = %r", mode)
-            log.info("screen = %r", screen)
-            log.info("data1 = %r", data1)
-            cf.CoDiStatusInfo(mode, screen, data1)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_SET_LOCK:
-        handled = True
-        log.info("<- SetLock")
-        try:
-            status, msg = readUint16(msg)
-            log.info("status = %r", status)
-            cf.SetLock(status)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_LOCK_STATUS:
-        handled = True
-        log.info("<- GetLockStatus")
-        try:
-            cf.GetLockStatus()
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_DISMISS_CALL_SMS:
-        handled = True
-        log.info("<- DismissCallSMS")
-        try:
-            sim, msg = readUint32(msg)
-            line, msg = readUint32(msg)
-            msisdn, msg = readString(msg)
-            text, msg = readUTF8String(msg)
-            log.info("sim = %r", sim)
-            log.info("line = %r", line)
-            log.info("msisdn = %r", msisdn)
-            log.info("text = %r", text)
-            cf.DismissCallSMS(sim, line, msisdn, text)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_ACTION_UNLOCK:
-        handled = True
-        log.info("<- ActionUnlock")
-        try:
-            method, msg = readUint32(msg)
-            strdata, msg = readString(msg)
-            log.info("method = %r", method)
-            log.info("strdata = %r", strdata)
-            cf.ActionUnlock(method, strdata)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_INFO_ST_CHARGING:
-        handled = True
-        log.info("<- STChargingInfo")
-        try:
-            status, msg = readUint32(msg)
-            measurement, msg = readUint32(msg)
-            log.info("status = %r", status)
-            log.info("measurement = %r", measurement)
-            cf.STChargingInfo(status, measurement)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_PLAY_DTMF:
-        handled = True
-        log.info("<- PlayDTMF")
-        try:
-            ascii_num, msg = readUint8(msg)
-            log.info("ascii_num = %r", ascii_num)
-            cf.PlayDTMF(ascii_num)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_SEND_DTMF:
-        handled = True
-        log.info("<- SendDTMF")
-        try:
-            sim, msg = readUint32(msg)
-            line, msg = readUint32(msg)
-            asciinum, msg = readUint8(msg)
-            playit, msg = readUint8(msg)
-            log.info("sim = %r", sim)
-            log.info("line = %r", line)
-            log.info("asciinum = %r", asciinum)
-            log.info("playit = %r", playit)
-            cf.SendDTMF(sim, line, asciinum, playit)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_ACTION_CALL:
-        handled = True
-        log.info("<- ActionCall")
-        try:
-            action, msg = readUint32(msg)
-            sim, msg = readUint32(msg)
-            line, msg = readUint32(msg)
-            numtype, msg = readUint32(msg)
-            msisdn, msg = readString(msg)
-            contact, msg = readUTF8String(msg)
-            contact_id, msg = readString(msg)
-            log.info("action = %r", action)
-            log.info("sim = %r", sim)
-            log.info("line = %r", line)
-            log.info("numtype = %r", numtype)
-            log.info("msisdn = %r", msisdn)
-            log.info("contact = %r", contact)
-            log.info("contact_id = %r", contact_id)
-            cf.ActionCall(action, sim, line, numtype, msisdn, contact, contact_id)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_SEND_TELE_CODE:
-        handled = True
-        log.info("<- SendTeleCode")
-        try:
-            sim, msg = readUint32(msg)
-            line, msg = readUint32(msg)
-            telecode, msg = readString(msg)
-            log.info("sim = %r", sim)
-            log.info("line = %r", line)
-            log.info("telecode = %r", telecode)
-            cf.SendTeleCode(sim, line, telecode)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_SET_CALL_MUTE_STATUS:
-        handled = True
-        log.info("<- SetCallMuteStatus")
-        try:
-            status, msg = readUint32(msg)
-            log.info("status = %r", status)
-            cf.SetCallMuteStatus(status)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_CALL_MUTE_STATUS:
-        handled = True
-        log.info("<- GetCallMuteStatus")
-        try:
-            cf.GetCallMuteStatus()
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_SET_CALL_OUTPUT:
-        handled = True
-        log.info("<- SetCallOutput")
-        try:
-            status, msg = readUint32(msg)
-            log.info("status = %r", status)
-            cf.SetCallOutput(status)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_CALL_OUTPUT:
-        handled = True
-        log.info("<- GetCallOutput")
-        try:
-            cf.GetCallOutput()
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_CALL_OUTPUT_OPTIONS:
-        handled = True
-        log.info("<- GetCallOutputOptions")
-        try:
-            cf.GetCallOutputOptions()
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_ACTION_CAMERA:
-        handled = True
-        log.info("<- ActionCamera")
-        try:
-            action, msg = readUint32(msg)
-            log.info("action = %r", action)
-            cf.ActionCamera(action)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_CAMERA_FRAME:
-        handled = True
-        log.info("<- GetCameraFrame")
-        try:
-            cf.GetCameraFrame()
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_SET_CAMERA_SETTINGS:
-        handled = True
-        log.info("<- SetCameraSettings")
-        try:
-            parameter, msg = readUint32(msg)
-            value, msg = readUint32(msg)
-            log.info("parameter = %r", parameter)
-            log.info("value = %r", value)
-            cf.SetCameraSettings(parameter, value)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_CAMERA_CAPTURE_IMAGE:
-        handled = True
-        log.info("<- CameraCaptureImage")
-        try:
-            cf.CameraCaptureImage()
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_ACTION_VIDEO:
-        handled = True
-        log.info("<- ActionVideo")
-        try:
-            action, msg = readUint32(msg)
-            log.info("action = %r", action)
-            cf.ActionVideo(action)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_VIDEO_FRAME:
-        handled = True
-        log.info("<- GetVideoFrame")
-        try:
-            cf.GetVideoFrame()
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_SET_VIDEO_SETTINGS:
-        handled = True
-        log.info("<- SetVideoSettings")
-        try:
-            parameter, msg = readUint32(msg)
-            value, msg = readUint32(msg)
-            log.info("parameter = %r", parameter)
-            log.info("value = %r", value)
-            cf.SetVideoSettings(parameter, value)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_VIDEO_CAPTURE_IMAGE:
-        handled = True
-        log.info("<- VideoCaptureImage")
-        try:
-            cf.VideoCaptureImage()
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_COVER_LIGHT_SENSOR:
-        handled = True
-        log.info("<- GetCoverLightSensor")
-        try:
-            cf.GetCoverLightSensor()
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_INFO_CURRENT_LANGUAGE:
-        handled = True
-        log.info("<- CurrentLanguageInfo")
-        try:
-            langid, msg = readString(msg)
-            hasallresources, msg = readUint32(msg)
-            data1, msg = readUint32(msg)
-            log.info("langid = %r", langid)
-            log.info("hasallresources = %r", hasallresources)
-            log.info("data1 = %r", data1)
-            cf.CurrentLanguageInfo(langid, hasallresources, data1)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_INFO_MEDIA_RESOURCE:
-        handled = True
-        log.info("<- MediaResourceInfo")
-        try:
-            typestr, msg = readString(msg)
-            resname, msg = readString(msg)
-            length, msg = readUint32(msg)
-            status, msg = readUint32(msg)
-            log.info("typestr = %r", typestr)
-            log.info("resname = %r", resname)
-            log.info("length = %r", length)
-            log.info("status = %r", status)
-            cf.MediaResourceInfo(typestr, resname, length, status)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_INFO_MEDIA_ACTIVITY:
-        handled = True
-        log.info("<- MediaActivityInfo")
-        try:
-            typestr, msg = readString(msg)
-            resname, msg = readString(msg)
-            status, msg = readUint32(msg)
-            log.info("typestr = %r", typestr)
-            log.info("resname = %r", resname)
-            log.info("status = %r", status)
-            cf.MediaActivityInfo(typestr, resname, status)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_INFO_ALERT:
-        handled = True
-        log.info("<- AlertInfo")
-        try:
-            status, msg = readUint32(msg)
-            response, msg = readUint32(msg)
-            responsestr, msg = readUTF8String(msg)
-            log.info("status = %r", status)
-            log.info("response = %r", response)
-            log.info("responsestr = %r", responsestr)
-            cf.AlertInfo(status, response, responsestr)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_ORIENTATION:
-        handled = True
-        log.info("<- GetOrientation")
-        try:
-            cf.GetOrientation()
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_CALL_HISTORY:
-        handled = True
-        log.info("<- GetCallHistory")
-        try:
-            index, msg = readUint32(msg)
-            log.info("index = %r", index)
-            cf.GetCallHistory(index)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_CONTACTS:
-        handled = True
-        log.info("<- GetContacts")
-        try:
-            index, msg = readUint32(msg)
-            log.info("index = %r", index)
-            cf.GetContacts(index)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_ACTION_PLAYER:
-        handled = True
-        log.info("<- ActionPlayer")
-        try:
-            action, msg = readUint32(msg)
-            log.info("action = %r", action)
-            cf.ActionPlayer(action)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_ACTION_NOTIFICATION:
-        handled = True
-        log.info("<- ActionNotification")
-        try:
-            notid, msg = readUint32(msg)
-            action, msg = readUint32(msg)
-            pos, msg = readUint32(msg)
-            log.info("notid = %r", notid)
-            log.info("action = %r", action)
-            log.info("pos = %r", pos)
-            cf.ActionNotification(notid, action, pos)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_LEDISON_PATTERN:
-        handled = True
-        log.info("<- GetLEDisonPattern")
-        try:
-            contactid, msg = readString(msg)
-            contactname, msg = readUTF8String(msg)
-            msisdn, msg = readString(msg)
-            log.info("contactid = %r", contactid)
-            log.info("contactname = %r", contactname)
-            log.info("msisdn = %r", msisdn)
-            cf.GetLEDisonPattern(contactid, contactname, msisdn)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_LEDISON_MODE:
-        handled = True
-        log.info("<- GetLEDisonMode")
-        try:
-            cf.GetLEDisonMode()
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_CONTACT_ICON:
-        handled = True
-        log.info("<- GetContactIcon")
-        try:
-            contactid, msg = readString(msg)
-            contactname, msg = readUTF8String(msg)
-            msisdn, msg = readString(msg)
-            log.info("contactid = %r", contactid)
-            log.info("contactname = %r", contactname)
-            log.info("msisdn = %r", msisdn)
-            cf.GetContactIcon(contactid, contactname, msisdn)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_MODEM_SIGNAL_INFO:
-        handled = True
-        log.info("<- GetModemSignalInfo")
-        try:
-            cf.GetModemSignalInfo()
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_DATE_TIME_FORMAT:
-        handled = True
-        log.info("<- GetDateTimeFormat")
-        try:
-            cf.GetDateTimeFormat()
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_GET_ALBUM_ART:
-        handled = True
-        log.info("<- GetAlbumArt")
-        try:
-            mediasessionformat, msg = readBlob(msg)
-            log.info("mediasessionformat =", mediasessionformat)
-            cf.GetAlbumArt(mediasessionformat)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_ACTION_VOICE_RECODER:
-        handled = True
-        log.info("<- ActionVoiceRecorder")
-        try:
-            action, msg = readUint32(msg)
-            log.info("action = %r", action)
-            cf.ActionVoiceRecorder(action)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_SET_VOICE_RECORDER_SETTINGS:
-        handled = True
-        log.info("<- SetVoiceRecorderSettings")
-        try:
-            parameter, msg = readUint32(msg)
-            value, msg = readUint32(msg)
-            log.info("parameter = %r", parameter)
-            log.info("value = %r", value)
-            cf.SetVoiceRecorderSettings(parameter, value)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_ST32_DATA_CHANGE_ALERT:
-        handled = True
-        log.info("<- STDataChangeAlert")
-        try:
-            type, msg = readUint32(msg)
-            data1, msg = readUint32(msg)
-            log.info("type = %r", type)
-            log.info("data1 = %r", data1)
-            cf.STDataChangeAlert(type, data1)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == CMD_SYNC_SYS_SLEEP_STATUS:
-        handled = True
-        log.info("<- CoDiOFF")
-        try:
-            par1, msg = readUint8(msg)
-            log.info("par1 = %r", par1)
-            par2, msg = readUint8(msg)
-            log.info("par2 = %r", par2)
-            cf.CoDiOFF(par1, par2)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == 147:
-        handled = True
-        log.info("<- MouseInfo")
-        try:
-            mode, msg = readUint8(msg)
-            log.info("mode = %r", mode)
-            x_coord, msg = readInt16(msg)
-            log.info("x_coord = %r", x_coord)
-            y_coord, msg = readInt16(msg)
-            log.info("y_coord = %r", y_coord)
-            cf.MouseInfo(mode, x_coord, y_coord)
-        except Exception as e:
-            log.error(e)
-
-    if cmdId == 148:
-        handled = True
-        log.info("<- MouseInfo2")
-        try:
-            pressState, msg = readUint8(msg)
-            log.info("pressState = %r", pressState)
-            previousState, msg = readUint8(msg)
-            log.info("previousSatate = %r", previousState)
-            x_coord, msg = readUint16(msg)
-            log.info("x_coord = %r", x_coord)
-            y_coord, msg = readUint16(msg)
-            log.info("y_coord = %r", y_coord)
-            cf.MouseInfo2(pressState, previousState, x_coord, y_coord)
-        except Exception as e:
-            log.error(e)
-
-    if not handled:
-        log.info("<- Unrecognised command %r", cmdId)
\ No newline at end of file
+    command = commands.get(cmdId)
+    if command is None:
+        unknownCommands[cmdId] += 1
+        log.info("<- Unrecognised command %r", cmdId)
+        return
+
+    name, decode, fields, hasStrings = command
+    log.info("<- %s", name)
+    isReply = False
+    try:
+        args = decode(msg, header.size)
+        handler = getattr(cf, name, None)
+        verbose = log.isEnabledFor(logging.INFO)
+        isReply = RequestTracker.isExpected(cmdId)
+        # Strings are views into the reader's buffer, which the next read
+        # reuses. Handlers run later on HandlerExecutor, so whenever there
+        # is one the strings are copied; only unhandled commands skip it.
+        if hasStrings and (handler is not None or verbose or isReply):
+            args = materialise(args)
+        if verbose:
+            for i in range(len(fields)):
+                log.info("%s = %r", fields[i], args[i])
+        if handler is None:
+            log.error("No handler for %s", name)
+        elif isReply:
+            # Run inline so whoever waits for the reply sees its effects
+            handler(*args)
+        else:
+            category = categories.get(cmdId, DEFAULT_CATEGORY)
+            if category in INLINE_CATEGORIES:
+                handler(*args)
+            else:
+                HandlerExecutor.submit(category, handler, args)
+    except Exception as e:
+        log.error(e)
+
+    if isReply:
+        RequestTracker.resolve(cmdId, sessionId, args)
@@ -0,0 +1,31 @@
+import sys
+import types
+
+# The handlers import GLib and pydbus at module level. Where those aren't
+# installed they are replaced with stand-ins that accept the calls made at
+# import and setup time; no main loop or bus is ever run by the tests.
+try:
+    from gi.repository import GLib
+except ImportError:
+    GLib = types.ModuleType('GLib')
+    GLib.PRIORITY_DEFAULT = 0
+    GLib.IO_IN = 1
+    GLib.IO_ERR = 8
+    GLib.IO_HUP = 16
+    GLib.io_add_watch = lambda *args: 1
+    GLib.timeout_add = lambda *args: 1
+    GLib.idle_add = lambda *args: 1
+    GLib.source_remove = lambda *args: None
+    gi = types.ModuleType('gi')
+    gi.repository = types.ModuleType('gi.repository')
+    gi.repository.GLib = GLib
+    sys.modules['gi'] = gi
+    sys.modules['gi.repository'] = gi.repository
+    sys.modules['gi.repository.GLib'] = GLib
+
+try:
+    import pydbus
+except ImportError:
+    pydbus = types.ModuleType('pydbus')
+    pydbus.SystemBus = pydbus.SessionBus = lambda: None
+    sys.modules['pydbus'] = pydbus
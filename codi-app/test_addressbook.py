@@ -0,0 +1,66 @@
+import sqlite3
+import CodiStatus
+import Addressbook
+
+
+def test_normalise_number():
+    assert Addressbook.normaliseNumber('+44 (0)7700-900 123') == '4407700900123'
+
+
+def test_name_for_number():
+    Addressbook.setContacts([('1', 'Zoe', '+44 7700 900123'),
+                             ('2', 'Bob', '112'),
+                             ('3', 'Ann', '07700 900456')])
+    assert Addressbook.contactNameForNumber('07700900123') == 'Zoe'
+    assert Addressbook.contactNameForNumber('+447700900123') == 'Zoe'
+    assert Addressbook.contactNameForNumber('+447700900456') == 'Ann'
+    assert Addressbook.contactNameForNumber('112') == 'Bob'
+    assert Addressbook.contactNameForNumber('0112') == 'Unknown'
+    assert Addressbook.contactNameForNumber('07700900999') == 'Unknown'
+    assert Addressbook.contactNameForNumber('') == 'Unknown'
+
+
+def test_exact_match_wins_over_suffix():
+    Addressbook.setContacts([('1', 'UK', '+44 7700 900123'),
+                             ('2', 'Other', '+33 7700 900123')])
+    assert Addressbook.contactNameForNumber('+337700900123') == 'Other'
+    assert Addressbook.contactNameForNumber('07700900123') == 'UK'
+
+
+def test_read_contacts():
+    conn = sqlite3.connect(':memory:')
+    conn.execute('create table folder_id (uid text, vcard text)')
+    cards = ['BEGIN:VCARD\r\nUID:a\r\nFN:Zoe\r\nTEL;TYPE=CELL:+44 7700 900123\r\n'
+             'TEL;X-EVOLUTION-E164=112;TYPE=HOME:112\r\nEND:VCARD',
+             'BEGIN:VCARD\nUID:b\nFN:Bob\nTEL;TYPE=CELL:0123\nX-DELETED-AT:2021\nEND:VCARD',
+             'BEGIN:VCARD\nUID:c\nTEL;TYPE=CELL:0456\nEND:VCARD']
+    conn.executemany('insert into folder_id values (?, ?)', [('x', c) for c in cards])
+    assert list(Addressbook.readContacts(conn)) == [('a', 'Zoe', '+44 7700 900123'),
+                                                    ('a', 'Zoe', '112')]
+
+
+def test_contact_changes():
+    Addressbook.setContacts([('1', 'Zoe', '112'), ('2', 'Bob', '113'), ('2', 'Bob', '114')])
+    generation = Addressbook.generation
+    assert Addressbook.setContacts([('1', 'Zoe', '112'), ('2', 'Bob', '113'), ('2', 'Bob', '114')]) is None
+    assert Addressbook.generation == generation
+
+    change = Addressbook.setContacts([('2', 'Bob', '113'), ('3', 'Ann', '115')])
+    assert change == (generation + 1, True)
+
+    # A new contact without a number collision doesn't rename any caller
+    change = Addressbook.setContacts([('2', 'Bob', '113'), ('3', 'Ann', '115'), ('4', 'Eve', '')])
+    assert change == (generation + 2, False)
+
+
+def test_sorted_with_letter_index():
+    Addressbook.setContacts([('1', 'zoe', '1'), ('2', 'Émile', '2'), ('3', 'Adam', '3'),
+                             ('4', '112 Emergency', '4'), ('5', 'eve', '5'), ('6', 'Zack', '6')])
+    assert [c[1] for c in CodiStatus.Contacts] == ['112 Emergency', 'Adam', 'Émile', 'eve', 'Zack', 'zoe']
+    assert Addressbook.letterIndex == (['#', 'a', 'e', 'z'], [0, 1, 2, 4])
+    assert Addressbook.indexForLetter('E') == 2
+    assert Addressbook.indexForLetter('é') == 2
+    assert Addressbook.indexForLetter('b') == 2
+    assert Addressbook.indexForLetter('1') == 0
+    assert Addressbook.indexForLetter('ж') == 4
+    assert Addressbook.pageForLetter('z') == 0
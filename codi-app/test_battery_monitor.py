@@ -0,0 +1,60 @@
+import types
+import pytest
+import BatteryMonitor
+import DeviceState
+import LEDManager
+
+
+@pytest.fixture
+def monitor(monkeypatch):
+    timers = types.SimpleNamespace(added=0, removed=0)
+
+    def timeout_add(ms, callback):
+        timers.added += 1
+        return timers.added
+
+    def source_remove(source):
+        timers.removed += 1
+
+    monkeypatch.setattr(BatteryMonitor, 'GLib', types.SimpleNamespace(timeout_add=timeout_add,
+                                                                      source_remove=source_remove))
+    for name in ('timer', 'firstSignal', 'energy', 'energyFull', 'state', 'sentLevel', 'sentCharging'):
+        monkeypatch.setattr(BatteryMonitor, name, None)
+    monkeypatch.setattr(BatteryMonitor, 'pending', {})
+    monkeypatch.setattr(BatteryMonitor, 'stats', dict.fromkeys(BatteryMonitor.stats, 0))
+    leds = []
+    monkeypatch.setattr(LEDManager, 'ledsCharging', leds.append)
+    levels = []
+    monkeypatch.setattr(DeviceState, 'set', lambda **changes: levels.append(changes['batteryLevel']))
+    return types.SimpleNamespace(timers=timers, leds=leds, levels=levels)
+
+
+def test_burst_restarts_the_timer(monitor, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(BatteryMonitor.time, 'monotonic', lambda: now[0])
+    for i in range(3):
+        BatteryMonitor.propertiesChanged({'Energy': 50.0 + i})
+        now[0] += 0.5
+    assert (monitor.timers.added, monitor.timers.removed) == (3, 2)
+
+    # Past MAX_WAIT the pending update is left to fire
+    now[0] += BatteryMonitor.MAX_WAIT
+    BatteryMonitor.propertiesChanged({'Energy': 60.0})
+    assert (monitor.timers.added, monitor.timers.removed) == (3, 2)
+    assert BatteryMonitor.pending == {'Energy': 60.0}
+
+
+def test_only_changes_are_sent(monitor):
+    BatteryMonitor.propertiesChanged({'Energy': 50.4, 'EnergyFull': 100.0, 'State': 1})
+    BatteryMonitor.update()
+    BatteryMonitor.propertiesChanged({'Energy': 50.9, 'State': 1})
+    BatteryMonitor.update()
+    assert monitor.levels == [50]
+    assert monitor.leds == [True]
+
+    BatteryMonitor.propertiesChanged({'Energy': 51.0, 'State': 2})
+    BatteryMonitor.update()
+    assert monitor.levels == [50, 51]
+    assert monitor.leds == [True, False]
+    assert BatteryMonitor.stats == {'signals': 3, 'updates': 3, 'levelSent': 2, 'levelSuppressed': 1,
+                                    'chargingSent': 2, 'chargingSuppressed': 1}
@@ -0,0 +1,105 @@
+import os
+import sqlite3
+import tempfile
+import time
+import Addressbook
+import CallHistory
+import CallLogWriter
+
+
+def createDb(path, count):
+    conn = sqlite3.connect(path)
+    conn.execute('create table voice_events (accountId, threadId, eventId, senderId, timestamp, '
+                 'newEvent, duration, missed, remoteParticipant)')
+    # Pairs of calls share a timestamp to exercise the rowid tie break
+    conn.executemany('insert into voice_events values (?, ?, ?, ?, ?, 0, 0, 0, ?)',
+                     [('ofono/ofono/ril_0', str(i), str(i), 'self',
+                       '2021-01-01T00:%02d:%02d.000Z' % (i // 120, i // 2 % 60), str(i))
+                      for i in range(count)])
+    conn.commit()
+    conn.close()
+
+
+def test_pages_in_order(monkeypatch):
+    with tempfile.TemporaryDirectory() as d:
+        monkeypatch.setattr(CallHistory, 'HISTORY_DB', os.path.join(d, 'history.sqlite'))
+        createDb(CallHistory.HISTORY_DB, 45)
+        seen = []
+        with CallHistory.lock:
+            CallHistory.checkForChanges()
+            for index in range(0, 50, CallHistory.PAGE_SIZE):
+                seen += [r[1] for r in CallHistory.fetchPage(index)]
+            assert seen == [str(i) for i in reversed(range(45))]
+            assert CallHistory.stats['keyset'] == 4
+
+            # A jump to an unvisited page falls back to an offset
+            CallHistory.cursors.clear()
+            rows = CallHistory.fetchPage(20)
+            assert [r[1] for r in rows] == [str(i) for i in range(24, 14, -1)]
+
+        pages = []
+        for index in range(0, 50, CallHistory.PAGE_SIZE):
+            total, frames = CallHistory.getPage(index)
+            assert total == 45
+            pages.append(len(frames))
+            CallHistory.prefetch(index + CallHistory.PAGE_SIZE)
+        assert pages == [10, 10, 10, 10, 5]
+        assert CallHistory.stats['prefetchHits'] == 4
+
+        conn = sqlite3.connect(CallHistory.HISTORY_DB)
+        conn.execute("insert into voice_events values ('a', 'new', 'x', 'self', "
+                     "'2022-01-01T00:00:00.000Z', 0, 0, 0, 'new')")
+        conn.commit()
+        conn.close()
+        total, frames = CallHistory.getPage(0)
+        assert total == 46
+        assert b'\x00\x00\x00\x03new' in frames[0]
+        CallHistory.close()
+
+
+def test_local_time_across_transitions():
+    CallHistory.resetOffsets()
+    # Every 5 hours over two years, both directions of a DST change included
+    for t in range(1577836800, 1577836800 + 2 * 365 * 86400, 5 * 3600):
+        assert CallHistory.utcOffset(t) == time.localtime(t).tm_gmtoff
+    assert len(CallHistory.offsetRanges) <= 10
+    assert CallHistory.parseTimestamp('2021-03-28T01:30:00.000Z') == 1616895000
+
+
+def test_offsets_follow_time_zone_change(monkeypatch):
+    t = 1609459200
+    monkeypatch.setenv('TZ', 'UTC0')
+    time.tzset()
+    try:
+        CallHistory.resetOffsets()
+        assert CallHistory.utcOffset(t) == 0
+        monkeypatch.setenv('TZ', 'JST-9')
+        time.tzset()
+        CallHistory.resetOffsets()
+        assert CallHistory.utcOffset(t) == 9 * 3600
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+        CallHistory.resetOffsets()
+
+
+def test_names_resolved_per_page():
+    Addressbook.setContacts([('1', 'Zoe', '+44 7700 900123')])
+    names = Addressbook.contactNamesForNumbers(['07700900123', '112', '07700900123'])
+    assert names == {'07700900123': 'Zoe', '112': 'Unknown'}
+
+
+def test_call_log_writer(monkeypatch):
+    with tempfile.TemporaryDirectory() as d:
+        monkeypatch.setattr(CallHistory, 'HISTORY_DB', os.path.join(d, 'history.sqlite'))
+        createDb(CallHistory.HISTORY_DB, 0)
+        CallLogWriter.logOutgoingCall('ril_1', '+44 7700 900123')
+        CallLogWriter.logOutgoingCall('ril_0', '"); drop table voice_events; --')
+        assert CallLogWriter.flush(5)
+        CallLogWriter.stop()
+        conn = sqlite3.connect(CallHistory.HISTORY_DB)
+        rows = conn.execute('select accountId, threadId, senderId, remoteParticipant from voice_events').fetchall()
+        conn.close()
+        assert rows == [('ofono/ofono/ril_1', '+44 7700 900123', 'self', '+44 7700 900123'),
+                        ('ofono/ofono/ril_0', '"); drop table voice_events; --', 'self',
+                         '"); drop table voice_events; --')]
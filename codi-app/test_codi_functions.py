@@ -0,0 +1,50 @@
+import os
+import sqlite3
+import tempfile
+import pytest
+import Addressbook
+import CodiFunctions
+import CodiStatus
+import ContactSearch
+import PageCache
+import codi_mtk_generated_functions as mtkCmd
+
+
+def vcard(uid, name, number):
+    return 'BEGIN:VCARD\nUID:%s\nFN:%s\nTEL;TYPE=CELL:%s\nEND:VCARD' % (uid, name, number)
+
+
+@pytest.fixture
+def addressBook(monkeypatch):
+    # A contacts.db nobody has loaded yet, as seen by codiServer's one-shot
+    # dbus command
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'contacts.db')
+        conn = sqlite3.connect(path)
+        conn.execute('create table folder_id (uid text, vcard text)')
+        conn.executemany('insert into folder_id values (?, ?)',
+                         [('a', vcard('a', 'Zoe Jones', '0123')),
+                          ('b', vcard('b', 'Bob Smith', '0456')),
+                          ('c', vcard('c', 'Anna Smithers', '0789'))])
+        conn.commit()
+        conn.close()
+        monkeypatch.setattr(Addressbook, 'CONTACTS_DB', path)
+        monkeypatch.setattr(Addressbook, 'generation', 0)
+        monkeypatch.setattr(CodiStatus, 'Contacts', [], raising=False)
+        monkeypatch.setattr(ContactSearch, 'indexGeneration', None)
+        monkeypatch.setattr(CodiFunctions, 'contactPages', PageCache.PageCache(256 * 1024))
+        sent = []
+        monkeypatch.setattr(mtkCmd, 'sendFrame', lambda frame, commandId=None: sent.append(frame))
+        yield sent
+
+
+def test_search_loads_contacts_first(addressBook):
+    CodiFunctions.SearchContacts('smi', 5)
+    assert addressBook == [mtkCmd.encodeContactInfo('b', 2, 5, 'Bob Smith', '0456') +
+                           mtkCmd.encodeContactInfo('c', 2, 5, 'Anna Smithers', '0789')]
+
+
+def test_letter_jumps_to_its_section(addressBook):
+    CodiFunctions.GetContactsFromLetter('b')
+    assert addressBook == [mtkCmd.encodeContactInfo('b', 3, 10, 'Bob Smith', '0456') +
+                           mtkCmd.encodeContactInfo('a', 3, 10, 'Zoe Jones', '0123')]
@@ -0,0 +1,47 @@
+import Addressbook
+import ContactSearch
+import codi_mtk_generated_functions as mtkCmd
+
+
+def setUp():
+    Addressbook.setContacts([('1', 'John Smith', '+44 7700 900123'),
+                             ('1', 'John Smith', '01632 960001'),
+                             ('2', 'Zoë Jones', '+44 7700 900456'),
+                             ('3', 'Anna-Maria  Smithers', '112')])
+
+
+def test_name_prefix():
+    setUp()
+    assert [c[2] for c in ContactSearch.search('john')] == ['+44 7700 900123', '01632 960001']
+    assert [c[1] for c in ContactSearch.search('SMI')] == ['John Smith', 'John Smith', 'Anna-Maria  Smithers']
+    assert [c[1] for c in ContactSearch.search('zoe j')] == ['Zoë Jones']
+    assert [c[1] for c in ContactSearch.search('smi', 1)] == ['John Smith']
+    assert ContactSearch.search('x') == []
+    assert ContactSearch.search('  ') == []
+
+
+def test_t9_and_number():
+    setUp()
+    # 5646 is john, 963 is zoe
+    assert [c[1] for c in ContactSearch.search('5646')] == ['John Smith', 'John Smith']
+    assert [c[1] for c in ContactSearch.search('963')] == ['Zoë Jones']
+    # Digits that only appear in numbers
+    assert [c[2] for c in ContactSearch.search('900456')] == ['+44 7700 900456']
+    assert [c[2] for c in ContactSearch.search('+44 7700')] == ['+44 7700 900123', '+44 7700 900456']
+    assert [c[2] for c in ContactSearch.search('112')] == ['112']
+
+
+def test_index_follows_contacts():
+    setUp()
+    assert ContactSearch.search('bob') == []
+    Addressbook.setContacts([('4', 'Bob', '113')])
+    assert ContactSearch.search('bob') == [('4', 'Bob', '113')]
+
+
+def test_render():
+    setUp()
+    assert ContactSearch.render(ContactSearch.search('zoe'), 5) == \
+        [mtkCmd.encodeContactInfo('2', 1, 5, 'Zoë Jones', '+44 7700 900456')]
+    assert ContactSearch.render(ContactSearch.search('john', 5), 5) == \
+        [mtkCmd.encodeContactInfo('1', 2, 5, 'John Smith', n) for n in ('+44 7700 900123', '01632 960001')]
+    assert ContactSearch.render([], 5) == [mtkCmd.encodeContactInfo('0', 0, 5, '', '')]
@@ -0,0 +1,16 @@
+import ContactStore
+
+
+def test_views():
+    entries = [('a', 'Zoe', '112'), ('a', 'Zoe', '+44 7700 900123'), ('b', 'Bob', '')]
+    store = ContactStore.ContactStore(entries)
+    assert len(store) == 3
+    assert store == entries
+    assert store[1][0] == 'a' and store[1][1] == 'Zoe' and store[1][2] == '+44 7700 900123'
+    assert store[-1] == ('b', 'Bob', '')
+    assert store[1:] == entries[1:]
+    assert store[5:] == []
+    assert store[0][1:] == ('Zoe', '112')
+    assert store.names == ['Zoe', 'Bob']
+    assert store == ContactStore.ContactStore(entries)
+    assert store != ContactStore.ContactStore(entries[:2])
@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+import pytest
+import DeviceState
+import DeviceSync
+import codi_mtk_generated_functions as mtkCmd
+
+
+@pytest.fixture
+def subscribe():
+    # Subscribers on the module's store, removed again after the test
+    added = []
+
+    def add(callback):
+        DeviceState.subscribe(callback)
+        added.append(callback)
+    yield add
+    for callback in added:
+        DeviceState.unsubscribe(callback)
+
+
+def test_version_only_moves_on_real_changes(subscribe):
+    seen = []
+    subscribe(lambda changed, version: seen.append((changed, version)))
+    DeviceState.set(batteryLevel=DeviceState.get('batteryLevel'))
+    version = DeviceState.snapshot()[0]
+    assert seen == []
+
+    assert DeviceState.set(batteryLevel=DeviceState.get('batteryLevel') + 1, volume=[20, 0]) == version + 1
+    assert DeviceState.get('volume') == (20, 0)
+    assert set(seen[-1][0]) == {'batteryLevel', 'volume'}
+    assert DeviceState.changedSince(version) == {'batteryLevel': DeviceState.get('batteryLevel'),
+                                                 'volume': (20, 0)}
+    assert DeviceState.changedSince(version + 1) == {}
+
+
+def test_only_unacknowledged_fields_are_sent(monkeypatch, subscribe):
+    sent = []
+    monkeypatch.setattr(mtkCmd, 'sendFrame', lambda frame, commandId=None: sent.append(commandId))
+    # What DeviceSync.init() does
+    subscribe(DeviceSync.stateChanged)
+
+    DeviceSync.resync()
+    assert len(sent) == len(DeviceSync.FRAMES)
+
+    del sent[:]
+    DeviceState.set(wifi=(0, 100), bluetooth=DeviceState.get('bluetooth'))
+    assert sent == [mtkCmd.encodeWiFiStatusInfo.commandId]
+
+    del sent[:]
+    DeviceState.set(lidClosed=not DeviceState.get('lidClosed'))
+    assert sent == []
+
+    # A request is always answered
+    DeviceSync.answer('wifi')
+    assert sent == [mtkCmd.encodeWiFiStatusInfo.commandId]
+
+
+def test_volume_is_answered_for_the_stream(monkeypatch):
+    frames = []
+    monkeypatch.setattr(mtkCmd, 'sendFrame', lambda frame, commandId=None: frames.append(frame))
+    DeviceState.set(volume=(30, 0))
+    del frames[:]
+    DeviceSync.answerVolume(3)
+    assert frames == [mtkCmd.encodeVolumeLevelInfo(30, 3)]
+
+
+def test_imports_in_server_order():
+    # codiServer imports DBusServer first, DeviceSync is then imported while
+    # the MTK functions are only partly there
+    subprocess.run([sys.executable, '-c', 'import conftest, DBusServer'],
+                   cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
@@ -0,0 +1,53 @@
+import os
+import sqlite3
+import tempfile
+import Addressbook
+import FileWatcher
+
+
+def drainEvents():
+    FileWatcher.onEvents(FileWatcher.fd, None)
+    topics = set(FileWatcher.pendingTopics)
+    FileWatcher.pendingTopics.clear()
+    return topics
+
+
+def test_reload_does_not_publish_contacts(monkeypatch):
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'contacts.db')
+        conn = sqlite3.connect(path)
+        conn.execute('pragma journal_mode=wal')
+        conn.execute('create table folder_id (uid text, vcard text)')
+        conn.execute('insert into folder_id values (?, ?)',
+                     ('a', 'BEGIN:VCARD\nUID:a\nFN:Zoe\nTEL;TYPE=CELL:0123\nEND:VCARD'))
+        conn.commit()
+        conn.close()
+
+        monkeypatch.setattr(Addressbook, 'CONTACTS_DB', path)
+        FileWatcher.watch(path, 'contacts')
+        assert FileWatcher.init()
+        try:
+            drainEvents()
+            Addressbook.refreshContacts()
+            assert 'contacts' not in drainEvents()
+            assert Addressbook.contactNameForNumber('0123') == 'Zoe'
+
+            # Also while another connection keeps the WAL around
+            other = sqlite3.connect(path)
+            other.execute('select count(*) from folder_id').fetchone()
+            drainEvents()
+            Addressbook.refreshContacts()
+            assert 'contacts' not in drainEvents()
+            other.close()
+            drainEvents()
+
+            # Someone else writing is still seen
+            conn = sqlite3.connect(path)
+            conn.execute('insert into folder_id values (?, ?)',
+                         ('b', 'BEGIN:VCARD\nUID:b\nFN:Bob\nTEL;TYPE=CELL:0456\nEND:VCARD'))
+            conn.commit()
+            conn.close()
+            assert 'contacts' in drainEvents()
+        finally:
+            FileWatcher.stop()
+            FileWatcher.directories.clear()
@@ -0,0 +1,60 @@
+import struct
+import FrameReader
+
+
+def frame(cmdId, payload=b'', sessionId=1):
+    return FrameReader.MSG_HEADER + struct.pack('>III', 16 + len(payload), cmdId, sessionId) + payload
+
+
+def test_single_frame():
+    reader = FrameReader.FrameReader()
+    reader.feed(frame(147, b'\x01\x00\x02\xff\xfe'))
+    frames = [bytes(f) for f in reader]
+    assert frames == [struct.pack('>II', 147, 1) + b'\x01\x00\x02\xff\xfe']
+    assert reader.pending() == 0
+
+
+def test_split_across_feeds():
+    data = frame(41) + frame(7)
+    reader = FrameReader.FrameReader()
+    got = []
+    for b in data:
+        reader.feed(bytes([b]))
+        got += [bytes(f)[0:4] for f in reader]
+    assert got == [struct.pack('>I', 41), struct.pack('>I', 7)]
+    assert reader.resyncs == 0
+    assert reader.droppedBytes == 0
+
+
+def test_resync_on_garbage():
+    reader = FrameReader.FrameReader()
+    reader.feed(b'garbage' + frame(41) + b'\x58\x21junk' + frame(7))
+    assert len(list(reader)) == 2
+    assert reader.resyncs == 2
+    assert reader.droppedBytes == len(b'garbage') + len(b'\x58\x21junk')
+
+
+def test_bad_length_is_skipped():
+    reader = FrameReader.FrameReader()
+    reader.feed(FrameReader.MSG_HEADER + struct.pack('>I', 5000) + frame(41))
+    assert [bytes(f)[0:4] for f in reader] == [struct.pack('>I', 41)]
+    assert reader.resyncs == 1
+
+
+def test_too_short_for_ids_is_skipped():
+    reader = FrameReader.FrameReader()
+    reader.feed(FrameReader.MSG_HEADER + struct.pack('>IH', 10, 0) + frame(41))
+    assert [bytes(f)[0:4] for f in reader] == [struct.pack('>I', 41)]
+    assert reader.resyncs == 1
+
+
+def test_wraps_buffer():
+    reader = FrameReader.FrameReader(capacity=600)
+    count = 0
+    for i in range(1000):
+        reader.feed(frame(i, b'x' * (i % 50)))
+        for f in reader:
+            assert struct.unpack('>I', f[0:4])[0] == i
+            count += 1
+    assert count == 1000
+    assert reader.droppedBytes == 0
@@ -0,0 +1,40 @@
+import threading
+import HandlerExecutor
+
+
+def test_call_never_waits_for_other_categories():
+    release = threading.Event()
+    called = threading.Event()
+    try:
+        for category in HandlerExecutor.CATEGORIES:
+            if category != 'call':
+                HandlerExecutor.submit(category, release.wait, (5,))
+        HandlerExecutor.submit('call', called.set, ())
+        assert called.wait(1)
+    finally:
+        release.set()
+
+
+def test_category_runs_in_order():
+    done = threading.Event()
+    seen = []
+    for i in range(40):
+        HandlerExecutor.submit('contacts', seen.append, (i,))
+    HandlerExecutor.submit('contacts', done.set, ())
+    assert done.wait(5)
+    assert seen == list(range(40))
+
+
+def test_queue_is_finished_after_stop():
+    release = threading.Event()
+    done = threading.Event()
+    seen = []
+    HandlerExecutor.submit('history', release.wait, (5,))
+    for i in range(HandlerExecutor.BATCH + 5):
+        HandlerExecutor.submit('history', seen.append, (i,))
+    HandlerExecutor.submit('history', done.set, ())
+    HandlerExecutor.stop()
+    release.set()
+    assert done.wait(5)
+    assert seen == list(range(HandlerExecutor.BATCH + 5))
+    assert 'history' not in HandlerExecutor.scheduled
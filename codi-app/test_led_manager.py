@@ -0,0 +1,45 @@
+import os
+import tempfile
+import LEDManager
+
+
+def readWrites(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_only_changes_are_written():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'led')
+        open(path, 'w').close()
+        LEDManager.setPath(path)
+        opens = LEDManager.stats['opens']
+
+        LEDManager.ledsOff()
+        # LED 4 has no colors and is written once
+        assert readWrites(path) == ''.join('%d%d0' % (l, c) for l in (2, 3) for c in (1, 2, 3)) + \
+            '40' + ''.join('%d%d0' % (l, c) for l in (5, 6, 7) for c in (1, 2, 3))
+        written = len(readWrites(path))
+
+        LEDManager.ledsOff()
+        assert len(readWrites(path)) == written
+
+        LEDManager.ledsBlue()
+        assert readWrites(path)[written:] == '231331'
+        assert LEDManager.stats['opens'] == opens + 1
+
+        LEDManager.reset()
+        LEDManager.ledsBlue()
+        assert readWrites(path)[written:] == '231331' '210220231' '310320331'
+        LEDManager.setPath(LEDManager.LED_PROC)
+
+
+def test_pluggable_writer():
+    writes = []
+    LEDManager.setWriter(writes.append)
+    LEDManager.ledsCharging(True)
+    LEDManager.ledsCharging(True)
+    LEDManager.ledsCharging(False)
+    LEDManager.setLeds({9: [[1, 1]]})
+    assert writes == [b'111', b'120', b'130', b'110']
+    LEDManager.setWriter(None)
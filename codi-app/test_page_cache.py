@@ -0,0 +1,22 @@
+import PageCache
+
+
+def test_lru_eviction():
+    cache = PageCache.PageCache(10)
+    cache.put((0, 1), b'aaaa')
+    cache.put((10, 1), b'bbbb')
+    assert cache.get((0, 1)) == b'aaaa'
+    cache.put((20, 1), b'cccc')
+    assert cache.get((10, 1)) is None
+    assert cache.get((0, 1)) == b'aaaa'
+    assert cache.get((0, 2)) is None
+    assert cache.stats() == {'pages': 2, 'bytes': 8, 'hits': 2, 'misses': 2, 'evictions': 1}
+
+
+def test_oversized_page_not_cached():
+    cache = PageCache.PageCache(4)
+    cache.put(0, b'12345')
+    cache.put(1, b'1234')
+    cache.put(1, b'12')
+    assert cache.get(0) is None
+    assert cache.stats()['bytes'] == 2
@@ -0,0 +1,48 @@
+import concurrent.futures
+import pytest
+import RequestTracker
+
+
+def test_reply_resolves_its_session():
+    first, firstFuture = RequestTracker.register(1, 901)
+    second, secondFuture = RequestTracker.register(1, 901)
+    assert RequestTracker.isExpected(901)
+
+    assert RequestTracker.resolve(901, second, ('b',))
+    assert secondFuture.result(0) == ('b',)
+    assert not firstFuture.done()
+
+    assert RequestTracker.resolve(901, first, ('a',))
+    assert firstFuture.result(0) == ('a',)
+    assert not RequestTracker.isExpected(901)
+    assert not RequestTracker.resolve(901, first, ('a',))
+
+
+def test_unknown_session_goes_to_oldest_request():
+    first, firstFuture = RequestTracker.register(1, 902)
+    second, secondFuture = RequestTracker.register(1, 902)
+
+    # Unsolicited session id
+    assert RequestTracker.resolve(902, 1, ('x',))
+    assert firstFuture.result(0) == ('x',)
+    assert not secondFuture.done()
+    assert RequestTracker.resolve(902, 1, ('y',))
+    assert secondFuture.result(0) == ('y',)
+
+
+def test_expired_requests_stop_being_expected(monkeypatch):
+    sessionId, future = RequestTracker.register(1, 903)
+    monkeypatch.setattr(RequestTracker, 'MAX_AGE', -1)
+
+    # No other request needed for the expiry
+    assert not RequestTracker.isExpected(903)
+    with pytest.raises(concurrent.futures.TimeoutError):
+        future.result(0)
+    assert not RequestTracker.resolve(903, sessionId, ('late',))
+
+
+def test_cancelled_requests_are_dropped():
+    sessionId, future = RequestTracker.register(1, 904)
+    assert future.cancel()
+    assert not RequestTracker.isExpected(904)
+    assert not RequestTracker.resolve(904, sessionId, ('late',))
@@ -0,0 +1,86 @@
+import threading
+import SerialPortManager
+import codi_mtk_generated_functions as mtkCmd
+
+
+class FakeSocket:
+    def __init__(self):
+        self.writes = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def write(self, data):
+        self.release.wait(5)
+        self.writes.append(data)
+
+
+def clearQueues():
+    SerialPortManager.urgentQueue.clear()
+    SerialPortManager.outQueue.clear()
+    SerialPortManager.queuedByKey.clear()
+
+
+def send(encoder, *args):
+    frame = encoder(*args)
+    mtkCmd.sendFrame(frame, encoder.commandId)
+    return frame
+
+
+def test_state_frames_replace_queued_ones_in_place():
+    clearQueues()
+    first = send(mtkCmd.encodeBatteryLevelInfo, 10)
+    date = send(mtkCmd.encodeDateTimeInfo, 1, 2, 2021, 3, 4, 5, 0)
+    contact = send(mtkCmd.encodeContactInfo, '1', 1, 10, 'Zoe', '0123')
+    last = send(mtkCmd.encodeBatteryLevelInfo, 20)
+
+    assert first != last
+    assert SerialPortManager.nextBatch() == [last, date, contact]
+    assert SerialPortManager.queuedByKey == {}
+
+
+def test_volume_of_every_stream_is_sent():
+    clearQueues()
+    music = send(mtkCmd.encodeVolumeLevelInfo, 30, 3)
+    ring = send(mtkCmd.encodeVolumeLevelInfo, 50, 2)
+
+    assert SerialPortManager.nextBatch() == [music, ring]
+
+
+def test_urgent_frames_go_first():
+    clearQueues()
+    contact = send(mtkCmd.encodeContactInfo, '1', 1, 10, 'Zoe', '0123')
+    battery = send(mtkCmd.encodeBatteryLevelInfo, 30)
+    call = send(mtkCmd.encodeCallInfo, 0, 0, 'Zoe', '0123', '', 1)
+
+    assert SerialPortManager.nextBatch() == [call, contact, battery]
+
+
+def test_batches_are_bounded():
+    clearQueues()
+    frame = b'x' * 600
+    for i in range(3):
+        SerialPortManager.sendCommand(frame)
+    assert SerialPortManager.nextBatch() == [frame, frame]
+    assert SerialPortManager.nextBatch() == [frame]
+    assert SerialPortManager.nextBatch() == []
+
+
+def test_flush_waits_for_the_writer():
+    clearQueues()
+    socket = FakeSocket()
+    socket.release.clear()
+    SerialPortManager.socket = socket
+    SerialPortManager.startWriter()
+    try:
+        SerialPortManager.sendCommand(b'frame')
+        # Still being written
+        assert not SerialPortManager.flush(0.1)
+        assert socket.writes == []
+
+        socket.release.set()
+        assert SerialPortManager.flush(5)
+        assert socket.writes == [b'frame']
+    finally:
+        socket.release.set()
+        SerialPortManager.stopWriter()
+        SerialPortManager.socket = None